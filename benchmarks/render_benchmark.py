@@ -0,0 +1,107 @@
+"""
+Measures the bytes, write calls and time needed to render a page of
+search results, in block mode and in half block mode, which draws twice
+as many pixel rows in the same number of lines, in truecolor and with
+the 256 and 16 color palettes.
+
+Run from the repository root: python -m benchmarks.render_benchmark
+"""
+import io
+import sys
+import time
+from contextlib import redirect_stdout
+
+from PIL import Image
+
+from src.interfaces.displayer_interface import AnimeListItem
+from src.presentation.anime_info_displayers import AnimeListItemDisplayer
+from src.presentation.color_palette import ColorDepth, get_palette
+from src.presentation.image_builder import ImageBuilder, ImagePixels
+
+PAGE_SIZE = 20
+ROUNDS = 20
+
+class CountingStream(io.StringIO):
+    writes = 0
+
+    def write(self, s: str) -> int:
+        self.writes += 1
+        return super().write(s)
+
+def create_cover(seed: int, half_block: bool = False) -> ImagePixels:
+    # Gradients over a fractal give runs of similar colors and detailed
+    # regions, closer to a poster than random noise.
+    image = Image.effect_mandelbrot(
+        (500, 750),
+        (-2 + seed * 0.01, -1.5, 1, 1.5),
+        100
+    ).convert("RGB")
+    gradient = Image.linear_gradient("L").resize((500, 750)).convert("RGB")
+    buffer = io.BytesIO()
+    Image.blend(image, gradient, 0.5).save(buffer, "JPEG")
+    return ImageBuilder._build_image(buffer.getvalue(), half_block)
+
+def create_item(n: int) -> AnimeListItem:
+    return {
+        "api_id": n,
+        "title": f"Anime {n}",
+        "overview": "A long overview of the anime plot. " * 12,
+        "genres": ["Animation", "Drama"],
+        "release_date": "2020-01-01",
+        "cover_url": ""
+    }
+
+def render_per_pixel(item: AnimeListItem, image_pixels: ImagePixels):
+    """The per pixel writes the displayers used before FrameBuilder."""
+    stdout = sys.stdout
+    for pixel_line in image_pixels:
+        for r, g, b in ImagePixels.pixels(pixel_line):
+            stdout.write(f"\033[38;2;{r};{g};{b}mo\033[0m")
+        stdout.write('|')
+        stdout.write(item["title"])
+        stdout.write('\n')
+
+def displayer_renderer(depth: ColorDepth):
+    palette = get_palette(depth)
+
+    def render(item: AnimeListItem, image_pixels: ImagePixels):
+        # Covers are quantized when the displayer is built.
+        AnimeListItemDisplayer(item, image_pixels, palette).render_info()
+
+    return render
+
+def measure(name: str, render, page: list[tuple[AnimeListItem, ImagePixels]]):
+    stream = CountingStream()
+    started_at = time.perf_counter()
+    for _ in range(ROUNDS):
+        stream.seek(0)
+        stream.truncate()
+        stream.writes = 0
+        with redirect_stdout(stream):
+            for item, image_pixels in page:
+                render(item, image_pixels)
+    elapsed = (time.perf_counter() - started_at) / ROUNDS
+    size = len(stream.getvalue().encode())
+    pixels = sum(
+        image_pixels.row_count * ImagePixels.default_width
+        for _, image_pixels in page
+    )
+    print(
+        f"{name:<12} {size:>10} bytes "
+        f"{size / pixels:>6.2f} bytes/pixel "
+        f"{stream.writes:>7} writes {elapsed * 1000:>8.2f} ms/page"
+    )
+
+if __name__ == "__main__":
+    page = [(create_item(n), create_cover(n)) for n in range(PAGE_SIZE)]
+    measure("per pixel", render_per_pixel, page)
+    measure("frame", displayer_renderer("truecolor"), page)
+    measure("frame 256", displayer_renderer("256"), page)
+    measure("frame 16", displayer_renderer("16"), page)
+    half_block_page = [
+        (create_item(n), create_cover(n, half_block=True))
+        for n in range(PAGE_SIZE)
+    ]
+    measure("half", displayer_renderer("truecolor"), half_block_page)
+    measure("half 256", displayer_renderer("256"), half_block_page)
+    measure("half 16", displayer_renderer("16"), half_block_page)
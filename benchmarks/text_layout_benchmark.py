@@ -0,0 +1,64 @@
+"""
+Measures laying out the text of a search result next to its cover, with
+the per row re-wrapping the displayers did before text_layout and with
+the single pass layout, for growing overviews.
+
+Run from the repository root: python -m benchmarks.text_layout_benchmark
+"""
+import time
+
+from src.presentation.text_layout import layout_field, wrap
+
+TEXT_WIDTH = 89
+COVER_LINES = 24
+MAX_LINES = 17
+ROUNDS = 50
+
+def get_content_lines(prefix: str, content: str, padding: int) -> list[str]:
+    """The wrapping the displayers used before text_layout."""
+    inf_prefix = f"{prefix}: "
+    inf_prefix_len = len(inf_prefix)
+    printed_char = 0
+    lines = []
+    while printed_char < len(content):
+        offset = printed_char + padding
+        line = content[printed_char:offset]
+        if printed_char == 0:
+            offset -= inf_prefix_len
+            line = f"{inf_prefix}{content[printed_char:offset]}"
+        if offset <= len(content) and line[-1] != " ":
+            count = -1
+            while line[count] != " ":
+                count -= 1
+            offset += count + 1
+            prefix_len = inf_prefix_len if printed_char == 0 else 0
+            new_offset = offset + prefix_len - printed_char
+            line = line[0:new_offset]
+        lines.append(line)
+        printed_char = offset
+    return lines or [inf_prefix]
+
+def layout_per_row(overview: str):
+    # The overview was wrapped again for each cover line it filled.
+    for _ in range(min(COVER_LINES, MAX_LINES)):
+        get_content_lines("Overview", overview, TEXT_WIDTH)
+
+def layout_once(overview: str):
+    layout_field("Overview", overview, TEXT_WIDTH, MAX_LINES)
+
+def measure(name: str, layout, overview: str):
+    started_at = time.perf_counter()
+    for _ in range(ROUNDS):
+        # Measures the layout itself, not the cache.
+        wrap.cache_clear()
+        layout(overview)
+    elapsed = (time.perf_counter() - started_at) / ROUNDS
+    print(f"{name:<10} {len(overview):>7} chars {elapsed * 1e6:>10.1f} us/item")
+
+if __name__ == "__main__":
+    for words in (100, 1000, 10000):
+        overview = " ".join(
+            f"word{n % 7}" + "x" * (n % 5) for n in range(words)
+        )
+        measure("per row", layout_per_row, overview)
+        measure("once", layout_once, overview)
@@ -0,0 +1,87 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from .services.circuit_breaker import CircuitBreaker
+from .services.cover_atlas import CoverAtlas
+from .services.db import Database
+from .services.image_cache import ImageCache
+from .services.request_scheduler import RequestScheduler
+from .services.response_cache import ResponseCache
+from .services.tmdb import TMDBService
+from .presentation.cli_parser import DefaultArgumentParser
+from .presentation.color_palette import ColorDepth, detect_color_depth, get_palette
+
+from .presentation.command_dispatcher import dispatch_command
+from .presentation.controller import Controller
+from .presentation.daemon import DaemonServer
+from .presentation.image_builder import ImageBuilder, create_decode_executor
+from .presentation.shell import Shell
+from .utils.cache_dir import get_cache_dir
+from .utils.metrics import registry
+
+def main(args: list[str]) -> int:
+    db = Database()
+    db._init_tags()
+
+    load_dotenv()
+    default_argparse = DefaultArgumentParser()
+    namespace = default_argparse.parse(args)
+    request_scheduler = RequestScheduler()
+    tmdb_service = TMDBService(
+        str(os.getenv("TMDB_API_TOKEN")),
+        request_scheduler,
+        ResponseCache(),
+        CircuitBreaker(os.path.join(get_cache_dir(), "tmdb_circuit.json"))
+    )
+
+    decode_executor = create_decode_executor()
+
+    cover_atlas = CoverAtlas()
+    def create_controller(render_mode: str, color_depth: ColorDepth):
+        return Controller(
+            tmdb_service,
+            db,
+            ImageBuilder(
+                ImageCache(),
+                decode_executor,
+                render_mode,
+                request_scheduler
+            ),
+            cover_atlas,
+            get_palette(color_depth)
+        )
+
+    if namespace.command in ("daemon", "shell"):
+        # Long running, the metrics are collected from the start.
+        registry.enabled = True
+
+    exit_code = 0
+    if namespace.command == "daemon":
+        # One writer thread, database commands run one at a time.
+        db_executor = ThreadPoolExecutor(1, thread_name_prefix="db")
+        exit_code = asyncio.run(
+            DaemonServer(
+                create_controller,
+                default_argparse,
+                db_executor,
+                namespace.metrics_port
+            ).serve()
+        )
+        db_executor.shutdown()
+    else:
+        color_depth = namespace.color_depth
+        if color_depth == "auto":
+            color_depth = detect_color_depth()
+        controller = create_controller(namespace.render_mode, color_depth)
+        if namespace.command == "shell":
+            asyncio.run(Shell(
+                controller,
+                default_argparse,
+                namespace.metrics_port
+            ).run())
+        else:
+            asyncio.run(dispatch_command(controller, namespace))
+
+    decode_executor.shutdown()
+    return exit_code
@@ -0,0 +1,18 @@
+from datetime import datetime
+
+from ..interfaces.displayer_interface import AnimeDetailedInfo
+
+class DTOAnimeDetails:
+    anime_id: int
+    details: AnimeDetailedInfo
+    fetched_at: datetime
+
+    def __init__(
+        self,
+        anime_id: int,
+        details: AnimeDetailedInfo,
+        fetched_at: datetime
+    ):
+        self.anime_id = anime_id
+        self.details = details
+        self.fetched_at = fetched_at
@@ -0,0 +1,21 @@
+from datetime import datetime
+
+from ..interfaces.movie_service_interface import AnimeListReturn
+
+class DTODiscoverSnapshot:
+    genres_filter: str
+    page: int
+    anime_list: AnimeListReturn
+    fetched_at: datetime
+
+    def __init__(
+        self,
+        genres_filter: str,
+        page: int,
+        anime_list: AnimeListReturn,
+        fetched_at: datetime
+    ):
+        self.genres_filter = genres_filter
+        self.page = page
+        self.anime_list = anime_list
+        self.fetched_at = fetched_at
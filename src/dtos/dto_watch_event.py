@@ -0,0 +1,33 @@
+from typing import Optional
+
+class DTOWatchEvent:
+    id: int
+    anime_id: int
+    title: str
+    watched_at: str
+    watching_season: Optional[int]
+    last_watched_episode: Optional[int]
+
+    def __init__(
+        self,
+        id: int,
+        anime_id: int,
+        title: str,
+        watched_at: str,
+        watching_season: Optional[int],
+        last_watched_episode: Optional[int]
+    ):
+        self.id = id
+        self.anime_id = anime_id
+        self.title = title
+        self.watched_at = watched_at
+        self.watching_season = watching_season
+        self.last_watched_episode = last_watched_episode
+
+class DTOWatchDay:
+    day: str
+    events: int
+
+    def __init__(self, day: str, events: int):
+        self.day = day
+        self.events = events
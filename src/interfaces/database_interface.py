@@ -1,16 +1,34 @@
+import inspect
 from abc import ABC, abstractmethod
-from typing import Optional
-from datetime import date
+from typing import Optional, TypedDict
+from datetime import date, datetime
 
 from ..dtos.dto_tag import DTOTag
+from .displayer_interface import AnimeDetailedInfo
+from .movie_service_interface import AnimeListReturn
 from ..dtos.dto_anime import DTOAnime
+from ..dtos.dto_anime_details import DTOAnimeDetails
+from ..dtos.dto_discover_snapshot import DTODiscoverSnapshot
+from ..dtos.dto_watch_event import DTOWatchDay, DTOWatchEvent
+
+AnimeUpdate = TypedDict("AnimeUpdate", {
+    "anime_id": int,
+    "watching_season": Optional[int],
+    "last_watched_episode": Optional[int],
+    "tag_id": Optional[int]
+})
 
 class MetaDB(type, ABC):
     instances_ = {}
     def __call__(cls, *args, **kwargs):
-        if cls not in cls.instances_:
-            cls.instances_[cls] = super().__call__(*args, **kwargs)
-        return cls.instances_[cls]
+        # One instance per database, the defaults are applied so the
+        # default URL given or omitted is the same instance.
+        arguments = inspect.signature(cls.__init__).bind(None, *args, **kwargs)
+        arguments.apply_defaults()
+        key = (cls, tuple(arguments.arguments.items())[1:])
+        if key not in cls.instances_:
+            cls.instances_[key] = super().__call__(*args, **kwargs)
+        return cls.instances_[key]
 
 class IDatabase(metaclass=MetaDB):
     @abstractmethod
@@ -27,6 +45,14 @@ class IDatabase(metaclass=MetaDB):
     ) -> Optional[DTOAnime]:
         ...
 
+    @abstractmethod
+    def bulk_update_animes(
+        self,
+        updates: list[AnimeUpdate],
+        chunk_size: int = 500
+    ) -> list[int]:
+        ...
+
     @abstractmethod
     def delete_anime(self, anime_id: int) -> Optional[DTOAnime]:
         ...
@@ -43,10 +69,34 @@ class IDatabase(metaclass=MetaDB):
     def select_animes_by_title(self, title: str) -> list[DTOAnime]:
         ...
 
+    @abstractmethod
+    def select_animes_by_genres(
+        self,
+        genres: list[str],
+        title: Optional[str] = None
+    ) -> list[DTOAnime]:
+        ...
+
     @abstractmethod
     def get_anime_by_tmdb_id(self, tmdb_id: int) -> Optional[DTOAnime]:
         ...
 
+    @abstractmethod
+    def get_animes_by_tmdb_ids(self, tmdb_ids: list[int]) -> list[DTOAnime]:
+        ...
+
+    @abstractmethod
+    def bulk_refresh_animes(self, details: list[AnimeDetailedInfo]) -> int:
+        ...
+
+    @abstractmethod
+    def get_sync_watermark(self, name: str) -> Optional[datetime]:
+        ...
+
+    @abstractmethod
+    def set_sync_watermark(self, name: str, synced_at: datetime):
+        ...
+
     @abstractmethod
     def insert_anime(
         self,
@@ -56,6 +106,53 @@ class IDatabase(metaclass=MetaDB):
         last_watched_episode: Optional[int],
         last_watched_at: Optional[date],
         title: str,
-        tag_id: int
+        tag_id: int,
+        genres: Optional[list[str]] = None,
+        details: Optional[AnimeDetailedInfo] = None
     ) -> Optional[int]:
         ...
+
+    @abstractmethod
+    def save_anime_details(
+        self,
+        anime_id: int,
+        details: AnimeDetailedInfo
+    ):
+        ...
+
+    @abstractmethod
+    def get_anime_details(self, anime_id: int) -> Optional[DTOAnimeDetails]:
+        ...
+
+    @abstractmethod
+    def save_discover_snapshot(
+        self,
+        genres_filter: str,
+        page: int,
+        anime_list: AnimeListReturn
+    ):
+        ...
+
+    @abstractmethod
+    def get_discover_snapshot(
+        self,
+        genres_filter: str,
+        page: int
+    ) -> Optional[DTODiscoverSnapshot]:
+        ...
+
+    @abstractmethod
+    def get_watch_history(
+        self,
+        limit: int,
+        anime_id: Optional[int] = None
+    ) -> list[DTOWatchEvent]:
+        ...
+
+    @abstractmethod
+    def count_watch_events_per_day(
+        self,
+        since: date,
+        anime_id: Optional[int] = None
+    ) -> list[DTOWatchDay]:
+        ...
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Generic, TypeVar, TypedDict
+from typing import Generic, NotRequired, TypeVar, TypedDict
 
 AnimeListItem = TypedDict("AnimeListItem", {
     "api_id": int,
@@ -22,7 +22,9 @@ AnimeDetailedInfo = TypedDict("AnimeDetailedInfo", {
     "episodes_count": int,
     "seasons_count": int,
     "status": str,
-    "trailers": list[Trailer]
+    "trailers": list[Trailer],
+    # Set when the API was unavailable and saved data is shown.
+    "stale": NotRequired[bool]
 })
 
 FormatedTitleMap = TypedDict("FormatedTitleMap", {
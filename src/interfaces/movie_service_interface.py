@@ -1,16 +1,20 @@
 from abc import ABC, abstractmethod
-from typing import TypedDict
+from datetime import date
+from typing import NotRequired, TypedDict
 
 from aiohttp import ClientSession
 
 from .displayer_interface import AnimeDetailedInfo, AnimeListItem
+from ..utils.request_priority import RequestPriority
 
 AnimeListReturn = TypedDict(
     "AnimeListReturn",
     {
         "anime_list": list[AnimeListItem],
         "page": int,
-        "total_pages": int
+        "total_pages": int,
+        # Set when the API was unavailable and a saved page is returned.
+        "stale": NotRequired[bool]
     }
 )
 
@@ -23,12 +27,17 @@ Genre = TypedDict(
 )
 
 class IService(ABC):
+    @abstractmethod
+    async def configure_images(self, session: ClientSession, width: int):
+        ...
+
     @abstractmethod
     async def get_anime_list(
         self,
         session: ClientSession,
         page = 1,
         genres_filter: str = "",
+        priority: RequestPriority = RequestPriority.METADATA
     ) -> AnimeListReturn:
         ...
 
@@ -46,7 +55,8 @@ class IService(ABC):
         session: ClientSession,
         name: str,
         page: int,
-        genres_filter: str = ""
+        genres_filter: str = "",
+        priority: RequestPriority = RequestPriority.METADATA
     ) -> AnimeListReturn:
         ...
 
@@ -56,3 +66,12 @@ class IService(ABC):
         session: ClientSession
     ) -> list[Genre]:
         ...
+
+    @abstractmethod
+    async def get_changed_anime_ids(
+        self,
+        session: ClientSession,
+        start_date: date,
+        end_date: date
+    ) -> list[int]:
+        ...
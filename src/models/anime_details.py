@@ -0,0 +1,17 @@
+from .base import Base
+
+from datetime import datetime
+
+from sqlalchemy.orm import mapped_column, Mapped
+from sqlalchemy import ForeignKey
+
+class AnimeDetails(Base):
+    __tablename__ = "anime_details"
+
+    anime_id: Mapped[int] = mapped_column(
+        ForeignKey("anime.id"),
+        primary_key=True
+    )
+    # zlib compressed JSON of the AnimeDetailedInfo returned by the service.
+    snapshot: Mapped[bytes] = mapped_column(nullable=False)
+    fetched_at: Mapped[datetime] = mapped_column(nullable=False)
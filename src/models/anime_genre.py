@@ -0,0 +1,20 @@
+from .base import Base
+
+from sqlalchemy.orm import mapped_column, Mapped
+from sqlalchemy import ForeignKey, Index, String
+
+class AnimeGenre(Base):
+    __tablename__ = "anime_genre"
+    __table_args__ = (
+        Index("ix_anime_genre_anime_id", "anime_id"),
+    )
+
+    # (genre, anime_id) is the composite index genre filters resolve on.
+    genre: Mapped[str] = mapped_column(
+        String(collation="NOCASE"),
+        primary_key=True
+    )
+    anime_id: Mapped[int] = mapped_column(
+        ForeignKey("anime.id"),
+        primary_key=True
+    )
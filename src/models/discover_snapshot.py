@@ -0,0 +1,15 @@
+from .base import Base
+
+from datetime import datetime
+
+from sqlalchemy.orm import mapped_column, Mapped
+
+class DiscoverSnapshot(Base):
+    __tablename__ = "discover_snapshot"
+
+    # Lowercase genre names, sorted and comma separated.
+    genres_filter: Mapped[str] = mapped_column(primary_key=True)
+    page: Mapped[int] = mapped_column(primary_key=True)
+    # zlib compressed JSON of the AnimeListReturn returned by the service.
+    snapshot: Mapped[bytes] = mapped_column(nullable=False)
+    fetched_at: Mapped[datetime] = mapped_column(nullable=False)
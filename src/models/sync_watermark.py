@@ -0,0 +1,11 @@
+from .base import Base
+
+from datetime import datetime
+
+from sqlalchemy.orm import mapped_column, Mapped
+
+class SyncWatermark(Base):
+    __tablename__ = "sync_watermark"
+
+    name: Mapped[str] = mapped_column(primary_key=True)
+    synced_at: Mapped[datetime] = mapped_column(nullable=False)
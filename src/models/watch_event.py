@@ -0,0 +1,23 @@
+from .base import Base
+
+from typing import Optional
+from datetime import datetime
+
+from sqlalchemy.orm import mapped_column, Mapped
+from sqlalchemy import ForeignKey, Index
+
+class WatchEvent(Base):
+    __tablename__ = "watch_event"
+    __table_args__ = (
+        Index("ix_watch_event_anime_id_watched_at", "anime_id", "watched_at"),
+        Index("ix_watch_event_watched_at", "watched_at"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    anime_id: Mapped[int] = mapped_column(
+        ForeignKey("anime.id"),
+        nullable=False
+    )
+    watched_at: Mapped[datetime] = mapped_column(nullable=False)
+    watching_season: Mapped[Optional[int]]
+    last_watched_episode: Mapped[Optional[int]]
@@ -1,10 +1,15 @@
-import os
-from sys import stdout
+from typing import Iterator, Optional
 
 from ..dtos.dto_anime import DTOAnime
+from ..dtos.dto_watch_event import DTOWatchDay, DTOWatchEvent
 
 from ..interfaces.displayer_interface import AnimeListItem, FormatedTitleMap, AnimeDetailedInfo, IDisplayer 
+from .color_palette import ColorPalette
+from .frame_builder import FrameBuilder
 from .image_builder import ImagePixels
+from .text_layout import cut, layout_field
+from ..utils.decorators.profiled import profiled
+from ..utils.terminal import get_terminal_columns
 
 from tabulate import tabulate
 
@@ -12,62 +17,52 @@ class TextBuilder():
     _terminal_columns: int
     _dflt_img_char_p_line = 31
     _dflt_txt_spc: int
-    _curr_contet_printed_lines = 0
-    _lines_printed = 0
     _terminal_columns = 0
-    _printed_anime_inf: list[FormatedTitleMap]
     _anime_info_to_print: list[FormatedTitleMap]
-    _image_pixels: ImagePixels
+    _image_pixels: Optional[ImagePixels]
+    _palette: Optional[ColorPalette]
 
     def __init__(
         self,
-        image_pixels: ImagePixels,
-        anime_info_to_print: list[FormatedTitleMap]
+        image_pixels: Optional[ImagePixels],
+        anime_info_to_print: list[FormatedTitleMap],
+        palette: Optional[ColorPalette] = None
     ):
-        self._terminal_columns = os.get_terminal_size().columns
+        """Without image_pixels a blank space is left for the cover."""
+        self._terminal_columns = get_terminal_columns()
         self._dflt_txt_spc = self._terminal_columns - self._dflt_img_char_p_line
-        self._printed_anime_inf = []
+        self._palette = palette
+        if image_pixels and palette:
+            image_pixels = palette.quantize(image_pixels)
         self._image_pixels = image_pixels
         self._anime_info_to_print = anime_info_to_print
 
+    @property
+    def _cover_height(self) -> int:
+        if self._image_pixels == None:
+            return ImagePixels.default_height
+        return self._image_pixels.default_height
+
     def _parse_content(self, content: str) -> str:
         if type(content) == list:
             return ', '.join(content).replace('\n', " ")
 
         return str(content).replace('\n', " ")
 
+    @profiled("render.text_layout")
     def _get_content_lines(
         self,
         title_map: FormatedTitleMap,
         content: str,
-        padding: int
-    ) -> list[str]:
-        content = self._parse_content(content)
-        inf_prefix = f"{title_map['title']}: "
-        inf_prefix_len = len(inf_prefix)
-        printed_char = 0
-        lines = []
-        while printed_char < len(content):
-            offset = printed_char + padding
-            line = content[printed_char:offset]
-            if printed_char == 0:
-                offset -= inf_prefix_len
-                line = f"{inf_prefix}{content[printed_char:offset]}"
-            if offset <= len(content) and line[-1] != " ":
-                count = -1
-                while line[count] != " ":
-                    count -= 1
-                offset += count + 1 # slicing is exclusive
-                prefix_len = inf_prefix_len if printed_char == 0 else 0
-                new_offset = offset + prefix_len - printed_char
-                line = line[0:new_offset]
-            lines.append(line)
-            printed_char = offset
-
-        if not len(lines):
-            return [inf_prefix]
-
-        return lines
+        width: int,
+        max_lines: Optional[int] = None
+    ) -> tuple[str, ...]:
+        return layout_field(
+            title_map["title"],
+            self._parse_content(content),
+            width,
+            max_lines
+        )
 
 AnimeListItemFields: list[FormatedTitleMap] = [
         {
@@ -127,22 +122,29 @@ class AnimeDetailedItemDisplayer(
     def __init__(
         self,
         anime_inf: AnimeDetailedInfo,
-        image_pixels: ImagePixels
+        image_pixels: Optional[ImagePixels],
+        palette: Optional[ColorPalette] = None
     ):
         super().__init__(
             image_pixels,
-            AnimeListItemFields + AnimeDetailsFields
+            AnimeListItemFields + AnimeDetailsFields,
+            palette
         )
         self.anime_inf = anime_inf
-        self._image_pixels = image_pixels
 
+    @profiled("render.item")
     def render_info(self):
+        frame = FrameBuilder(self._palette)
+        if self.anime_inf.get("stale"):
+            frame.line("TMDB is unavailable, showing the last saved details.")
         for info in self._anime_info_to_print:
             if info["original_title"] == "trailers":
-                print(f"{info['title']}:")
+                frame.line(f"{info['title']}:")
                 trailers = self.anime_inf[info["original_title"]]
                 for trailer_info in trailers:
-                    print(f'{trailer_info["name"]}: {trailer_info["link"]}')
+                    frame.line(
+                        f'{trailer_info["name"]}: {trailer_info["link"]}'
+                    )
                 continue
 
             content_lines = self._get_content_lines(
@@ -151,80 +153,66 @@ class AnimeDetailedItemDisplayer(
                 self._terminal_columns
             )
             for line in content_lines:
-                print(line)
+                frame.line(line)
+
+        if self._image_pixels == None:
+            frame.flush()
+            return
 
         image_middle = self._image_pixels.default_width / 2
         blank_offset = int((self._terminal_columns / 2) - image_middle)
-        for pixel_line in self._image_pixels:
-            stdout.write(" " * blank_offset)
-            for r,g,b in pixel_line:
-                stdout.write(f"\033[38;2;{r};{g};{b}mo\033[0m")
-            print(" " * blank_offset)
-
+        for top_line, bottom_line in self._image_pixels.lines():
+            frame.text(" " * blank_offset)
+            frame.pixels(top_line, bottom_line)
+            frame.newline()
+        frame.flush()
 
 
 class AnimeListItemDisplayer(TextBuilder, IDisplayer[AnimeListItem]):
     def __init__(
         self,
         anime_inf: AnimeListItem,
-        image_pixels: ImagePixels
+        image_pixels: Optional[ImagePixels],
+        palette: Optional[ColorPalette] = None
     ):
-        super().__init__(image_pixels, AnimeListItemFields)
+        super().__init__(image_pixels, AnimeListItemFields, palette)
         self.anime_inf = anime_inf
-        self._image_pixels = image_pixels
-
-    def _get_next_anime_info(self):
-        printed_anime_inf = len(self._printed_anime_inf)
-        if printed_anime_inf == len(self._anime_info_to_print):
-            raise StopIteration
-
-        anime_inf_to_print = self._anime_info_to_print[printed_anime_inf]
-        yield anime_inf_to_print 
-
-    def _add_elipsis(self, lines: list[str], max_lines: int):
-        line_count = len(lines)
-        if max_lines < line_count:
-            last_visible_line = max_lines - line_count - 1
-            last_line = lines[last_visible_line]
-            len_line = len(last_line)
-
-            if len_line + 3 < self._dflt_txt_spc:
-                lines[last_visible_line] = f"{last_line}..."
-                return
-
-            lines[last_visible_line] = f"{last_line[0:len_line - 4]} ..."
 
-    def _text_producer(self):
-        if len(self._printed_anime_inf) == len(self._anime_info_to_print):
+    def _text_lines(self) -> Iterator[str]:
+        """Release date and genres are pushed to the bottom of the cover."""
+        lines_yielded = 0
+        for info in self._anime_info_to_print:
+            if info["original_title"] == "release_date":
+                while lines_yielded < self._cover_height - 2:
+                    yield ""
+                    lines_yielded += 1
+            for line in self._get_content_lines(
+                info,
+                self.anime_inf[info["original_title"]],
+                self._dflt_txt_spc,
+                info["max_lines"]
+            ):
+                yield line
+                lines_yielded += 1
+        while True:
             yield ""
 
-        anime_info_to_print = next(self._get_next_anime_info())
-        if anime_info_to_print["original_title"] == "release_date":
-            if self._lines_printed < self._image_pixels.default_height - 2:
-                yield ""
-        content_lines = self._get_content_lines(
-            anime_info_to_print,
-            self.anime_inf[anime_info_to_print["original_title"]],
-            self._dflt_txt_spc
-        )
-        self._add_elipsis(content_lines, anime_info_to_print["max_lines"])
-        line = content_lines[self._curr_contet_printed_lines]
-        self._curr_contet_printed_lines += 1
-        if self._curr_contet_printed_lines == len(content_lines) or self._curr_contet_printed_lines == anime_info_to_print["max_lines"]:
-            self._printed_anime_inf.append(anime_info_to_print)
-            self._curr_contet_printed_lines = 0
-        yield line
-
+    @profiled("render.item")
     def render_info(self):
-        for pixel_line in self._image_pixels:
-            for r,g,b in pixel_line:
-                stdout.write(f"\033[38;2;{r};{g};{b}mo\033[0m")
-            stdout.write('|')
-            anime_info = next(self._text_producer())
-            stdout.write(anime_info)
-            stdout.write('\n')
-            self._lines_printed += 1
-        print('-' * self._terminal_columns)
+        frame = FrameBuilder(self._palette)
+        text_lines = self._text_lines()
+        cover_lines = iter(())
+        if self._image_pixels:
+            cover_lines = self._image_pixels.lines()
+        for _ in range(self._cover_height):
+            cover_line = next(cover_lines, None)
+            if cover_line:
+                frame.pixels(*cover_line)
+            else:
+                frame.text(" " * ImagePixels.default_width)
+            frame.line(f"|{next(text_lines)}")
+        frame.line('-' * self._terminal_columns)
+        frame.flush()
 
 class ListDisplayer(IDisplayer):
     name: str
@@ -268,3 +256,81 @@ class DBAnimeDisplayer(IDisplayer):
                 "Tag"
             ]
         ))
+
+class DBAnimeCoverDisplayer(IDisplayer):
+    anime: DTOAnime
+    image_pixels: Optional[ImagePixels]
+    palette: Optional[ColorPalette]
+
+    def __init__(
+        self,
+        anime: DTOAnime,
+        image_pixels: Optional[ImagePixels],
+        palette: Optional[ColorPalette] = None
+    ):
+        self.anime = anime
+        self.palette = palette
+        if image_pixels and palette:
+            image_pixels = palette.quantize(image_pixels)
+        self.image_pixels = image_pixels
+
+    def render_info(self):
+        terminal_columns = get_terminal_columns()
+        text_space = terminal_columns - ImagePixels.default_width - 1
+        lines = [
+            f"ID: {self.anime.id}",
+            f"Title: {self.anime.title}",
+            f"Tag: {self.anime.tag}",
+            f"Seasons: {self.anime.seasons}",
+            f"Watching season: {self.anime.watching_season or '-'}",
+            f"Last watched episode: {self.anime.last_watched_episode or '-'}",
+            f"Last watched at: {self.anime.last_watched_at or '-'}",
+        ]
+        pixel_lines = list(self.image_pixels.lines()) if self.image_pixels else []
+        frame = FrameBuilder(self.palette)
+        for n in range(max(len(pixel_lines), len(lines))):
+            if n < len(pixel_lines):
+                frame.pixels(*pixel_lines[n])
+            else:
+                frame.text(" " * ImagePixels.default_width)
+            frame.line(f"|{cut(lines[n], text_space)}" if n < len(lines) else "|")
+        frame.line('-' * terminal_columns)
+        frame.flush()
+
+class WatchHistoryDisplayer(IDisplayer):
+    events: list[DTOWatchEvent]
+
+    def __init__(self, events: list[DTOWatchEvent]):
+        self.events = events
+
+    def render_info(self):
+        print(tabulate(
+            [
+                [
+                    e.watched_at,
+                    e.anime_id,
+                    e.title,
+                    e.watching_season,
+                    e.last_watched_episode
+                ] for e in self.events
+            ],
+            headers=[
+                "Watched at",
+                "ID",
+                "Title",
+                "WS",
+                "LWEP"
+            ]
+        ))
+
+class WatchDaysDisplayer(IDisplayer):
+    watch_days: list[DTOWatchDay]
+
+    def __init__(self, watch_days: list[DTOWatchDay]):
+        self.watch_days = watch_days
+
+    def render_info(self):
+        print(tabulate(
+            [[d.day, d.events] for d in self.watch_days],
+            headers=["Day", "Updates"]
+        ))
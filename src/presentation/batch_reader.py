@@ -0,0 +1,155 @@
+import csv
+import json
+from typing import Iterable, Optional, TextIO
+
+from ..interfaces.database_interface import AnimeUpdate
+
+BatchUpdateFields = [
+    "anime_id",
+    "watching_season",
+    "last_watched_episode",
+    "tag_id"
+]
+
+class BatchUpdateReader():
+    """Reads update records from NDJSON or CSV, skipping invalid ones."""
+    updates: list[AnimeUpdate]
+    errors: list[str]
+    _valid_tags: Optional[set[int]]
+
+    def __init__(self, valid_tags: Optional[set[int]] = None):
+        self.updates = []
+        self.errors = []
+        self._valid_tags = valid_tags
+
+    def read(self, stream: TextIO) -> list[AnimeUpdate]:
+        first_line = ""
+        first_line_number = 0
+        for first_line in stream:
+            first_line_number += 1
+            if first_line.strip():
+                break
+
+        if not first_line.strip():
+            return self.updates
+
+        if first_line.lstrip().startswith("{"):
+            self._read_ndjson(first_line_number, first_line, stream)
+        else:
+            self._read_csv(first_line_number, first_line, stream)
+
+        return self.updates
+
+    def _read_ndjson(
+        self,
+        first_line_number: int,
+        first_line: str,
+        stream: TextIO
+    ):
+        self._parse_ndjson_line(first_line_number, first_line)
+        lines = enumerate(stream, start=first_line_number + 1)
+        for line_number, line in lines:
+            self._parse_ndjson_line(line_number, line)
+
+    def _parse_ndjson_line(self, line_number: int, line: str):
+        if not line.strip():
+            return
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            self.errors.append(f"line {line_number}: invalid JSON, {e.msg}")
+            return
+        if type(record) != dict:
+            self.errors.append(f"line {line_number}: expected an object")
+            return
+        self._add_record(line_number, record)
+
+    def _read_csv(
+        self,
+        header_line_number: int,
+        header_line: str,
+        stream: TextIO
+    ):
+        header = next(csv.reader([header_line]))
+        header = [h.strip() for h in header]
+        unknown_fields = set(header) - set(BatchUpdateFields)
+        if "anime_id" not in header or unknown_fields:
+            self.errors.append(
+                f"line {header_line_number}: CSV header must contain "
+                "anime_id and only "
+                f"{', '.join(BatchUpdateFields)}"
+            )
+            return
+
+        rows: Iterable[list[str]] = csv.reader(stream)
+        rows_start = header_line_number + 1
+        for line_number, row in enumerate(rows, start=rows_start):
+            if not row:
+                continue
+            if len(row) != len(header):
+                self.errors.append(
+                    f"line {line_number}: expected {len(header)} columns"
+                )
+                continue
+            record = {
+                field: value.strip() or None
+                for field, value in zip(header, row)
+            }
+            self._add_record(line_number, record)
+
+    def _add_record(self, line_number: int, record: dict):
+        unknown_fields = set(record) - set(BatchUpdateFields)
+        if unknown_fields:
+            self.errors.append(
+                f"line {line_number}: unknown fields "
+                f"{', '.join(sorted(unknown_fields))}"
+            )
+            return
+
+        values: dict[str, Optional[int]] = {}
+        for field in BatchUpdateFields:
+            value = record.get(field)
+            if value is None:
+                values[field] = None
+                continue
+            try:
+                if type(value) == bool or type(value) == float:
+                    raise ValueError
+                values[field] = int(value)
+            except (ValueError, TypeError):
+                self.errors.append(
+                    f"line {line_number}: {field} must be an integer"
+                )
+                return
+            if values[field] < 1:
+                self.errors.append(
+                    f"line {line_number}: {field} must be greater than 0"
+                )
+                return
+
+        anime_id = values["anime_id"]
+        if anime_id is None:
+            self.errors.append(f"line {line_number}: anime_id is required")
+            return
+
+        if all(values[f] is None for f in BatchUpdateFields[1:]):
+            self.errors.append(
+                f"line {line_number}: must provide watching_season, "
+                "last_watched_episode or tag_id"
+            )
+            return
+
+        tag_id = values["tag_id"]
+        if tag_id is not None and self._valid_tags is not None:
+            if tag_id not in self._valid_tags:
+                self.errors.append(
+                    f"line {line_number}: tag_id {tag_id} doesn't exist"
+                )
+                return
+
+        self.updates.append({
+            "anime_id": anime_id,
+            "watching_season": values["watching_season"],
+            "last_watched_episode": values["last_watched_episode"],
+            "tag_id": tag_id
+        })
@@ -2,6 +2,16 @@ from argparse import ArgumentParser
 import sys
 
 class DefaultArgumentParser():
+    # Seconds commands which go to the API get when --timeout is omitted.
+    _default_timeouts = {
+        "search": 15,
+        "genres": 10,
+        "add": 20,
+        "list": 15,
+        "refresh": 300,
+        "prefetch": 120
+    }
+
     def __init__(self):
         self._parser = self._init_parser()
 
@@ -11,7 +21,67 @@ class DefaultArgumentParser():
             description="CLI application to manage anime lists."
         )
 
-        subparsers = parser.add_subparsers()
+        parser.add_argument(
+            "--render-mode",
+            choices=["block", "half"],
+            default="block",
+            help="""How covers are drawn, 'block' uses one character per
+            pixel and 'half' packs two pixel rows per line with half block
+            characters, defaults to block."""
+        )
+
+        parser.add_argument(
+            "--color-depth",
+            choices=["auto", "truecolor", "256", "16"],
+            default="auto",
+            help="""Colors used to draw covers, 'auto' picks them from the
+            COLORTERM and TERM environment variables, defaults to auto."""
+        )
+
+        parser.add_argument(
+            "--format",
+            choices=["auto", "text", "json", "ndjson", "csv"],
+            default="auto",
+            help="""Output of search, list, history, genres and tags. The
+            text output draws covers, the other formats write the records
+            only, without downloading covers. 'auto' is text on a terminal
+            and ndjson otherwise, defaults to auto."""
+        )
+
+        parser.add_argument(
+            "--timeout",
+            type=float,
+            help="""Seconds the command may spend waiting for the API, once
+            they run out it shows what it has, like items without covers or
+            saved details. 0 waits forever. Defaults depend on the command,
+            from 10 seconds for genres to 300 for refresh."""
+        )
+
+        parser.add_argument(
+            "--metrics-file",
+            metavar="FILE",
+            help="""Write counters and histograms of API requests, caches,
+            database queries and rendering to FILE in the Prometheus text
+            format after the command. With the daemon they add up over all
+            the commands it ran."""
+        )
+
+        parser.add_argument(
+            "--profile",
+            action="store_true",
+            help="""Print how long each stage of the command took, like API
+            requests, cover downloads, decoding, layout and terminal
+            writes, to stderr once it is done."""
+        )
+
+        parser.add_argument(
+            "--profile-trace",
+            metavar="FILE",
+            help="""Profile like --profile and also save the stages to FILE
+            as a Chrome trace, which shows which ones ran concurrently."""
+        )
+
+        subparsers = parser.add_subparsers(dest="command")
 
         search_parser = subparsers.add_parser(
             "search",
@@ -41,6 +111,12 @@ class DefaultArgumentParser():
             default="",
             help="Filter animes wich have NAME in the title."
         )
+        search_parser.add_argument(
+            "-cd",
+            "--cover-deadline",
+            type=float,
+            help="Seconds to wait for covers, items whose cover isn't ready by then are shown without it."
+        )
 
         list_parser = subparsers.add_parser(
             "list",
@@ -57,6 +133,30 @@ class DefaultArgumentParser():
             type=str,
             help="Filter animes which have NAME in the title"
         )
+        list_parser.add_argument(
+            "-g",
+            "--genres",
+            type=str,
+            help="Receive a comma separated list of genres, only animes with all of them are listed."
+        )
+        list_parser.add_argument(
+            "-c",
+            "--covers",
+            action="store_true",
+            help="Display the animes with the covers saved when they were added or refreshed."
+        )
+        list_parser.add_argument(
+            "-d",
+            "--details",
+            action="store_true",
+            help="With -id, display the anime details saved when it was added, refreshing them from the API when stale."
+        )
+        list_parser.add_argument(
+            "--max-age",
+            type=int,
+            default=7,
+            help="Number of days after which saved details are stale, defaults to 7."
+        )
 
         add_parser = subparsers.add_parser(
             "add",
@@ -105,9 +205,11 @@ class DefaultArgumentParser():
             "update",
             help="Updates the specified anime_id information."
         )
+        self._update_parser = update_parser
         update_parser.add_argument(
                 "anime_id",
-                type=int
+                type=int,
+                nargs="?"
         )
         update_parser.add_argument(
             "-us",
@@ -128,6 +230,89 @@ class DefaultArgumentParser():
             type=int,
             help="Update the tag of the anime"
         )
+        update_parser.add_argument(
+            "-b",
+            "--batch",
+            nargs="?",
+            const="-",
+            metavar="FILE",
+            help="""Apply many updates read from FILE, or stdin when FILE is
+            omitted or '-'. Records are NDJSON objects or CSV rows with a
+            header, fields: anime_id, watching_season, last_watched_episode
+            and tag_id."""
+        )
+
+        history_parser = subparsers.add_parser(
+            "history",
+            help="Display the watch history of the animes in your list."
+        )
+        history_parser.add_argument(
+            "-id",
+            type=int,
+            help="Only show the history of the anime with this id"
+        )
+        history_parser.add_argument(
+            "-l",
+            "--limit",
+            type=int,
+            default=20,
+            help="Number of recent events to show, defaults to 20."
+        )
+        history_parser.add_argument(
+            "-d",
+            "--days",
+            type=int,
+            help="Show how many progress updates were recorded per day in the last DAYS days instead."
+        )
+
+        refresh_parser = subparsers.add_parser(
+            "refresh",
+            help="Refresh the information of the animes in your list which changed on the API since the last refresh."
+        )
+        refresh_parser.add_argument(
+            "-f",
+            "--full",
+            action="store_true",
+            help="Refresh every anime in your list, not only the changed ones."
+        )
+
+        prefetch_parser = subparsers.add_parser(
+            "prefetch",
+            help="Save the first pages of search results and their covers, so search shows them right away."
+        )
+        prefetch_parser.add_argument(
+            "-p",
+            "--pages",
+            type=int,
+            default=3,
+            help="Number of pages to save, defaults to 3."
+        )
+        prefetch_parser.add_argument(
+            "-g",
+            "--genres",
+            default="",
+            help="Receive a comma separated list of genres, like in search."
+        )
+
+        shell_parser = subparsers.add_parser(
+            "shell",
+            help="Run commands at a prompt in one process, which keeps connections and fetched results between them and adds next and prev to page through a search."
+        )
+        shell_parser.add_argument(
+            "--metrics-port",
+            type=int,
+            help="Serve the metrics at http://127.0.0.1:PORT/metrics while the shell runs."
+        )
+
+        daemon_parser = subparsers.add_parser(
+            "daemon",
+            help="Serve commands to the other invocations in this directory, which then share its connections, caches and database writer. Stops with Ctrl-C or SIGTERM."
+        )
+        daemon_parser.add_argument(
+            "--metrics-port",
+            type=int,
+            help="Serve the metrics at http://127.0.0.1:PORT/metrics while the daemon runs."
+        )
 
         subparsers.add_parser(
             "genres",
@@ -149,9 +334,29 @@ class DefaultArgumentParser():
             self._parser.parse_args(["-h"])
 
         options = self._parser.parse_args(args)
-        options.command = args[0]
-        
-        if options.command == "update":
+        if options.command == None:
+            self._parser.parse_args(["-h"])
+
+        if options.timeout == None:
+            options.timeout = self._default_timeouts.get(options.command)
+
+        if options.command == "update" and options.batch != None:
+            single_update = (
+                options.anime_id,
+                options.update_seasons,
+                options.update_episodes,
+                options.update_tag
+            )
+            if any(option != None for option in single_update):
+                self._update_parser.error(
+                    "--batch can't be combined with anime_id or the -us, -ue and -ut options"
+                )
+
+        if options.command == "update" and options.batch == None:
+            if options.anime_id == None:
+                self._update_parser.error(
+                    "the following arguments are required: anime_id"
+                )
             if options.update_seasons == None and options.update_episodes == None and options.update_tag == None:
                 try: 
                     self._parser.parse_args(["update", "-h"])
@@ -0,0 +1,98 @@
+import os
+from functools import lru_cache
+from typing import Literal, Mapping, Optional
+
+from PIL import Image
+
+from .image_builder import ImagePixels
+
+ColorDepth = Literal["truecolor", "256", "16"]
+
+# xterm defaults, terminals are free to change them.
+_ansi_colors = [
+    (0, 0, 0), (205, 0, 0), (0, 205, 0), (205, 205, 0),
+    (0, 0, 238), (205, 0, 205), (0, 205, 205), (229, 229, 229),
+    (127, 127, 127), (255, 0, 0), (0, 255, 0), (255, 255, 0),
+    (92, 92, 255), (255, 0, 255), (0, 255, 255), (255, 255, 255)
+]
+
+_cube_levels = [0, 95, 135, 175, 215, 255]
+
+class ColorPalette():
+    """Escapes are built once per palette index, a pixel is a lookup."""
+    depth: ColorDepth
+    colors: list[tuple[int, int, int]]
+    foreground: list[str]
+    background: list[str]
+    foreground_params: list[str]
+    background_params: list[str]
+    _palette_image: Image.Image
+
+    def __init__(self, depth: ColorDepth):
+        self.depth = depth
+        if depth == "256":
+            # The 16 first colors are left out, they depend on the theme.
+            self.colors = [
+                (r, g, b)
+                for r in _cube_levels
+                for g in _cube_levels
+                for b in _cube_levels
+            ] + [(8 + 10 * n,) * 3 for n in range(24)]
+            self.foreground_params = [
+                f"38;5;{16 + n}" for n in range(len(self.colors))
+            ]
+            self.background_params = [
+                f"48;5;{16 + n}" for n in range(len(self.colors))
+            ]
+        elif depth == "16":
+            self.colors = _ansi_colors
+            self.foreground_params = [
+                str(30 + n if n < 8 else 82 + n) for n in range(16)
+            ]
+            self.background_params = [
+                str(40 + n if n < 8 else 92 + n) for n in range(16)
+            ]
+        else:
+            raise ValueError(f"{depth} colors don't need a palette")
+
+        self.foreground = [f"\033[{p}m" for p in self.foreground_params]
+        self.background = [f"\033[{p}m" for p in self.background_params]
+        self._palette_image = Image.new("P", (1, 1))
+        self._palette_image.putpalette(
+            [channel for color in self.colors for channel in color]
+        )
+
+    def quantize(self, image_pixels: ImagePixels) -> ImagePixels:
+        if image_pixels.indexed or not len(image_pixels):
+            return image_pixels
+
+        image = Image.frombytes(
+            "RGB",
+            (ImagePixels.default_width, image_pixels.row_count),
+            bytes(image_pixels.image_pixels)
+        )
+        indexes = image.quantize(
+            palette=self._palette_image,
+            dither=Image.Dither.NONE
+        ).tobytes()
+        return ImagePixels(
+            indexes,
+            image_pixels.default_height,
+            image_pixels.half_block,
+            indexed=True
+        )
+
+def detect_color_depth(environ: Optional[Mapping[str, str]] = None) -> ColorDepth:
+    environ = os.environ if environ == None else environ
+    if environ.get("COLORTERM", "").lower() in ("truecolor", "24bit"):
+        return "truecolor"
+    if "256color" in environ.get("TERM", ""):
+        return "256"
+    return "16"
+
+@lru_cache
+def get_palette(depth: ColorDepth) -> Optional[ColorPalette]:
+    """None for truecolor, pixels are drawn with their own color."""
+    if depth == "truecolor":
+        return None
+    return ColorPalette(depth)
@@ -0,0 +1,196 @@
+import asyncio
+import contextvars
+import json
+import sys
+from argparse import Namespace
+from concurrent.futures import Executor
+from typing import Callable, Optional
+
+from tabulate import tabulate
+
+from .controller import Controller
+from .record_writer import OutputFormat, resolve_output_format
+from ..utils.deadline import run_with_deadline
+from ..utils.metrics import registry
+from ..utils.profiler import Profiler, set_profiler, span
+
+async def dispatch_command(
+    controller: Controller,
+    namespace: Namespace,
+    db_executor: Optional[Executor] = None
+) -> Optional[int]:
+    """Returns the page count of a search."""
+    output_format = resolve_output_format(
+        namespace.format,
+        sys.stdout.isatty()
+    )
+    if namespace.metrics_file:
+        registry.enabled = True
+    profiler = None
+    if namespace.profile or namespace.profile_trace:
+        profiler = Profiler()
+        set_profiler(profiler)
+
+    try:
+        with span(f"command {namespace.command}"):
+            return await _run_command(
+                controller,
+                namespace,
+                output_format,
+                db_executor
+            )
+    finally:
+        if profiler:
+            set_profiler(None)
+            _report_profile(profiler, namespace.profile_trace)
+        if namespace.metrics_file:
+            try:
+                registry.write(namespace.metrics_file)
+            except OSError as e:
+                print(f"Error saving the metrics: {e}", file=sys.stderr)
+
+def _report_profile(profiler: Profiler, trace_path: Optional[str]):
+    print(
+        tabulate(
+            profiler.summary(),
+            headers=["Stage", "Calls", "Total ms", "Mean ms", "Max ms"],
+            floatfmt=".1f"
+        ),
+        file=sys.stderr
+    )
+    if not trace_path:
+        return
+    try:
+        with open(trace_path, "w") as f:
+            json.dump(profiler.chrome_trace(), f)
+        print(f"Trace saved to {trace_path}", file=sys.stderr)
+    except OSError as e:
+        print(f"Error saving the trace: {e}", file=sys.stderr)
+
+async def _run_command(
+    controller: Controller,
+    namespace: Namespace,
+    output_format: OutputFormat,
+    db_executor: Optional[Executor]
+) -> Optional[int]:
+    async def run(coroutine):
+        return await run_with_deadline(coroutine, namespace.timeout)
+
+    async def run_db(function: Callable, *args):
+        if not db_executor:
+            function(*args)
+            return
+        # Copied so the command still writes to the output of its caller.
+        context = contextvars.copy_context()
+        await asyncio.get_running_loop().run_in_executor(
+            db_executor,
+            context.run,
+            function,
+            *args
+        )
+
+    match namespace.command:
+        case 'search':
+            if namespace.id:
+                await run(
+                    controller.service_get_anime_details(
+                        namespace.id,
+                        output_format
+                    )
+                )
+            elif namespace.name:
+                return await run(
+                    controller.service_list_animes_by_name(
+                        namespace.name,
+                        namespace.page,
+                        namespace.genres,
+                        namespace.cover_deadline,
+                        output_format
+                    )
+                )
+            else:
+                return await run(
+                    controller.service_list_animes(
+                        namespace.page,
+                        namespace.genres,
+                        namespace.cover_deadline,
+                        output_format
+                    )
+                )
+        case "prefetch":
+            await run(
+                controller.service_prefetch_animes(
+                    namespace.pages,
+                    namespace.genres
+                )
+            )
+        case "genres":
+            await run(controller.service_get_genres(output_format))
+        case "tags":
+            await run_db(controller.db_list_tags, output_format)
+        case "add":
+            await run(
+                controller.sdb_create_anime(
+                    namespace.anime_id,
+                    namespace.tag_id,
+                    namespace.watching_season,
+                    namespace.last_watched_episode,
+                    namespace.last_watched_at
+                )
+            )
+        case "remove":
+            await run_db(controller.db_delete_anime, namespace.anime_id)
+        case "update":
+            if namespace.batch:
+                await run_db(controller.db_bulk_update_animes, namespace.batch)
+            else:
+                await run_db(
+                    controller.db_update_anime,
+                    namespace.anime_id,
+                    namespace.update_seasons,
+                    namespace.update_episodes,
+                    namespace.update_tag
+                )
+        case "refresh":
+            await run(controller.sdb_refresh_animes(namespace.full))
+        case "history":
+            if namespace.days:
+                await run_db(
+                    controller.db_count_watch_days,
+                    namespace.days,
+                    namespace.id,
+                    output_format
+                )
+            else:
+                await run_db(
+                    controller.db_list_watch_history,
+                    namespace.limit,
+                    namespace.id,
+                    output_format
+                )
+        case "list":
+            if namespace.id and namespace.details:
+                await run(
+                    controller.sdb_get_anime_details(
+                        namespace.id,
+                        namespace.max_age,
+                        output_format
+                    )
+                )
+            elif namespace.id:
+                await run_db(
+                    controller.db_get_anime,
+                    namespace.id,
+                    output_format
+                )
+            else:
+                await run_db(
+                    controller.db_list_animes,
+                    namespace.name,
+                    namespace.genres,
+                    namespace.covers,
+                    output_format
+                )
+        case _:
+            print("Command doesn't exist")
+    return None
@@ -1,48 +1,165 @@
 import asyncio
-from datetime import date
-from typing import Optional
-from aiohttp import ClientSession
+import sys
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta
+from typing import AsyncIterator, Optional
+from aiohttp import ClientError, ClientSession
 
 from ..interfaces.database_interface import IDatabase
+from ..interfaces.displayer_interface import AnimeDetailedInfo
 
-from ..presentation.anime_info_displayers import AnimeDetailedItemDisplayer, AnimeListItemDisplayer, DBAnimeDisplayer, ListDisplayer
+from ..presentation.anime_info_displayers import AnimeDetailedItemDisplayer, AnimeListItemDisplayer, DBAnimeCoverDisplayer, DBAnimeDisplayer, ListDisplayer, WatchDaysDisplayer, WatchHistoryDisplayer
 
-from ..presentation.image_builder import ImageBuilder
+from ..presentation.batch_reader import BatchUpdateReader
+from ..presentation.color_palette import ColorPalette
+from ..presentation.image_builder import ImageBuilder, ImagePixels
+from ..presentation.record_writer import OutputFormat, RecordWriter, to_record
 
-from ..utils.exceptions import DefaultException
-from ..interfaces.movie_service_interface import IService
+from ..services.cover_atlas import CoverAtlas
+from ..utils.request_priority import RequestPriority
+
+from ..utils.metrics import cache_requests
+from ..utils.profiler import span
+from ..utils.exceptions import DeadlineExceeded, DefaultException, ServiceUnavailable
+from ..interfaces.movie_service_interface import AnimeListReturn, IService
 
 class Controller:
+    # TMDB only reports changes of the last 14 days.
+    _max_changes_window = timedelta(days=14)
+    _refresh_concurrency = 8
+    # Discover pages search saves and serves locally, refreshing them in
+    # the background once they are older than the max age.
+    _discover_snapshot_pages = 3
+    _discover_snapshot_max_age = timedelta(hours=6)
     service: IService
     image_builder: ImageBuilder
     db: IDatabase
+    cover_atlas: Optional[CoverAtlas]
+    palette: Optional[ColorPalette]
+    _session: Optional[ClientSession]
 
-    def __init__(self, service: IService, db: IDatabase):
+    def __init__(
+        self,
+        service: IService,
+        db: IDatabase,
+        image_builder: Optional[ImageBuilder] = None,
+        cover_atlas: Optional[CoverAtlas] = None,
+        palette: Optional[ColorPalette] = None
+    ):
+        """Covers are drawn in truecolor unless a palette is given."""
         self.service = service
-        self.image_builder = ImageBuilder()
+        self.image_builder = image_builder or ImageBuilder()
         self.db = db
+        self.cover_atlas = cover_atlas
+        self.palette = palette
+        self._session = None
+
+    @asynccontextmanager
+    async def keep_session(
+        self,
+        session: Optional[ClientSession] = None
+    ) -> AsyncIterator[None]:
+        """Commands run inside share one session, a given one is left open."""
+        if session:
+            self._session = session
+            try:
+                yield
+            finally:
+                self._session = None
+            return
+        async with ClientSession() as session:
+            async with self.keep_session(session):
+                yield
+
+    @asynccontextmanager
+    async def _client_session(self) -> AsyncIterator[ClientSession]:
+        if self._session:
+            yield self._session
+            return
+        async with ClientSession() as session:
+            yield session
 
-    def db_get_anime(self, anime_id: int):
+    def db_get_anime(self, anime_id: int, output_format: OutputFormat = "text"):
         anime = self.db.get_anime_by_id(anime_id)
         
         if anime == None:
-            print(f"Anime ID: {anime_id} doesn't exist.")
+            self._print_error(
+                f"Anime ID: {anime_id} doesn't exist.",
+                output_format
+            )
+            return
+
+        if output_format != "text":
+            RecordWriter(output_format).write_one(anime)
             return
 
         d = DBAnimeDisplayer([anime])
         d.render_info()
 
-    def db_list_animes(self, name: Optional[str]):
+    def db_list_animes(
+        self,
+        name: Optional[str],
+        genres: Optional[str],
+        covers: bool = False,
+        output_format: OutputFormat = "text"
+    ):
         animes = []
-        if name:
+        if genres:
+            animes = self.db.select_animes_by_genres(genres.split(","), name)
+        elif name:
             animes = self.db.select_animes_by_title(name)
         else:
             animes = self.db.get_animes()
-        d = DBAnimeDisplayer(animes)
+
+        if output_format != "text":
+            RecordWriter(output_format).write_all(animes)
+            return
+
+        if not covers:
+            d = DBAnimeDisplayer(animes)
+            d.render_info()
+            return
+
+        for anime in animes:
+            d = DBAnimeCoverDisplayer(
+                anime,
+                self._get_stored_cover(anime.id),
+                self.palette
+            )
+            d.render_info()
+
+    def db_list_watch_history(
+        self,
+        limit: int,
+        anime_id: Optional[int],
+        output_format: OutputFormat = "text"
+    ):
+        events = self.db.get_watch_history(limit, anime_id)
+        if output_format != "text":
+            RecordWriter(output_format).write_all(events)
+            return
+        d = WatchHistoryDisplayer(events)
+        d.render_info()
+
+    def db_count_watch_days(
+        self,
+        days: int,
+        anime_id: Optional[int],
+        output_format: OutputFormat = "text"
+    ):
+        since = date.today() - timedelta(days=days - 1)
+        watch_days = self.db.count_watch_events_per_day(since, anime_id)
+        if output_format != "text":
+            RecordWriter(output_format).write_all(watch_days)
+            return
+        d = WatchDaysDisplayer(watch_days)
         d.render_info()
 
-    def db_list_tags(self):
+    def db_list_tags(self, output_format: OutputFormat = "text"):
         tags = self.db.select_all_tags()
+        if output_format != "text":
+            RecordWriter(output_format).write_all(tags)
+            return
         d = ListDisplayer(
             "Tags",
             [f"id: {t.id}, name: {t.name}" for t in tags]
@@ -51,6 +168,8 @@ class Controller:
 
     def db_delete_anime(self, anime_id: int):
         anime = self.db.delete_anime(anime_id)
+        if anime and self.cover_atlas:
+            self.cover_atlas.delete(anime_id)
         if anime:
             print(f"Anime: {anime.title} deleted.")
             return
@@ -75,6 +194,31 @@ class Controller:
         print(f"Anime ID: {anime_id} doesn't exist.")
         pass
 
+    def db_bulk_update_animes(self, source: str):
+        reader = BatchUpdateReader(
+            {t.id for t in self.db.select_all_tags()}
+        )
+        try:
+            if source == "-":
+                updates = reader.read(sys.stdin)
+            else:
+                with open(source, newline="") as f:
+                    updates = reader.read(f)
+        except OSError as e:
+            print(f"Error: {e}")
+            return
+
+        for error in reader.errors:
+            print(f"Skipped {error}")
+
+        missing_ids = self.db.bulk_update_animes(updates)
+        print(f"{len(updates) - len(missing_ids)} animes updated.")
+        if missing_ids:
+            print(
+                "Anime IDs which don't exist: "
+                f"{', '.join(str(i) for i in missing_ids)}"
+            )
+
     async def sdb_create_anime(
         self,
         anime_id: int,
@@ -83,7 +227,11 @@ class Controller:
         last_watched_episode: Optional[int],
         last_watched_at: Optional[str]
     ):
-        async with ClientSession() as session:
+        async with self._client_session() as session:
+            await self.service.configure_images(
+                session,
+                ImagePixels.default_width
+            )
             try:
                 db_anime = self.db.get_anime_by_tmdb_id(anime_id)
                 if db_anime:
@@ -106,84 +254,461 @@ class Controller:
                     last_watched_episode=last_watched_episode,
                     last_watched_at=lwa,
                     title=anime["title"],
-                    tag_id=tag_id
+                    tag_id=tag_id,
+                    genres=anime["genres"],
+                    # Stale details are fetched again when listed.
+                    details=None if anime.get("stale") else anime
                 )
 
+                if anime_dbid:
+                    await self._store_cover(
+                        session,
+                        anime_dbid,
+                        anime["cover_url"]
+                    )
+
                 print(f'Anime created, id: {anime_dbid}')
             except ValueError as e:
                 print(f"Error: {e.args[0]}.")
                 print("Date must be in the format YYYY-MM-DD")
-            except DefaultException as e:
+            except (DefaultException, ClientError) as e:
                 print(f'Error: {e}')
 
-    async def service_get_genres(self):
-        async with ClientSession() as session:
+    async def sdb_get_anime_details(
+        self,
+        anime_id: int,
+        max_age: int,
+        output_format: OutputFormat = "text"
+    ):
+        anime = self.db.get_anime_by_id(anime_id)
+        if anime == None:
+            self._print_error(
+                f"Anime ID: {anime_id} doesn't exist.",
+                output_format
+            )
+            return
+
+        async with self._client_session() as session:
+            if output_format == "text":
+                await self.service.configure_images(
+                    session,
+                    ImagePixels.default_width
+                )
+            anime_details = self.db.get_anime_details(anime_id)
+            details = anime_details.details if anime_details else None
+            stale_at = datetime.now() - timedelta(days=max_age)
+            if not anime_details or anime_details.fetched_at < stale_at:
+                try:
+                    fetched = await self.service.get_anime_details(
+                        session,
+                        anime.anime_tmdb_id
+                    )
+                    if not fetched.get("stale"):
+                        self.db.save_anime_details(anime_id, fetched)
+                        details = fetched
+                    elif details:
+                        details["stale"] = True
+                    else:
+                        details = fetched
+                except (DefaultException, ClientError) as e:
+                    if not details:
+                        self._print_error(f"Error {e}", output_format)
+                        return
+                    details["stale"] = True
+
+            if output_format != "text":
+                RecordWriter(output_format).write_one(
+                    {**to_record(anime), "details": details}
+                )
+                return
+
+            image = await self._get_cover(session, details["cover_url"])
+            if image == None:
+                image = self._get_stored_cover(anime_id)
+
+        DBAnimeDisplayer([anime]).render_info()
+        d = AnimeDetailedItemDisplayer(details, image, self.palette)
+        d.render_info()
+
+    async def sdb_refresh_animes(self, full: bool):
+        started_at = datetime.now()
+        watermark = self.db.get_sync_watermark("anime_details")
+
+        async with self._client_session() as session:
+            await self.service.configure_images(
+                session,
+                ImagePixels.default_width
+            )
+            try:
+                if full or not watermark or started_at - watermark > self._max_changes_window:
+                    animes = self.db.get_animes()
+                else:
+                    changed_ids = await self.service.get_changed_anime_ids(
+                        session,
+                        watermark.date(),
+                        started_at.date()
+                    )
+                    animes = self.db.get_animes_by_tmdb_ids(changed_ids)
+            except (DefaultException, ClientError) as e:
+                print(f"Error {e}")
+                return
+
+            # The service paces these, through its scheduler and rate limit.
+            results = await asyncio.gather(
+                *[
+                    self.service.get_anime_details(session, a.anime_tmdb_id)
+                    for a in animes
+                ],
+                return_exceptions=True
+            )
+
+            details: list[AnimeDetailedInfo] = []
+            covers: list[tuple[int, str]] = []
+            timed_out = 0
+            unavailable = 0
+            for anime, result in zip(animes, results):
+                if isinstance(result, DeadlineExceeded):
+                    timed_out += 1
+                elif isinstance(result, ServiceUnavailable):
+                    unavailable += 1
+                elif isinstance(result, dict) and result.get("stale"):
+                    unavailable += 1
+                elif isinstance(result, (DefaultException, ClientError)):
+                    print(f"Error refreshing anime ID {anime.id}: {result}")
+                elif isinstance(result, BaseException):
+                    raise result
+                else:
+                    details.append(result)
+                    covers.append((anime.id, result["cover_url"]))
+
+            refreshed = self.db.bulk_refresh_animes(details)
+            if len(details) == len(animes):
+                self.db.set_sync_watermark("anime_details", started_at)
+            if unavailable:
+                print(
+                    f"TMDB is unavailable, {unavailable} animes weren't "
+                    "refreshed, run refresh again later to refresh them."
+                )
+            if timed_out:
+                print(
+                    f"Ran out of time, {timed_out} animes weren't refreshed, "
+                    "run refresh again to refresh them."
+                )
+
+            semaphore = asyncio.Semaphore(self._refresh_concurrency)
+
+            async def store_cover(anime_id: int, cover_url: str):
+                async with semaphore:
+                    await self._store_cover(session, anime_id, cover_url)
+
+            await asyncio.gather(*[
+                store_cover(anime_id, cover_url)
+                for anime_id, cover_url in covers
+            ])
+        print(f"{refreshed} animes refreshed.")
+
+    async def _store_cover(
+        self,
+        session: ClientSession,
+        anime_id: int,
+        cover_url: str
+    ):
+        if not self.cover_atlas:
+            return
+        image = await self._get_cover(session, cover_url)
+        if image == None:
+            return
+        self.cover_atlas.put(
+            anime_id,
+            bytes(image.image_pixels),
+            image.row_count,
+            image.half_block
+        )
+
+    async def _get_cover(
+        self,
+        session: ClientSession,
+        cover_url: str
+    ) -> Optional[ImagePixels]:
+        """None when the cover can't be downloaded or decoded in time."""
+        try:
+            return await self.image_builder.produce_ascii_image(
+                session,
+                cover_url
+            )
+        except (ClientError, OSError):
+            # TimeoutError and Pillow decoding errors are OSErrors.
+            return None
+
+    def _get_stored_cover(self, anime_id: int) -> Optional[ImagePixels]:
+        if not self.cover_atlas:
+            return None
+        stored_cover = self.cover_atlas.get(anime_id)
+        if not stored_cover:
+            return None
+        pixels, rows, half_block = stored_cover
+        lines = rows // 2 if half_block else rows
+        return ImagePixels(pixels, lines, half_block)
+
+    async def service_get_genres(self, output_format: OutputFormat = "text"):
+        async with self._client_session() as session:
             try:
                 genres = await self.service.get_genres_list(session)
+                if output_format != "text":
+                    RecordWriter(output_format).write_all(genres)
+                    return
                 d = ListDisplayer(
                     "Genres",
                     [genre["name"] for genre in genres]
                 )
                 d.render_info()
-            except DefaultException as e:
-                print(f"Error {e}")
+            except (DefaultException, ClientError) as e:
+                self._print_error(f"Error {e}", output_format)
 
-    async def service_get_anime_details(self, id: int):
-        async with ClientSession() as session:
+    async def service_get_anime_details(
+        self,
+        id: int,
+        output_format: OutputFormat = "text"
+    ):
+        async with self._client_session() as session:
+            if output_format == "text":
+                await self.service.configure_images(
+                    session,
+                    ImagePixels.default_width
+                )
             try:
                 anime_details = await self.service.get_anime_details(
                     session,
                     id
                 )
-                image = await self.image_builder.produce_ascii_image(
+                if output_format != "text":
+                    RecordWriter(output_format).write_one(anime_details)
+                    return
+                image = await self._get_cover(
                     session,
                     anime_details["cover_url"]
                 )
                 d = AnimeDetailedItemDisplayer(
                     anime_details,
-                    image
+                    image,
+                    self.palette
                 )
                 d.render_info()
-            except DefaultException as e:
-                print(f"Error {e}")
+            except (DefaultException, ClientError) as e:
+                self._print_error(f"Error {e}", output_format)
 
-    async def service_list_animes(self, page: int, genres_filter: str):
-        async with ClientSession() as session:
-            try:
-                anime_list = await self.service.get_anime_list(
+    async def service_list_animes(
+        self,
+        page: int,
+        genres_filter: str,
+        cover_deadline: Optional[float] = None,
+        output_format: OutputFormat = "text"
+    ) -> Optional[int]:
+        """Returns the number of pages, None when none could be shown."""
+        async with self._client_session() as session:
+            if output_format == "text":
+                await self.service.configure_images(
                     session,
-                    page,
-                    genres_filter
+                    ImagePixels.default_width
+                )
+            try:
+                snapshot = self.db.get_discover_snapshot(
+                    self._discover_key(genres_filter),
+                    page
                 )
-                ascii_images_coroutines = [
-                    self.image_builder.produce_ascii_image(
+                if not snapshot:
+                    cache_requests.inc(cache="discover_snapshot", result="miss")
+                    anime_list = await self._fetch_discover_page(
                         session,
-                        anime["cover_url"]
-                    ) for anime in anime_list["anime_list"]
-                ]
-                
-                anime_ascii_images = await asyncio.gather(
-                    *ascii_images_coroutines
-                )
-
-                print(f'Page: {anime_list["page"]} of {anime_list["total_pages"]}')
-                for n in range(len(anime_list["anime_list"])):
-                    d = AnimeListItemDisplayer(
-                            anime_list["anime_list"][n],
-                            anime_ascii_images[n],
+                        page,
+                        genres_filter,
+                        page <= self._discover_snapshot_pages
+                    )
+                    await self._render_anime_list(
+                        session,
+                        anime_list,
+                        cover_deadline,
+                        output_format
+                    )
+                    return anime_list["total_pages"]
+
+                age = datetime.now() - snapshot.fetched_at
+                revalidation = None
+                cache_requests.inc(
+                    cache="discover_snapshot",
+                    result="stale" if age > self._discover_snapshot_max_age
+                    else "hit"
+                )
+                if age > self._discover_snapshot_max_age:
+                    revalidation = asyncio.create_task(
+                        self._fetch_discover_page(session, page, genres_filter)
+                    )
+                try:
+                    await self._render_anime_list(
+                        session,
+                        snapshot.anime_list,
+                        cover_deadline,
+                        output_format
+                    )
+                except BaseException:
+                    if revalidation:
+                        revalidation.cancel()
+                        await asyncio.wait([revalidation])
+                        if not revalidation.cancelled():
+                            # Retrieved, so it isn't logged as unhandled.
+                            revalidation.exception()
+                    raise
+                if revalidation:
+                    try:
+                        await revalidation
+                    except (DefaultException, ClientError):
+                        # The saved page was shown, retried next time.
+                        pass
+                return snapshot.anime_list["total_pages"]
+            except (DefaultException, ClientError) as e:
+                self._print_error(f"Error {e}", output_format)
+                return None
+
+    async def service_prefetch_animes(self, pages: int, genres_filter: str):
+        """Saves the first discover pages and downloads their covers."""
+        async with self._client_session() as session:
+            await self.service.configure_images(
+                session,
+                ImagePixels.default_width
+            )
+            results = await asyncio.gather(
+                *[
+                    self._fetch_discover_page(
+                        session,
+                        page,
+                        genres_filter,
+                        priority=RequestPriority.PREFETCH
+                    )
+                    for page in range(1, pages + 1)
+                ],
+                return_exceptions=True
+            )
+            cover_urls: list[str] = []
+            for page, result in enumerate(results, start=1):
+                if isinstance(result, (DefaultException, ClientError)):
+                    print(f"Error prefetching page {page}: {result}")
+                elif isinstance(result, BaseException):
+                    raise result
+                else:
+                    cover_urls += [
+                        anime["cover_url"] for anime in result["anime_list"]
+                    ]
+
+            downloaded = await asyncio.gather(
+                *[
+                    self.image_builder.prefetch_image(session, cover_url)
+                    for cover_url in cover_urls
+                ],
+                return_exceptions=True
+            )
+        saved_pages = sum(
+            1 for r in results if not isinstance(r, BaseException)
+        )
+        print(
+            f"{saved_pages} pages saved, "
+            f"{sum(1 for d in downloaded if d is True)} covers downloaded."
+        )
+
+    async def service_prefetch_page(
+        self,
+        page: int,
+        name: str,
+        genres_filter: str
+    ):
+        """Errors are left for when the page is shown."""
+        async with self._client_session() as session:
+            try:
+                if name:
+                    anime_list = await self.service.get_anime_list_by_name(
+                        session,
+                        name,
+                        page,
+                        genres_filter,
+                        RequestPriority.PREFETCH
+                    )
+                else:
+                    snapshot = self.db.get_discover_snapshot(
+                        self._discover_key(genres_filter),
+                        page
+                    )
+                    if snapshot:
+                        anime_list = snapshot.anime_list
+                    else:
+                        anime_list = await self._fetch_discover_page(
+                            session,
+                            page,
+                            genres_filter,
+                            page <= self._discover_snapshot_pages,
+                            RequestPriority.PREFETCH
                         )
-                    d.render_info()
-                print(f'Page: {anime_list["page"]} of {anime_list["total_pages"]}')
-            except DefaultException as e:
-                print(f"Error {e}")
+            except (DefaultException, ClientError):
+                return
+
+            await asyncio.gather(
+                *[
+                    self.image_builder.prefetch_image(
+                        session,
+                        anime["cover_url"]
+                    )
+                    for anime in anime_list["anime_list"]
+                ],
+                return_exceptions=True
+            )
+
+    async def _fetch_discover_page(
+        self,
+        session: ClientSession,
+        page: int,
+        genres_filter: str,
+        save: bool = True,
+        priority: RequestPriority = RequestPriority.METADATA
+    ) -> AnimeListReturn:
+        anime_list = await self.service.get_anime_list(
+            session,
+            page,
+            genres_filter,
+            priority
+        )
+        if save and not anime_list.get("stale"):
+            self.db.save_discover_snapshot(
+                self._discover_key(genres_filter),
+                page,
+                anime_list
+            )
+        return anime_list
+
+    @staticmethod
+    def _print_error(message: str, output_format: OutputFormat):
+        print(message, file=sys.stdout if output_format == "text" else sys.stderr)
+
+    @staticmethod
+    def _discover_key(genres_filter: str) -> str:
+        return ",".join(sorted(
+            genre.strip().lower()
+            for genre in genres_filter.split(",")
+            if genre.strip()
+        ))
 
     async def service_list_animes_by_name(
         self,
         name: str,
         page: int,
-        genres_filter: str
-    ):
-        async with ClientSession() as session:
+        genres_filter: str,
+        cover_deadline: Optional[float] = None,
+        output_format: OutputFormat = "text"
+    ) -> Optional[int]:
+        """Returns the number of pages, None when none could be shown."""
+        async with self._client_session() as session:
+            if output_format == "text":
+                await self.service.configure_images(
+                    session,
+                    ImagePixels.default_width
+                )
             try:
                 anime_list = await self.service.get_anime_list_by_name(
                     session,
@@ -191,24 +716,62 @@ class Controller:
                     page,
                     genres_filter
                 )
-                ascii_images_coroutines = [
-                    self.image_builder.produce_ascii_image(
-                        session,
-                        anime["cover_url"]
-                    ) for anime in anime_list["anime_list"]
-                ]
-                
-                anime_ascii_images = await asyncio.gather(
-                    *ascii_images_coroutines
-                )
-
-                print(f'Page: {anime_list["page"]} of {anime_list["total_pages"]}')
-                for n in range(len(anime_list["anime_list"])):
-                    d = AnimeListItemDisplayer(
-                            anime_list["anime_list"][n],
-                            anime_ascii_images[n],
-                        )
-                    d.render_info()
-                print(f'Page: {anime_list["page"]} of {anime_list["total_pages"]}')
-            except DefaultException as e:
-                print(f"Error {e}")
+                await self._render_anime_list(
+                    session,
+                    anime_list,
+                    cover_deadline,
+                    output_format
+                )
+                return anime_list["total_pages"]
+            except (DefaultException, ClientError) as e:
+                self._print_error(f"Error {e}", output_format)
+                return None
+
+    async def _render_anime_list(
+        self,
+        session: ClientSession,
+        anime_list: AnimeListReturn,
+        cover_deadline: Optional[float],
+        output_format: OutputFormat = "text"
+    ):
+        """Covers not ready cover_deadline seconds in are left out."""
+        if output_format == "json":
+            RecordWriter(output_format).write_one(anime_list)
+            return
+        if output_format != "text":
+            RecordWriter(output_format).write_all(anime_list["anime_list"])
+            return
+
+        cover_tasks = [
+            asyncio.create_task(self._get_cover(session, anime["cover_url"]))
+            for anime in anime_list["anime_list"]
+        ]
+        loop = asyncio.get_running_loop()
+        deadline = None
+        if cover_deadline != None:
+            deadline = loop.time() + cover_deadline
+
+        try:
+            if anime_list.get("stale"):
+                print("TMDB is unavailable, showing the last saved results.")
+            print(f'Page: {anime_list["page"]} of {anime_list["total_pages"]}')
+            for anime, cover_task in zip(anime_list["anime_list"], cover_tasks):
+                image = None
+                if deadline == None:
+                    image = await cover_task
+                else:
+                    await asyncio.wait(
+                        [cover_task],
+                        timeout=max(deadline - loop.time(), 0)
+                    )
+                    if cover_task.done():
+                        image = cover_task.result()
+
+                d = AnimeListItemDisplayer(anime, image, self.palette)
+                d.render_info()
+                with span("render.write"):
+                    sys.stdout.flush()
+            print(f'Page: {anime_list["page"]} of {anime_list["total_pages"]}')
+        finally:
+            for cover_task in cover_tasks:
+                cover_task.cancel()
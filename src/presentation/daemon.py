@@ -0,0 +1,247 @@
+import asyncio
+import io
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+from concurrent.futures import Executor
+from contextlib import AsyncExitStack
+from contextvars import ContextVar
+from typing import Callable, Optional, TextIO
+
+from aiohttp import ClientSession
+
+from .cli_parser import DefaultArgumentParser
+from .color_palette import ColorDepth, detect_color_depth
+from .command_dispatcher import dispatch_command
+from .controller import Controller
+from .daemon_client import daemon_socket_path
+from ..services.metrics_server import serve_metrics
+from ..utils.terminal import set_terminal_columns
+
+class _ClientOutput():
+    send: Callable[[str, str], None]
+    is_tty: bool
+
+    def __init__(self, send: Callable[[str, str], None], is_tty: bool):
+        """send gets what is written and the name of its stream."""
+        self.send = send
+        self.is_tty = is_tty
+
+# Where what the current client's command writes goes.
+_client_output: ContextVar[Optional[_ClientOutput]] = ContextVar(
+    "client_output",
+    default=None
+)
+
+class _ClientStream(io.TextIOBase):
+    """Sends what a client's command writes to that client."""
+    _stream: TextIO
+    _name: str
+
+    def __init__(self, stream: TextIO, name: str):
+        self._stream = stream
+        self._name = name
+
+    @property
+    def encoding(self) -> str:
+        return self._stream.encoding
+
+    def writable(self) -> bool:
+        return True
+
+    def isatty(self) -> bool:
+        client = _client_output.get()
+        return client.is_tty if client else self._stream.isatty()
+
+    def write(self, text: str) -> int:
+        client = _client_output.get()
+        if not client:
+            return self._stream.write(text)
+        client.send(self._name, text)
+        return len(text)
+
+    def flush(self):
+        if not _client_output.get():
+            self._stream.flush()
+
+class DaemonServer():
+    """Runs the commands its Unix socket's clients send as JSON lines."""
+    parser: DefaultArgumentParser
+    _create_controller: Callable[[str, ColorDepth], Controller]
+    _db_executor: Optional[Executor]
+    _metrics_port: Optional[int]
+    _controllers: dict[tuple[str, ColorDepth], Controller]
+    _session: Optional[ClientSession]
+    _sessions: Optional[AsyncExitStack]
+    _stopped: Optional[asyncio.Future]
+
+    def __init__(
+        self,
+        create_controller: Callable[[str, ColorDepth], Controller],
+        parser: DefaultArgumentParser,
+        db_executor: Optional[Executor] = None,
+        metrics_port: Optional[int] = None
+    ):
+        self.parser = parser
+        self._create_controller = create_controller
+        self._db_executor = db_executor
+        self._metrics_port = metrics_port
+        self._controllers = {}
+        self._session = None
+        self._sessions = None
+        self._stopped = None
+
+    async def serve(self, path: Optional[str] = None) -> int:
+        """Serves until SIGINT or SIGTERM, returns the exit code."""
+        path = path or daemon_socket_path()
+        if self._is_listening(path):
+            print(f"A daemon is already running on {path}", file=sys.stderr)
+            return 1
+        if os.path.exists(path):
+            # Left by a daemon which didn't stop cleanly.
+            os.unlink(path)
+
+        loop = asyncio.get_running_loop()
+        self._stopped = loop.create_future()
+        for signal_number in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signal_number, self.stop)
+
+        stdout, stderr = sys.stdout, sys.stderr
+        sys.stdout = _ClientStream(stdout, "out")
+        sys.stderr = _ClientStream(stderr, "err")
+        try:
+            async with AsyncExitStack() as sessions:
+                self._session = await sessions.enter_async_context(
+                    ClientSession()
+                )
+                self._sessions = sessions
+                # Only this user may connect.
+                old_umask = os.umask(0o177)
+                try:
+                    server = await asyncio.start_unix_server(
+                        self._handle,
+                        path
+                    )
+                finally:
+                    os.umask(old_umask)
+                async with server, serve_metrics(self._metrics_port):
+                    print(f"Listening on {path}")
+                    await self._stopped
+        finally:
+            sys.stdout, sys.stderr = stdout, stderr
+            self._session = None
+            self._sessions = None
+            if os.path.exists(path):
+                os.unlink(path)
+            for signal_number in (signal.SIGINT, signal.SIGTERM):
+                loop.remove_signal_handler(signal_number)
+        return 0
+
+    def stop(self):
+        if self._stopped and not self._stopped.done():
+            self._stopped.set_result(None)
+
+    async def _handle(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter
+    ):
+        loop = asyncio.get_running_loop()
+        loop_thread = threading.get_ident()
+
+        def send(message: dict):
+            data = json.dumps(message).encode() + b"\n"
+            if writer.is_closing():
+                return
+            if threading.get_ident() == loop_thread:
+                writer.write(data)
+            else:
+                # Written by a command running on the database thread.
+                loop.call_soon_threadsafe(send, message)
+
+        try:
+            request = json.loads(await reader.readline())
+            _client_output.set(_ClientOutput(
+                lambda name, text: send({name: text}),
+                bool(request.get("tty"))
+            ))
+            exit_code = await self._run(request, reader)
+            _client_output.set(None)
+            if exit_code == None:
+                send({"fallback": True})
+            else:
+                send({"exit": exit_code})
+            await writer.drain()
+        except (ConnectionError, ValueError, KeyError, TypeError):
+            # The client went away or didn't send a request.
+            pass
+        finally:
+            writer.close()
+
+    async def _run(
+        self,
+        request: dict,
+        reader: asyncio.StreamReader
+    ) -> Optional[int]:
+        set_terminal_columns(request.get("columns"))
+        try:
+            namespace = self.parser.parse(list(request["args"]))
+        except SystemExit as e:
+            # argparse already wrote the usage or the error.
+            return e.code if isinstance(e.code, int) else int(e.code != None)
+
+        if namespace.command in ("shell", "daemon"):
+            return None
+        if namespace.command == "update" and namespace.batch:
+            return None
+
+        color_depth = namespace.color_depth
+        if color_depth == "auto":
+            color_depth = detect_color_depth(request.get("environ", {}))
+        controller = await self._controller(namespace.render_mode, color_depth)
+
+        command = asyncio.create_task(
+            dispatch_command(controller, namespace, self._db_executor)
+        )
+        # The client closes the connection when it is interrupted.
+        hang_up = asyncio.create_task(reader.read())
+        await asyncio.wait(
+            [command, hang_up],
+            return_when=asyncio.FIRST_COMPLETED
+        )
+        hang_up.cancel()
+        if not command.done():
+            command.cancel()
+            await asyncio.wait([command])
+            return 1
+        if command.exception():
+            print(f"Error {command.exception()}")
+            return 1
+        return 0
+
+    async def _controller(
+        self,
+        render_mode: str,
+        color_depth: ColorDepth
+    ) -> Controller:
+        key = (render_mode, color_depth)
+        if key not in self._controllers:
+            controller = self._create_controller(render_mode, color_depth)
+            if self._sessions:
+                await self._sessions.enter_async_context(
+                    controller.keep_session(self._session)
+                )
+            self._controllers[key] = controller
+        return self._controllers[key]
+
+    @staticmethod
+    def _is_listening(path: str) -> bool:
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                probe.connect(path)
+            return True
+        except OSError:
+            return False
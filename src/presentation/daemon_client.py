@@ -0,0 +1,66 @@
+import hashlib
+import json
+import os
+import shutil
+import socket
+import sys
+from typing import Optional
+
+from ..utils.cache_dir import get_cache_dir
+
+# Only the standard library is imported here, so forwarding a command
+# doesn't pay for loading what the daemon already has loaded.
+
+# Variables the daemon picks the color depth of the client with.
+_forwarded_environ = ("COLORTERM", "TERM")
+
+def daemon_socket_path(directory: Optional[str] = None) -> str:
+    """One socket per directory, as the database file is relative to it."""
+    directory = os.path.abspath(directory or os.getcwd())
+    digest = hashlib.sha1(directory.encode()).hexdigest()[:16]
+    return os.path.join(get_cache_dir(), f"daemon-{digest}.sock")
+
+def forward_to_daemon(args: list[str]) -> Optional[int]:
+    """Returns the exit code, None when the command must run in this process."""
+    if not args or not hasattr(socket, "AF_UNIX"):
+        return None
+
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(daemon_socket_path())
+    except OSError:
+        client.close()
+        return None
+
+    with client, client.makefile("rwb") as stream:
+        request = {
+            "args": args,
+            "columns": shutil.get_terminal_size().columns,
+            "tty": sys.stdout.isatty(),
+            "environ": {
+                name: os.environ[name]
+                for name in _forwarded_environ
+                if name in os.environ
+            }
+        }
+        try:
+            stream.write(json.dumps(request).encode() + b"\n")
+            stream.flush()
+            for line in stream:
+                message = json.loads(line)
+                if "out" in message:
+                    sys.stdout.write(message["out"])
+                    sys.stdout.flush()
+                elif "err" in message:
+                    sys.stderr.write(message["err"])
+                    sys.stderr.flush()
+                elif "fallback" in message:
+                    return None
+                elif "exit" in message:
+                    return message["exit"]
+        except (OSError, ValueError):
+            pass
+
+    # The command may have been half done, running it again could repeat it.
+    print("Error lost the connection to the daemon", file=sys.stderr)
+    return 1
@@ -0,0 +1,148 @@
+import sys
+from typing import Optional, TextIO
+
+from .color_palette import ColorPalette
+from .image_builder import ImagePixels
+from ..utils.profiler import span
+
+class FrameBuilder():
+    """Composes an item in memory, color escapes are only written on changes."""
+    _reset = "\033[0m"
+    _half_block = "\u2580"
+    _parts: list[str]
+    _palette: Optional[ColorPalette]
+    _color: Optional[tuple[int, int, int] | int]
+    _background: Optional[tuple[int, int, int] | int]
+
+    def __init__(self, palette: Optional[ColorPalette] = None):
+        self._parts = []
+        self._palette = palette
+        self._color = None
+        self._background = None
+
+    def pixels(
+        self,
+        pixel_line: memoryview,
+        bottom_line: Optional[memoryview] = None,
+        char: str = "o"
+    ):
+        """With bottom_line two rows are drawn as upper half blocks."""
+        if bottom_line != None and self._palette:
+            return self._half_block_indexes(pixel_line, bottom_line)
+        if bottom_line != None:
+            return self._half_block_pixels(pixel_line, bottom_line)
+
+        parts = self._parts
+        color = self._color
+        if self._background != None:
+            self._reset_color()
+            color = None
+        if self._palette:
+            foreground = self._palette.foreground
+            for index in pixel_line:
+                if index != color:
+                    color = index
+                    parts.append(foreground[index])
+                parts.append(char)
+            self._color = color
+            return
+
+        for pixel in ImagePixels.pixels(pixel_line):
+            if pixel != color:
+                color = pixel
+                parts.append(f"\033[38;2;{pixel[0]};{pixel[1]};{pixel[2]}m")
+            parts.append(char)
+        self._color = color
+
+    def _half_block_pixels(
+        self,
+        top_line: memoryview,
+        bottom_line: memoryview
+    ):
+        parts = self._parts
+        color = self._color
+        background = self._background
+        char = self._half_block
+        for top, bottom in zip(
+            ImagePixels.pixels(top_line),
+            ImagePixels.pixels(bottom_line)
+        ):
+            if top != color and bottom != background:
+                color = top
+                background = bottom
+                parts.append(
+                    f"\033[38;2;{top[0]};{top[1]};{top[2]};"
+                    f"48;2;{bottom[0]};{bottom[1]};{bottom[2]}m"
+                )
+            elif top != color:
+                color = top
+                parts.append(f"\033[38;2;{top[0]};{top[1]};{top[2]}m")
+            elif bottom != background:
+                background = bottom
+                parts.append(
+                    f"\033[48;2;{bottom[0]};{bottom[1]};{bottom[2]}m"
+                )
+            parts.append(char)
+        self._color = color
+        self._background = background
+
+    def _half_block_indexes(
+        self,
+        top_line: memoryview,
+        bottom_line: memoryview
+    ):
+        assert self._palette != None
+        parts = self._parts
+        color = self._color
+        background = self._background
+        char = self._half_block
+        foreground_params = self._palette.foreground_params
+        background_params = self._palette.background_params
+        foreground = self._palette.foreground
+        background_escapes = self._palette.background
+        for top, bottom in zip(top_line, bottom_line):
+            if top != color and bottom != background:
+                color = top
+                background = bottom
+                parts.append(
+                    f"\033[{foreground_params[top]};"
+                    f"{background_params[bottom]}m"
+                )
+            elif top != color:
+                color = top
+                parts.append(foreground[top])
+            elif bottom != background:
+                background = bottom
+                parts.append(background_escapes[bottom])
+            parts.append(char)
+        self._color = color
+        self._background = background
+
+    def text(self, text: str):
+        self._reset_color()
+        self._parts.append(text)
+
+    def newline(self):
+        self._reset_color()
+        self._parts.append("\n")
+
+    def line(self, text: str):
+        self.text(text)
+        self.newline()
+
+    def build(self) -> str:
+        self._reset_color()
+        frame = "".join(self._parts)
+        self._parts = []
+        return frame
+
+    def flush(self, stream: Optional[TextIO] = None):
+        frame = self.build()
+        with span("render.write"):
+            (stream or sys.stdout).write(frame)
+
+    def _reset_color(self):
+        if self._color != None or self._background != None:
+            self._parts.append(self._reset)
+            self._color = None
+            self._background = None
@@ -1,67 +1,399 @@
-from PIL import Image
+from PIL import Image, ImageFile
+import asyncio
 import io
-from aiohttp import ClientSession
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Iterator, Literal, Optional
+from urllib.parse import urlparse
+from aiohttp import ClientError, ClientPayloadError, ClientResponse, ClientSession
+
+from ..services.image_cache import CachedImage, ImageCache
+from ..services.request_scheduler import RequestScheduler
+from ..utils.deadline import get_deadline
+from ..utils.metrics import cache_requests, upstream_bytes, upstream_request_seconds, upstream_responses
+from ..utils.profiler import span
+from ..utils.request_priority import RequestPriority
+
+# "block" draws a pixel per character, "half" draws two pixel rows per
+# character with the upper half block glyph.
+RenderMode = Literal["block", "half"]
+
+def create_decode_executor() -> Executor:
+    """A thread pool, or a process pool with ANIME_LIST_DECODE_POOL=process."""
+    workers = int(os.getenv("ANIME_LIST_DECODE_WORKERS", "0")) or None
+    if os.getenv("ANIME_LIST_DECODE_POOL") == "process":
+        return ProcessPoolExecutor(workers)
+    return ThreadPoolExecutor(workers)
 
 class ImagePixels:
+    """Packed RGB pixels of a cover, or palette indexes when indexed."""
     default_width = 30
     default_height = 23
-    _pixel_count = 0
-    image_pixels: list[tuple[int,int,int]]
+    image_pixels: bytes | memoryview
+    half_block: bool
+    indexed: bool
 
     def __init__(
         self,
-        image_pixels: list[tuple[int,int,int]],
-        default_height: int
+        image_pixels: bytes | memoryview,
+        default_height: int,
+        half_block: bool = False,
+        indexed: bool = False
     ):
         self.image_pixels = image_pixels
         self.default_height = default_height
+        self.half_block = half_block
+        self.indexed = indexed
 
     def __len__(self):
-        return len(self.image_pixels)
+        return len(self.image_pixels) // self.pixel_size
+
+    def __iter__(self) -> Iterator[memoryview]:
+        view = memoryview(self.image_pixels)
+        row_size = self.default_width * self.pixel_size
+        for start in range(0, len(view) - row_size + 1, row_size):
+            yield view[start:start + row_size]
+
+    def lines(self) -> Iterator[tuple[memoryview, Optional[memoryview]]]:
+        """Yields (top, bottom) rows, bottom is None unless half block."""
+        rows = iter(self)
+        for top in rows:
+            yield top, next(rows, None) if self.half_block else None
+
+    @property
+    def pixel_size(self) -> int:
+        return 1 if self.indexed else 3
 
-    def __iter__(self):
-        return self
+    @property
+    def row_count(self) -> int:
+        return len(self) // self.default_width
 
-    def __next__(self):
-        image_line_count = len(self.image_pixels)/self.default_width
-        if self._pixel_count >= image_line_count:
-            raise StopIteration
+    @staticmethod
+    def pixels(row: memoryview) -> Iterator[tuple[int, int, int]]:
+        return zip(row[0::3], row[1::3], row[2::3])
+
+class CoverParser(ImageFile.Parser):
+    """Decodes JPEGs in draft mode while they are fed."""
+    _half_block: bool
+
+    def __init__(self, half_block: bool = False):
+        super().__init__()
+        self._half_block = half_block
+
+    def feed(self, data: bytes):
+        if self.image or self.finished:
+            return super().feed(data)
+
+        self.data = data if self.data is None else self.data + data
+        try:
+            with io.BytesIO(self.data) as fp:
+                image = Image.open(fp)
+        except OSError:
+            return  # not enough data
+        if image.format != "JPEG":
+            # Left to the stock parser, it is opened on close.
+            self.image = image
+            return
+
+        image.draft(
+            "RGB",
+            ImageBuilder._target_size(*image.size, self._half_block)
+        )
+        if len(image.tile) == 1:
+            image.load_prepare()
+            decoder_name, extents, offset, args = image.tile[0]
+            image.tile = []
+            self.decoder = Image._getdecoder(
+                image.mode,
+                decoder_name,
+                args,
+                image.decoderconfig
+            )
+            self.decoder.setimage(image.im, extents)
+            self.offset = offset
 
-        start = self._pixel_count * self.default_width
-        end = (self._pixel_count + 1) * self.default_width
-        self._pixel_count += 1
-        return self.image_pixels[start:end]
+        self.image = image
+        if self.decoder:
+            super().feed(b"")
+
+    def close_truncated(self) -> Optional[Image.Image]:
+        """What was decoded of an interrupted download, or None."""
+        if not self.decoder or not self.image:
+            return None
+        self.data = self.decoder = None
+        # Progressive rows are only written once the last scan is read.
+        if self.image.info.get("progressive"):
+            return None
+        if self.image.getbbox() == None:
+            return None  # no rows decoded yet
+        return self.image
 
 class ImageBuilder():
+    _chunk_size = 16 * 1024
+    _cache: Optional[ImageCache]
+    _executor: Optional[Executor]
+    _half_block: bool
+    _scheduler: RequestScheduler
+
+    def __init__(
+        self,
+        cache: Optional[ImageCache] = None,
+        executor: Optional[Executor] = None,
+        render_mode: RenderMode = "block",
+        scheduler: Optional[RequestScheduler] = None
+    ):
+        """Covers are decoded in executor, so it doesn't block downloads."""
+        self._cache = cache
+        self._executor = executor
+        self._half_block = render_mode == "half"
+        self._scheduler = scheduler or RequestScheduler()
+
     async def produce_ascii_image(
         self,
         session: ClientSession,
-        image_url: str
+        image_url: str,
+        priority: RequestPriority = RequestPriority.VISIBLE
     ) -> ImagePixels:
-        image_bytes = await self._get_image(session, image_url)
-        return self._build_image(image_bytes)
+        return await self._get_image(session, image_url, priority)
+
+    async def prefetch_image(
+        self,
+        session: ClientSession,
+        image_url: str
+    ) -> bool:
+        """Returns whether the cover had to be downloaded."""
+        key = urlparse(image_url).path
+        if not self._cache:
+            return False
+        cached = self._lookup(key)
+        if cached and cached.fresh:
+            return False
 
-    def _build_image(self, image_bytes: bytes) -> ImagePixels:
+        headers = self._revalidation_headers(cached)
+
+        async with asyncio.timeout_at(get_deadline()):
+            async with self._scheduler.slot(RequestPriority.PREFETCH):
+                with span("cover.prefetch"):
+                    sent_at = time.monotonic()
+                    async with session.get(
+                        image_url,
+                        headers=headers
+                    ) as response:
+                        upstream_responses.inc(
+                            endpoint="cover",
+                            status=str(response.status)
+                        )
+                        if response.status == 304 and cached:
+                            self._observe_download(sent_at, 0)
+                            self._cache.touch(key)
+                            return True
+                        if response.status != 200:
+                            return False
+                        data = await response.read()
+                        self._observe_download(sent_at, len(data))
+                        self._cache.put(
+                            key,
+                            data,
+                            response.headers.get("ETag"),
+                            response.headers.get("Last-Modified")
+                        )
+                        return True
+
+    @staticmethod
+    def _target_size(
+        width: int,
+        height: int,
+        half_block: bool = False
+    ) -> tuple[int, int]:
+        # Terminal cells are about twice as tall as wide.
+        aspect_ratio = height / width
+        new_h = aspect_ratio * ImagePixels.default_width * 0.55
+        if half_block:
+            # Even, so every line has both halves.
+            return ImagePixels.default_width, int(new_h) * 2
+        return ImagePixels.default_width, int(new_h)
+
+    # Static so it can be sent to a process pool.
+    @staticmethod
+    def _build_image(
+        image_bytes: bytes,
+        half_block: bool = False
+    ) -> ImagePixels:
         with Image.open(io.BytesIO(image_bytes)) as image_file:
-            w, h = image_file.size
-            aspect_ratio = h / w
-            new_h = aspect_ratio * ImagePixels.default_width * 0.55
-            image = image_file.resize(
-                (
-                    ImagePixels.default_width,
-                    int(new_h)
-                )
+            # JPEGs are decoded straight at the smallest scale, down to
+            # 1/8, which still covers the requested size.
+            image_file.draft(
+                "RGB",
+                ImageBuilder._target_size(*image_file.size, half_block)
             )
-            image_pixels = list(image.getdata())
-            default_height = int(
-                len(image_pixels) / ImagePixels.default_width
+            return ImageBuilder._build_pixels(image_file, half_block)
+
+    @staticmethod
+    def _build_pixels(
+        image_file: Image.Image,
+        half_block: bool = False
+    ) -> ImagePixels:
+        image = image_file.convert("RGB").resize(
+            ImageBuilder._target_size(*image_file.size, half_block)
+        )
+        lines = image.height // 2 if half_block else image.height
+        return ImagePixels(image.tobytes(), lines, half_block)
+
+    @staticmethod
+    def _revalidation_headers(cached: Optional[CachedImage]) -> dict[str, str]:
+        headers = {}
+        if cached and cached.etag:
+            headers["If-None-Match"] = cached.etag
+        if cached and cached.last_modified:
+            headers["If-Modified-Since"] = cached.last_modified
+        return headers
+
+    async def _decode(self, image_bytes: bytes) -> ImagePixels:
+        with span("cover.decode"):
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor,
+                self._build_image,
+                image_bytes,
+                self._half_block
             )
-            return ImagePixels(image_pixels, default_height)
 
     async def _get_image(
             self,
             session: ClientSession,
-            image_url: str
-    ) -> bytes:
-        async with session.get(image_url) as response:
-                return await response.read()
+            image_url: str,
+            priority: RequestPriority = RequestPriority.VISIBLE
+    ) -> ImagePixels:
+        key = urlparse(image_url).path
+        cached = self._lookup(key)
+        if cached and cached.fresh:
+            return await self._decode(cached.data)
+
+        headers = self._revalidation_headers(cached)
+
+        try:
+            async with asyncio.timeout_at(get_deadline()):
+                async with self._scheduler.slot(priority):
+                    sent_at = time.monotonic()
+                    async with session.get(
+                        image_url,
+                        headers=headers
+                    ) as response:
+                        upstream_responses.inc(
+                            endpoint="cover",
+                            status=str(response.status)
+                        )
+                        if response.status == 304 and cached and self._cache:
+                            self._observe_download(sent_at, 0)
+                            self._cache.touch(key)
+                            return await self._decode(cached.data)
+
+                        if isinstance(self._executor, ProcessPoolExecutor):
+                            # A parser can't be fed across processes, the
+                            # whole cover is sent instead of the image.
+                            with span("cover.download"):
+                                data = await self._read_image(response, key)
+                            self._observe_download(sent_at, None)
+                            return await self._decode(data)
+
+                        with span("cover.download"):
+                            image = await self._stream_image(response, key)
+                        self._observe_download(sent_at, None)
+                        return await self._resize(image)
+        except TimeoutError:
+            upstream_responses.inc(endpoint="cover", status="timeout")
+            # Out of time, a stale cover is better than none.
+            if cached:
+                return await self._decode(cached.data)
+            raise
+        except ClientError:
+            upstream_responses.inc(endpoint="cover", status="error")
+            raise
+
+    def _lookup(self, key: str) -> Optional[CachedImage]:
+        if not self._cache:
+            return None
+        cached = self._cache.get(key)
+        result = "miss"
+        if cached:
+            result = "hit" if cached.fresh else "stale"
+        cache_requests.inc(cache="cover", result=result)
+        return cached
+
+    @staticmethod
+    def _observe_download(sent_at: float, byte_count: Optional[int]):
+        """byte_count is None when the bytes were counted as they came."""
+        upstream_request_seconds.observe(
+            time.monotonic() - sent_at,
+            endpoint="cover"
+        )
+        if byte_count:
+            upstream_bytes.inc(byte_count, endpoint="cover")
+
+    async def _read_image(self, response: ClientResponse, key: str) -> bytes:
+        chunks: list[bytes] = []
+        async for chunk in response.content.iter_chunked(self._chunk_size):
+            upstream_bytes.inc(len(chunk), endpoint="cover")
+            chunks.append(chunk)
+        data = b"".join(chunks)
+        self._save_download(response, key, data)
+        return data
+
+    async def _stream_image(
+        self,
+        response: ClientResponse,
+        key: str
+    ) -> Image.Image:
+        loop = asyncio.get_running_loop()
+        parser = CoverParser(self._half_block)
+        chunks: list[bytes] = []
+        keep_chunks = self._cache != None and response.status == 200
+        # The next chunk is read while the last one is decoded, one at a
+        # time as the parser isn't thread safe.
+        feeding: Optional[asyncio.Future] = None
+        try:
+            try:
+                async for chunk in response.content.iter_chunked(
+                    self._chunk_size
+                ):
+                    upstream_bytes.inc(len(chunk), endpoint="cover")
+                    if keep_chunks:
+                        chunks.append(chunk)
+                    if feeding:
+                        await feeding
+                    feeding = loop.run_in_executor(
+                        self._executor,
+                        parser.feed,
+                        chunk
+                    )
+            finally:
+                if feeding:
+                    await feeding
+            image = await loop.run_in_executor(self._executor, parser.close)
+        except ClientPayloadError:
+            image = parser.close_truncated()
+            if not image:
+                raise
+            return image
+
+        if keep_chunks:
+            self._save_download(response, key, b"".join(chunks))
+        return image
+
+    def _save_download(self, response: ClientResponse, key: str, data: bytes):
+        if self._cache and response.status == 200:
+            self._cache.put(
+                key,
+                data,
+                response.headers.get("ETag"),
+                response.headers.get("Last-Modified")
+            )
+
+    async def _resize(self, image: Image.Image) -> ImagePixels:
+        with span("cover.resize"):
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor,
+                self._build_pixels,
+                image,
+                self._half_block
+            )
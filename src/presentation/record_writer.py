@@ -0,0 +1,94 @@
+import csv
+import json
+import sys
+from datetime import date
+from typing import Any, Iterable, Literal, Mapping, Optional, TextIO
+
+OutputFormat = Literal["text", "json", "ndjson", "csv"]
+
+def resolve_output_format(output_format: str, is_tty: bool) -> OutputFormat:
+    """auto is text on a terminal and NDJSON when piped."""
+    if output_format == "auto":
+        return "text" if is_tty else "ndjson"
+    return output_format # type: ignore[return-value]
+
+def to_record(value: Any) -> dict[str, Any]:
+    if isinstance(value, Mapping):
+        return dict(value)
+    return dict(vars(value))
+
+class RecordWriter():
+    """Writes records as JSON, NDJSON or CSV, lists as they are iterated."""
+    output_format: OutputFormat
+    _stream: TextIO
+
+    def __init__(
+        self,
+        output_format: OutputFormat,
+        stream: Optional[TextIO] = None
+    ):
+        if output_format == "text":
+            raise ValueError("text is written by the displayers")
+        self.output_format = output_format
+        self._stream = stream or sys.stdout
+
+    def write_one(self, record: Any):
+        if self.output_format == "json":
+            self._stream.write(self._dumps(to_record(record)) + "\n")
+            self._stream.flush()
+        else:
+            self.write_all([record])
+
+    def write_all(self, records: Iterable[Any]):
+        if self.output_format == "csv":
+            self._write_csv(records)
+            return
+
+        separator = "[\n" if self.output_format == "json" else ""
+        for record in records:
+            self._stream.write(separator + self._dumps(to_record(record)))
+            if self.output_format == "json":
+                separator = ",\n"
+            else:
+                self._stream.write("\n")
+                self._stream.flush()
+        if self.output_format == "json":
+            # An empty list never wrote its opening bracket.
+            self._stream.write("[]\n" if separator == "[\n" else "\n]\n")
+        self._stream.flush()
+
+    def _write_csv(self, records: Iterable[Any]):
+        writer = None
+        for record in records:
+            fields = to_record(record)
+            if not writer:
+                writer = csv.DictWriter(
+                    self._stream,
+                    list(fields),
+                    extrasaction="ignore",
+                    lineterminator="\n"
+                )
+                writer.writeheader()
+            writer.writerow({
+                name: self._csv_cell(value) for name, value in fields.items()
+            })
+        self._stream.flush()
+
+    def _csv_cell(self, value: Any) -> Any:
+        if isinstance(value, list) and all(
+            isinstance(item, (str, int, float)) for item in value
+        ):
+            return "|".join(str(item) for item in value)
+        if isinstance(value, (list, dict)):
+            return self._dumps(value)
+        if isinstance(value, date):
+            return value.isoformat()
+        return value
+
+    @staticmethod
+    def _dumps(value: Any) -> str:
+        return json.dumps(
+            value,
+            ensure_ascii=False,
+            default=lambda v: v.isoformat() if isinstance(v, date) else str(v)
+        )
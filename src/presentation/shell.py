@@ -0,0 +1,168 @@
+import asyncio
+import copy
+import shlex
+import signal
+import threading
+from argparse import Namespace
+from typing import Optional
+
+from .cli_parser import DefaultArgumentParser
+from .command_dispatcher import dispatch_command
+from .controller import Controller
+from ..services.metrics_server import serve_metrics
+
+class Shell():
+    """Runs typed commands in one process, prefetching the next search page."""
+    prompt = "anime_list> "
+    _help = (
+        "Type a command like on the command line, e.g. 'search -g action'.\n"
+        "next, prev: show the next or previous page of the last search.\n"
+        "exit, quit: leave the shell."
+    )
+    controller: Controller
+    parser: DefaultArgumentParser
+    _metrics_port: Optional[int]
+    _search: Optional[Namespace]
+    _line: Optional[asyncio.Future]
+    _command: Optional[asyncio.Task]
+    _prefetch: Optional[asyncio.Task]
+
+    def __init__(
+        self,
+        controller: Controller,
+        parser: DefaultArgumentParser,
+        metrics_port: Optional[int] = None
+    ):
+        self.controller = controller
+        self.parser = parser
+        self._metrics_port = metrics_port
+        self._search = None
+        self._line = None
+        self._command = None
+        self._prefetch = None
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        try:
+            loop.add_signal_handler(signal.SIGINT, self._interrupt)
+        except (NotImplementedError, RuntimeError):
+            # Not available on this platform or thread.
+            pass
+
+        print(self._help)
+        async with self.controller.keep_session(), serve_metrics(
+            self._metrics_port
+        ):
+            try:
+                while True:
+                    self._line = self._read_line()
+                    await asyncio.wait([self._line])
+                    if self._line.cancelled() or self._line.result() == None:
+                        print()
+                        return
+                    if not await self.run_line(self._line.result()):
+                        return
+            finally:
+                if self._prefetch:
+                    self._prefetch.cancel()
+                try:
+                    loop.remove_signal_handler(signal.SIGINT)
+                except (NotImplementedError, RuntimeError):
+                    pass
+
+    async def run_line(self, line: str) -> bool:
+        """Runs one line, returns False when it asks to leave."""
+        try:
+            args = shlex.split(line)
+        except ValueError as e:
+            print(f"Error {e}")
+            return True
+        if not args:
+            return True
+
+        match args[0]:
+            case "exit" | "quit":
+                return False
+            case "help":
+                print(self._help)
+                return True
+            case "next" | "prev":
+                namespace = self._turn_page(1 if args[0] == "next" else -1)
+                if not namespace:
+                    print("Search something first, next and prev page through it.")
+                    return True
+            case _:
+                try:
+                    namespace = self.parser.parse(args)
+                except SystemExit:
+                    # argparse already printed the usage or the error.
+                    return True
+
+        if namespace.command == "shell":
+            print("Already in the shell.")
+            return True
+
+        self._command = asyncio.create_task(
+            dispatch_command(self.controller, namespace)
+        )
+        try:
+            await asyncio.wait([self._command])
+        finally:
+            command, self._command = self._command, None
+        if command.cancelled():
+            print("\nInterrupted.")
+            return True
+        if command.exception():
+            print(f"Error {command.exception()}")
+            return True
+
+        if namespace.command == "search" and not namespace.id:
+            self._search = namespace
+            total_pages = command.result()
+            if total_pages and namespace.page < total_pages:
+                self._prefetch_page(namespace.page + 1)
+        return True
+
+    def _turn_page(self, step: int) -> Optional[Namespace]:
+        if not self._search:
+            return None
+        namespace = copy.copy(self._search)
+        namespace.page = max(namespace.page + step, 1)
+        return namespace
+
+    def _prefetch_page(self, page: int):
+        if self._prefetch:
+            self._prefetch.cancel()
+        self._prefetch = asyncio.create_task(
+            self.controller.service_prefetch_page(
+                page,
+                self._search.name if self._search else "",
+                self._search.genres if self._search else ""
+            )
+        )
+
+    def _read_line(self) -> asyncio.Future:
+        """Reads in a thread, so prefetches run while the prompt waits."""
+        loop = asyncio.get_running_loop()
+        line = loop.create_future()
+
+        def set_line(result: Optional[str]):
+            if not line.done():
+                line.set_result(result)
+
+        def read():
+            try:
+                result = input(self.prompt)
+            except (EOFError, OSError, UnicodeDecodeError):
+                result = None
+            loop.call_soon_threadsafe(set_line, result)
+
+        # A daemon, a read blocked at exit doesn't keep the process alive.
+        threading.Thread(target=read, daemon=True).start()
+        return line
+
+    def _interrupt(self):
+        if self._command and not self._command.done():
+            self._command.cancel()
+        elif self._line and not self._line.done():
+            self._line.cancel()
@@ -0,0 +1,102 @@
+import sys
+import unicodedata
+from functools import lru_cache
+from typing import Optional
+
+_ellipsis = "..."
+
+@lru_cache(maxsize=None)
+def char_width(char: str) -> int:
+    """Terminal columns taken by char, 2 for wide East Asian characters."""
+    if unicodedata.combining(char):
+        return 0
+    return 2 if unicodedata.east_asian_width(char) in ("W", "F") else 1
+
+def display_width(text: str) -> int:
+    if text.isascii():
+        return len(text)
+    return sum(char_width(char) for char in text)
+
+@lru_cache(maxsize=1024)
+def wrap(
+    text: str,
+    width: int,
+    max_lines: Optional[int] = None
+) -> tuple[str, ...]:
+    """Long words are broken, max_lines + 1 lines tell the text was cut."""
+    width = max(width, 1)
+    line_limit = sys.maxsize if max_lines == None else max_lines + 1
+    lines: list[str] = []
+    line: list[str] = []
+    line_width = 0
+    for word in text.split(" "):
+        word_width = display_width(word)
+        separator = 1 if line else 0
+        if line_width + separator + word_width <= width:
+            line.append(word)
+            line_width += separator + word_width
+            continue
+
+        if line:
+            lines.append(" ".join(line))
+            line = []
+            line_width = 0
+            if len(lines) >= line_limit:
+                return tuple(lines)
+        if word_width <= width:
+            line.append(word)
+            line_width = word_width
+            continue
+
+        piece_start = 0
+        piece_width = 0
+        for n, char in enumerate(word):
+            width_of_char = char_width(char)
+            if piece_width + width_of_char > width and n > piece_start:
+                lines.append(word[piece_start:n])
+                if len(lines) >= line_limit:
+                    return tuple(lines)
+                piece_start = n
+                piece_width = 0
+            piece_width += width_of_char
+        line.append(word[piece_start:])
+        line_width = piece_width
+
+    lines.append(" ".join(line))
+    return tuple(lines)
+
+def truncate(
+    lines: tuple[str, ...],
+    max_lines: int,
+    width: int
+) -> tuple[str, ...]:
+    if len(lines) <= max_lines:
+        return lines
+    last_line = _end_with_ellipsis(lines[max_lines - 1], width)
+    return lines[:max_lines - 1] + (last_line,)
+
+def cut(text: str, width: int) -> str:
+    """One line of at most width columns, with an ellipsis when cut."""
+    if display_width(text) <= width:
+        return text
+    return _end_with_ellipsis(text, width)
+
+def _end_with_ellipsis(line: str, width: int) -> str:
+    line = line.rstrip()
+    line_width = display_width(line)
+    end = len(line)
+    while end and line_width + len(_ellipsis) > width:
+        end -= 1
+        line_width -= char_width(line[end])
+    return line[:end] + _ellipsis
+
+def layout_field(
+    title: str,
+    content: str,
+    width: int,
+    max_lines: Optional[int] = None
+) -> tuple[str, ...]:
+    lines = wrap(f"{title}: {content}", width, max_lines)
+    if max_lines != None:
+        return truncate(lines, max_lines, width)
+    return lines
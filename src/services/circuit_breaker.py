@@ -0,0 +1,99 @@
+import json
+import os
+import tempfile
+import time
+from collections import deque
+from typing import Optional
+
+class _EndpointState:
+    failures: deque[bool]
+    opened_at: Optional[float]
+    probing: bool
+
+    def __init__(self, failures: list[bool], opened_at: Optional[float]):
+        self.failures = deque(failures, maxlen=CircuitBreaker.window)
+        self.opened_at = opened_at
+        self.probing = False
+
+class CircuitBreaker():
+    """Fails calls fast while too many of an endpoint's last calls failed."""
+    window = 20
+    min_calls = 4
+    failure_ratio = 0.5
+    open_seconds = 30.0
+    slow_call = 5.0
+    _path: Optional[str]
+    _endpoints: Optional[dict[str, _EndpointState]]
+
+    def __init__(self, path: Optional[str] = None):
+        self._path = path
+        self._endpoints = None
+
+    def allow(self, endpoint: str) -> bool:
+        state = self._state(endpoint)
+        if state.opened_at == None:
+            return True
+        if state.probing or time.time() - state.opened_at < self.open_seconds:
+            return False
+        state.probing = True
+        return True
+
+    def is_open(self, endpoint: str) -> bool:
+        return self._state(endpoint).opened_at != None
+
+    def record(self, endpoint: str, failed: bool):
+        state = self._state(endpoint)
+        opened_at = state.opened_at
+        if state.probing:
+            state.probing = False
+            state.failures.clear()
+            state.opened_at = time.time() if failed else None
+        else:
+            state.failures.append(failed)
+            calls = len(state.failures)
+            ratio = sum(state.failures) / calls
+            if calls >= self.min_calls and ratio >= self.failure_ratio:
+                state.opened_at = time.time()
+        if state.opened_at != opened_at:
+            self._save(endpoint)
+
+    def release(self, endpoint: str):
+        """Ends a call whose outcome says nothing about the endpoint."""
+        self._state(endpoint).probing = False
+
+    def _state(self, endpoint: str) -> _EndpointState:
+        if self._endpoints == None:
+            self._endpoints = self._load()
+        if endpoint not in self._endpoints:
+            self._endpoints[endpoint] = _EndpointState([], None)
+        return self._endpoints[endpoint]
+
+    def _load(self) -> dict[str, _EndpointState]:
+        if not self._path:
+            return {}
+        try:
+            with open(self._path) as f:
+                saved = json.load(f)
+            return {
+                endpoint: _EndpointState([], state["opened_at"])
+                for endpoint, state in saved.items()
+            }
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return {}
+
+    def _save(self, endpoint: str):
+        if not self._path or self._endpoints == None:
+            return
+        # Reloaded so the endpoints other processes saved are kept.
+        saved = {
+            name: {"opened_at": state.opened_at}
+            for name, state in self._load().items()
+        }
+        saved[endpoint] = {"opened_at": self._endpoints[endpoint].opened_at}
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self._path))
+            with os.fdopen(fd, "w") as f:
+                json.dump(saved, f)
+            os.replace(tmp_path, self._path)
+        except OSError:
+            pass
@@ -0,0 +1,113 @@
+import mmap
+import os
+import struct
+from typing import Optional
+
+class CoverAtlas():
+    """Record n holds the thumbnail of the anime with local id n."""
+    _magic = b"ANIMEATL"
+    _file_header = struct.Struct("<8sHHI")
+    _record_header = struct.Struct("<B?H")
+    _path: str
+    _width: int
+    _max_height: int
+    _record_size: int
+    _mmap: Optional[mmap.mmap]
+    _mapped_size: int
+
+    def __init__(
+        self,
+        path: str = "anime_list_covers.atlas",
+        width: int = 30,
+        max_height: int = 64
+    ):
+        self._path = path
+        self._width = width
+        self._max_height = max_height
+        self._record_size = self._record_header.size + width * max_height * 3
+        self._mmap = None
+        self._mapped_size = 0
+        self._init_file()
+
+    def put(
+        self,
+        anime_id: int,
+        pixels: bytes,
+        height: int,
+        half_block: bool = False
+    ):
+        height = min(height, self._max_height)
+        pixels = pixels[:self._width * height * 3]
+        with open(self._path, "r+b") as f:
+            offset = self._record_offset(anime_id)
+            f.seek(offset)
+            f.write(self._record_header.pack(1, half_block, height))
+            f.write(pixels)
+            # Keeps the file a whole number of records long.
+            if f.seek(0, os.SEEK_END) < offset + self._record_size:
+                f.truncate(offset + self._record_size)
+
+    def get(
+        self,
+        anime_id: int
+    ) -> Optional[tuple[memoryview, int, bool]]:
+        offset = self._record_offset(anime_id)
+        view = self._view(offset + self._record_size)
+        if view == None:
+            return None
+
+        used, half_block, height = self._record_header.unpack_from(
+            view,
+            offset
+        )
+        if not used:
+            return None
+
+        start = offset + self._record_header.size
+        pixels = view[start:start + self._width * height * 3]
+        return pixels, height, half_block
+
+    def delete(self, anime_id: int):
+        offset = self._record_offset(anime_id)
+        with open(self._path, "r+b") as f:
+            if f.seek(0, os.SEEK_END) >= offset + self._record_size:
+                f.seek(offset)
+                f.write(self._record_header.pack(0, False, 0))
+
+    def _view(self, size: int) -> Optional[memoryview]:
+        if size > self._mapped_size:
+            file_size = os.path.getsize(self._path)
+            if size > file_size:
+                return None
+            # Earlier views keep the previous mapping alive until released.
+            with open(self._path, "rb") as f:
+                self._mmap = mmap.mmap(
+                    f.fileno(),
+                    file_size,
+                    access=mmap.ACCESS_READ
+                )
+            self._mapped_size = file_size
+
+        assert self._mmap != None
+        return memoryview(self._mmap)
+
+    def _record_offset(self, anime_id: int) -> int:
+        return self._file_header.size + anime_id * self._record_size
+
+    def _init_file(self):
+        header = self._file_header.pack(
+            self._magic,
+            self._width,
+            self._max_height,
+            self._record_size
+        )
+        try:
+            with open(self._path, "rb") as f:
+                if f.read(self._file_header.size) == header:
+                    return
+        except FileNotFoundError:
+            pass
+
+        # Missing or written with another layout, records can't be reused.
+        with open(self._path, "wb") as f:
+            f.write(header)
@@ -1,32 +1,53 @@
-from datetime import date
+import json
+import zlib
+from datetime import date, datetime
 from typing import Optional
-from sqlalchemy import Engine, create_engine, select
+from sqlalchemy import (
+    Engine,
+    bindparam,
+    create_engine,
+    delete,
+    func,
+    insert,
+    select,
+    update
+)
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session, joinedload
 
-from ..interfaces.database_interface import IDatabase
+from ..interfaces.database_interface import AnimeUpdate, IDatabase
+from ..interfaces.displayer_interface import AnimeDetailedInfo
+from ..interfaces.movie_service_interface import AnimeListReturn
 
 from ..dtos.dto_anime import DTOAnime
+from ..dtos.dto_anime_details import DTOAnimeDetails
+from ..dtos.dto_discover_snapshot import DTODiscoverSnapshot
 from ..dtos.dto_tag import DTOTag
+from ..dtos.dto_watch_event import DTOWatchDay, DTOWatchEvent
 
 from ..models.anime import Anime
+from ..models.anime_details import AnimeDetails
+from ..models.anime_genre import AnimeGenre
 from ..models.base import Base
+from ..models.discover_snapshot import DiscoverSnapshot
+from ..models.sync_watermark import SyncWatermark
 from ..models.tag import Tag
+from ..models.watch_event import WatchEvent
+from ..utils.decorators.profiled import profiled
         
 class Database(IDatabase):
     engine: Engine
-    def __init__(self):
-        self.engine = create_engine(
-            "sqlite+pysqlite:///anime_list.db",
-            echo=False
-        )
+    def __init__(self, url: str = "sqlite+pysqlite:///anime_list.db"):
+        self.engine = create_engine(url, echo=False)
         Base.metadata.create_all(self.engine)
 
+    @profiled("db.select_all_tags")
     def select_all_tags(self) -> list[DTOTag]:
         with Session(self.engine) as session:
             tags = session.execute(select(Tag)).scalars().fetchall()
             return [self._crerate_dto_tag(tag) for tag in tags]
 
+    @profiled("db.update_anime")
     def update_anime(
         self,
         anime_id: int,
@@ -47,18 +68,132 @@ class Database(IDatabase):
             if new_tag:
                 anime.tag_id = new_tag
 
+            if last_season or last_episode:
+                watched_at = datetime.now()
+                anime.last_watched_at = watched_at.date()
+                session.add(WatchEvent(
+                    anime_id=anime.id,
+                    watched_at=watched_at,
+                    watching_season=anime.watching_season,
+                    last_watched_episode=anime.last_watched_episode
+                ))
+
             session.commit()
             return self._create_dto_anime(anime)
 
+    @profiled("db.bulk_update_animes")
+    def bulk_update_animes(
+        self,
+        updates: list[AnimeUpdate],
+        chunk_size: int = 500
+    ) -> list[int]:
+        anime_table = Anime.__table__
+        # Missing fields are bound as NULL and coalesced with the current
+        # value, so every record shares a single executemany statement.
+        stmt = (
+            update(anime_table)
+            .where(anime_table.c.id == bindparam("b_id"))
+            .values(
+                watching_season=func.coalesce(
+                    bindparam("b_watching_season"),
+                    anime_table.c.watching_season
+                ),
+                last_watched_episode=func.coalesce(
+                    bindparam("b_last_watched_episode"),
+                    anime_table.c.last_watched_episode
+                ),
+                tag_id=func.coalesce(
+                    bindparam("b_tag_id"),
+                    anime_table.c.tag_id
+                ),
+                last_watched_at=func.coalesce(
+                    bindparam("b_last_watched_at"),
+                    anime_table.c.last_watched_at
+                )
+            )
+        )
+        # Events copy the progress just written to the anime row, a
+        # primary key lookup per record.
+        event_stmt = insert(WatchEvent.__table__).from_select(
+            [
+                "anime_id",
+                "watched_at",
+                "watching_season",
+                "last_watched_episode"
+            ],
+            select(
+                anime_table.c.id,
+                bindparam("b_watched_at"),
+                anime_table.c.watching_season,
+                anime_table.c.last_watched_episode
+            ).where(anime_table.c.id == bindparam("b_id"))
+        )
+        watched_at = datetime.now()
+
+        missing_ids: list[int] = []
+        for start in range(0, len(updates), chunk_size):
+            chunk = updates[start:start + chunk_size]
+            with Session(self.engine) as session, session.begin():
+                existing_ids = set(session.execute(
+                    select(Anime.id)
+                    .where(Anime.id.in_([u["anime_id"] for u in chunk]))
+                ).scalars())
+
+                params = []
+                event_params = []
+                for u in chunk:
+                    if u["anime_id"] not in existing_ids:
+                        missing_ids.append(u["anime_id"])
+                        continue
+                    progress = (
+                        u["watching_season"] != None
+                        or u["last_watched_episode"] != None
+                    )
+                    params.append({
+                        "b_id": u["anime_id"],
+                        "b_watching_season": u["watching_season"],
+                        "b_last_watched_episode": u["last_watched_episode"],
+                        "b_tag_id": u["tag_id"],
+                        "b_last_watched_at": (
+                            watched_at.date() if progress else None
+                        )
+                    })
+                    if progress:
+                        event_params.append({
+                            "b_id": u["anime_id"],
+                            "b_watched_at": watched_at
+                        })
+
+                connection = session.connection()
+                if params:
+                    connection.execute(stmt, params)
+                if event_params:
+                    connection.execute(event_stmt, event_params)
+
+        return missing_ids
+
+    @profiled("db.delete_anime")
     def delete_anime(self, anime_id: int) -> Optional[DTOAnime]:
         with Session(self.engine) as session:
             anime = session.get(Anime, anime_id)
             if anime:
+                session.execute(
+                    delete(WatchEvent).where(WatchEvent.anime_id == anime_id)
+                )
+                session.execute(
+                    delete(AnimeGenre).where(AnimeGenre.anime_id == anime_id)
+                )
+                session.execute(
+                    delete(AnimeDetails)
+                    .where(AnimeDetails.anime_id == anime_id)
+                )
+                dto_anime = self._create_dto_anime(anime)
                 session.delete(anime)
                 session.commit()
-                return self._create_dto_anime(anime)
+                return dto_anime
             return None
 
+    @profiled("db.get_animes")
     def get_animes(self) -> list[DTOAnime]:
         with Session(self.engine) as session:
             animes = session.execute(
@@ -69,6 +204,7 @@ class Database(IDatabase):
 
             return [self._create_dto_anime(a) for a in animes]
 
+    @profiled("db.get_anime_by_id")
     def get_anime_by_id(self, anime_id: int) -> Optional[DTOAnime]:
         with Session(self.engine) as session:
             anime = session.execute(
@@ -80,6 +216,7 @@ class Database(IDatabase):
                 return self._create_dto_anime(anime)
             return None
 
+    @profiled("db.select_animes_by_title")
     def select_animes_by_title(self, title: str) -> list[DTOAnime]:
         with Session(self.engine) as session:
             animes = session.execute(
@@ -90,6 +227,37 @@ class Database(IDatabase):
 
             return [self._create_dto_anime(anime) for anime in animes]
 
+    @profiled("db.select_animes_by_genres")
+    def select_animes_by_genres(
+        self,
+        genres: list[str],
+        title: Optional[str] = None
+    ) -> list[DTOAnime]:
+        normalized_genres = {g.strip().lower() for g in genres if g.strip()}
+        if not normalized_genres:
+            # A filter of blank entries doesn't filter.
+            if title:
+                return self.select_animes_by_title(title)
+            return self.get_animes()
+        with Session(self.engine) as session:
+            query = (
+                select(Anime)
+                .join(AnimeGenre, AnimeGenre.anime_id == Anime.id)
+                .options(joinedload(Anime.tag))
+                .where(AnimeGenre.genre.in_(normalized_genres))
+                .group_by(Anime.id)
+                .having(
+                    func.count(AnimeGenre.genre) == len(normalized_genres)
+                )
+                .order_by(Anime.title)
+            )
+            if title:
+                query = query.where(Anime.title.ilike(f'%{title}%'))
+
+            animes = session.execute(query).scalars().fetchall()
+            return [self._create_dto_anime(anime) for anime in animes]
+
+    @profiled("db.get_anime_by_tmdb_id")
     def get_anime_by_tmdb_id(self, tmdb_id: int) -> Optional[DTOAnime]:
         with Session(self.engine) as session:
             anime = session.execute(
@@ -101,6 +269,70 @@ class Database(IDatabase):
                 return self._create_dto_anime(anime)
             return None
 
+    @profiled("db.get_animes_by_tmdb_ids")
+    def get_animes_by_tmdb_ids(
+        self,
+        tmdb_ids: list[int],
+        chunk_size: int = 500
+    ) -> list[DTOAnime]:
+        animes: list[DTOAnime] = []
+        with Session(self.engine) as session:
+            for start in range(0, len(tmdb_ids), chunk_size):
+                chunk = tmdb_ids[start:start + chunk_size]
+                animes.extend(
+                    self._create_dto_anime(anime)
+                    for anime in session.execute(
+                        select(Anime)
+                        .options(joinedload(Anime.tag))
+                        .where(Anime.anime_tmdb_id.in_(chunk))
+                    ).scalars()
+                )
+        return animes
+
+    @profiled("db.bulk_refresh_animes")
+    def bulk_refresh_animes(self, details: list[AnimeDetailedInfo]) -> int:
+        refreshed = 0
+        fetched_at = datetime.now()
+        with Session(self.engine) as session, session.begin():
+            for anime_details in details:
+                anime = session.execute(
+                    select(Anime)
+                    .where(Anime.anime_tmdb_id == anime_details["api_id"])
+                ).scalar()
+                if not anime:
+                    continue
+
+                anime.seasons = anime_details["seasons_count"]
+                anime.title = anime_details["title"]
+                session.execute(
+                    delete(AnimeGenre).where(AnimeGenre.anime_id == anime.id)
+                )
+                self._add_anime_genres(
+                    session,
+                    anime.id,
+                    anime_details["genres"]
+                )
+                session.merge(AnimeDetails(
+                    anime_id=anime.id,
+                    snapshot=self._pack_snapshot(anime_details),
+                    fetched_at=fetched_at
+                ))
+                refreshed += 1
+        return refreshed
+
+    @profiled("db.get_sync_watermark")
+    def get_sync_watermark(self, name: str) -> Optional[datetime]:
+        with Session(self.engine) as session:
+            watermark = session.get(SyncWatermark, name)
+            return watermark.synced_at if watermark else None
+
+    @profiled("db.set_sync_watermark")
+    def set_sync_watermark(self, name: str, synced_at: datetime):
+        with Session(self.engine) as session:
+            session.merge(SyncWatermark(name=name, synced_at=synced_at))
+            session.commit()
+
+    @profiled("db.insert_anime")
     def insert_anime(
         self,
         anime_tmdb_id: int,
@@ -109,7 +341,9 @@ class Database(IDatabase):
         last_watched_episode: Optional[int],
         last_watched_at: Optional[date],
         title: str,
-        tag_id: int
+        tag_id: int,
+        genres: Optional[list[str]] = None,
+        details: Optional[AnimeDetailedInfo] = None
     ) -> Optional[int]:
         with Session(self.engine) as session:
             try:
@@ -123,11 +357,166 @@ class Database(IDatabase):
                     tag_id=tag_id
                 )
                 session.add(anime)
+                session.flush()
+                if genres:
+                    self._add_anime_genres(session, anime.id, genres)
+                if details:
+                    session.add(AnimeDetails(
+                        anime_id=anime.id,
+                        snapshot=self._pack_snapshot(details),
+                        fetched_at=datetime.now()
+                    ))
+                if watching_season or last_watched_episode:
+                    session.add(WatchEvent(
+                        anime_id=anime.id,
+                        watched_at=datetime.combine(
+                            last_watched_at,
+                            datetime.min.time()
+                        ) if last_watched_at else datetime.now(),
+                        watching_season=watching_season,
+                        last_watched_episode=last_watched_episode
+                    ))
                 session.commit()
                 return anime.id
             except IntegrityError as e:
                 print(f'Error: {e.args[0]}')
 
+    @profiled("db.save_anime_details")
+    def save_anime_details(
+        self,
+        anime_id: int,
+        details: AnimeDetailedInfo
+    ):
+        with Session(self.engine) as session:
+            session.merge(AnimeDetails(
+                anime_id=anime_id,
+                snapshot=self._pack_snapshot(details),
+                fetched_at=datetime.now()
+            ))
+            session.commit()
+
+    @profiled("db.get_anime_details")
+    def get_anime_details(self, anime_id: int) -> Optional[DTOAnimeDetails]:
+        with Session(self.engine) as session:
+            anime_details = session.get(AnimeDetails, anime_id)
+            if anime_details:
+                return DTOAnimeDetails(
+                    anime_id=anime_details.anime_id,
+                    details=self._unpack_snapshot(anime_details.snapshot),
+                    fetched_at=anime_details.fetched_at
+                )
+            return None
+
+    @profiled("db.save_discover_snapshot")
+    def save_discover_snapshot(
+        self,
+        genres_filter: str,
+        page: int,
+        anime_list: AnimeListReturn
+    ):
+        with Session(self.engine) as session:
+            session.merge(DiscoverSnapshot(
+                genres_filter=genres_filter,
+                page=page,
+                snapshot=self._pack_snapshot(anime_list),
+                fetched_at=datetime.now()
+            ))
+            session.commit()
+
+    @profiled("db.get_discover_snapshot")
+    def get_discover_snapshot(
+        self,
+        genres_filter: str,
+        page: int
+    ) -> Optional[DTODiscoverSnapshot]:
+        with Session(self.engine) as session:
+            snapshot = session.get(DiscoverSnapshot, (genres_filter, page))
+            if snapshot:
+                return DTODiscoverSnapshot(
+                    genres_filter=snapshot.genres_filter,
+                    page=snapshot.page,
+                    anime_list=self._unpack_snapshot(snapshot.snapshot),
+                    fetched_at=snapshot.fetched_at
+                )
+            return None
+
+    @profiled("db.get_watch_history")
+    def get_watch_history(
+        self,
+        limit: int,
+        anime_id: Optional[int] = None
+    ) -> list[DTOWatchEvent]:
+        with Session(self.engine) as session:
+            query = (
+                select(WatchEvent, Anime.title)
+                .join(Anime, Anime.id == WatchEvent.anime_id)
+                .order_by(WatchEvent.watched_at.desc())
+                .limit(limit)
+            )
+            if anime_id != None:
+                query = query.where(WatchEvent.anime_id == anime_id)
+
+            return [
+                DTOWatchEvent(
+                    id=event.id,
+                    anime_id=event.anime_id,
+                    title=title,
+                    watched_at=event.watched_at.isoformat(
+                        sep=" ",
+                        timespec="seconds"
+                    ),
+                    watching_season=event.watching_season,
+                    last_watched_episode=event.last_watched_episode
+                ) for event, title in session.execute(query)
+            ]
+
+    @profiled("db.count_watch_events_per_day")
+    def count_watch_events_per_day(
+        self,
+        since: date,
+        anime_id: Optional[int] = None
+    ) -> list[DTOWatchDay]:
+        with Session(self.engine) as session:
+            day = func.date(WatchEvent.watched_at)
+            query = (
+                select(day, func.count())
+                .where(WatchEvent.watched_at >= datetime.combine(
+                    since,
+                    datetime.min.time()
+                ))
+                .group_by(day)
+                .order_by(day)
+            )
+            if anime_id != None:
+                query = query.where(WatchEvent.anime_id == anime_id)
+
+            return [
+                DTOWatchDay(day=d, events=count)
+                for d, count in session.execute(query)
+            ]
+
+    def _add_anime_genres(
+        self,
+        session: Session,
+        anime_id: int,
+        genres: list[str]
+    ):
+        session.add_all([
+            AnimeGenre(anime_id=anime_id, genre=genre)
+            for genre in {g.lower(): g for g in genres}.values()
+        ])
+
+    def _pack_snapshot(
+        self,
+        snapshot: AnimeDetailedInfo | AnimeListReturn
+    ) -> bytes:
+        return zlib.compress(
+            json.dumps(snapshot, separators=(",", ":")).encode()
+        )
+
+    def _unpack_snapshot(self, snapshot: bytes):
+        return json.loads(zlib.decompress(snapshot))
+
     def _crerate_dto_tag(self, tag: Tag) -> DTOTag:
         return DTOTag(
             id=tag.id,
@@ -0,0 +1,231 @@
+import hashlib
+import os
+import sqlite3
+import tempfile
+import time
+from typing import Optional
+
+from ..utils.cache_dir import get_cache_dir
+
+class CachedImage:
+    data: bytes
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fresh: bool
+
+    def __init__(
+        self,
+        data: bytes,
+        etag: Optional[str],
+        last_modified: Optional[str],
+        fresh: bool
+    ):
+        self.data = data
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fresh = fresh
+
+class ImageCache():
+    """Cover bytes stored once per digest, evicted least recently used."""
+    _directory: str
+    _max_bytes: int
+    _max_age: float
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        max_bytes: int = 64 * 1024 * 1024,
+        max_age: float = 30 * 24 * 60 * 60
+    ):
+        self._directory = directory or get_cache_dir("covers")
+        self._max_bytes = max_bytes
+        self._max_age = max_age
+        os.makedirs(os.path.join(self._directory, "blobs"), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entry (
+                    key TEXT PRIMARY KEY,
+                    digest TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    fetched_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS ix_entry_accessed_at
+                ON entry (accessed_at)
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS ix_entry_digest ON entry (digest)
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS meta (
+                    name TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                )
+            """)
+            # Caches made before the meta row start from the entries' sum.
+            conn.execute("""
+                INSERT OR IGNORE INTO meta (name, value)
+                SELECT 'total_size', COALESCE(SUM(size), 0) FROM entry
+            """)
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS tr_entry_insert
+                AFTER INSERT ON entry BEGIN
+                    UPDATE meta SET value = value + new.size
+                    WHERE name = 'total_size';
+                END
+            """)
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS tr_entry_update
+                AFTER UPDATE OF size ON entry BEGIN
+                    UPDATE meta SET value = value + new.size - old.size
+                    WHERE name = 'total_size';
+                END
+            """)
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS tr_entry_delete
+                AFTER DELETE ON entry BEGIN
+                    UPDATE meta SET value = value - old.size
+                    WHERE name = 'total_size';
+                END
+            """)
+
+    def get(self, key: str) -> Optional[CachedImage]:
+        with self._connect() as conn:
+            row = conn.execute(
+                """
+                SELECT digest, etag, last_modified, fetched_at
+                FROM entry WHERE key = ?
+                """,
+                (key,)
+            ).fetchone()
+            if not row:
+                return None
+
+            digest, etag, last_modified, fetched_at = row
+            try:
+                with open(self._blob_path(digest), "rb") as f:
+                    data = f.read()
+            except FileNotFoundError:
+                conn.execute("DELETE FROM entry WHERE key = ?", (key,))
+                return None
+
+            conn.execute(
+                "UPDATE entry SET accessed_at = ? WHERE key = ?",
+                (time.time(), key)
+            )
+            return CachedImage(
+                data,
+                etag,
+                last_modified,
+                time.time() - fetched_at < self._max_age
+            )
+
+    def put(
+        self,
+        key: str,
+        data: bytes,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None
+    ):
+        digest = hashlib.sha256(data).hexdigest()
+        blob_path = self._blob_path(digest)
+        if not os.path.exists(blob_path):
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(blob_path))
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, blob_path)
+
+        now = time.time()
+        with self._connect() as conn:
+            # An upsert, REPLACE would delete the row without the trigger.
+            conn.execute(
+                """
+                INSERT INTO entry
+                (key, digest, size, etag, last_modified, fetched_at, accessed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (key) DO UPDATE SET
+                    digest = excluded.digest,
+                    size = excluded.size,
+                    etag = excluded.etag,
+                    last_modified = excluded.last_modified,
+                    fetched_at = excluded.fetched_at,
+                    accessed_at = excluded.accessed_at
+                """,
+                (key, digest, len(data), etag, last_modified, now, now)
+            )
+            over_budget = self._total_size(conn) > self._max_bytes
+        if over_budget:
+            self._evict()
+
+    def touch(self, key: str):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE entry SET fetched_at = ?, accessed_at = ? WHERE key = ?",
+                (now, now, key)
+            )
+
+    def _evict(self):
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            total_size = self._total_size(conn)
+            if total_size <= self._max_bytes:
+                return
+
+            evicted_digests = set()
+            for key, digest, size in conn.execute(
+                "SELECT key, digest, size FROM entry ORDER BY accessed_at"
+            ).fetchall():
+                if total_size <= self._max_bytes:
+                    break
+                conn.execute("DELETE FROM entry WHERE key = ?", (key,))
+                evicted_digests.add(digest)
+                total_size -= size
+
+            for digest in evicted_digests:
+                still_used = conn.execute(
+                    "SELECT 1 FROM entry WHERE digest = ? LIMIT 1",
+                    (digest,)
+                ).fetchone()
+                if not still_used:
+                    try:
+                        os.remove(self._blob_path(digest))
+                    except FileNotFoundError:
+                        pass
+
+    @staticmethod
+    def _total_size(conn: sqlite3.Connection) -> int:
+        return conn.execute(
+            "SELECT value FROM meta WHERE name = 'total_size'"
+        ).fetchone()[0]
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self._directory, "blobs", digest[:2], digest)
+
+    def _connect(self) -> sqlite3.Connection:
+        return _ClosingConnection(
+            os.path.join(self._directory, "index.sqlite")
+        )
+
+class _ClosingConnection(sqlite3.Connection):
+    # sqlite3.Connection as a context manager only ends the transaction,
+    # the cache opens short lived connections so it must close them too.
+    def __init__(self, path: str):
+        super().__init__(path, timeout=30, isolation_level=None)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if self.in_transaction:
+                if exc_type:
+                    self.rollback()
+                else:
+                    self.commit()
+        finally:
+            self.close()
+        return False
@@ -0,0 +1,32 @@
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+from aiohttp import web
+
+from ..utils.metrics import MetricsRegistry, registry
+
+@asynccontextmanager
+async def serve_metrics(
+    port: Optional[int],
+    host: str = "127.0.0.1",
+    metrics: MetricsRegistry = registry
+) -> AsyncIterator[None]:
+    """Serves /metrics while the block runs, does nothing without a port."""
+    if port == None:
+        yield
+        return
+
+    async def handle_metrics(request: web.Request) -> web.Response:
+        return web.Response(
+            body=metrics.render().encode(),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+        )
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, host, port).start()
+        yield
+    finally:
+        await runner.cleanup()
@@ -0,0 +1,32 @@
+import asyncio
+import time
+
+class RateLimiter():
+    """Token bucket, once the burst is spent requests wait for their turn."""
+    _rate: float
+    _burst: float
+    _tokens: float
+    _updated_at: float
+
+    def __init__(self, rate: float = 40.0, burst: int = 20):
+        self._rate = rate
+        self._burst = burst
+        self._tokens = burst
+        self._updated_at = time.monotonic()
+
+    async def acquire(self):
+        now = time.monotonic()
+        self._tokens = min(
+            self._burst,
+            self._tokens + (now - self._updated_at) * self._rate
+        )
+        self._updated_at = now
+        # The token is taken right away, so waiting requests go in order.
+        self._tokens -= 1
+        if self._tokens >= 0:
+            return
+        try:
+            await asyncio.sleep(-self._tokens / self._rate)
+        except asyncio.CancelledError:
+            self._tokens += 1
+            raise
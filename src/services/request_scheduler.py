@@ -0,0 +1,83 @@
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from ..utils.request_priority import RequestPriority
+
+class RequestScheduler():
+    """Each priority has a limit, freed shared slots go to the highest first."""
+    _default_limits = {
+        RequestPriority.METADATA: 8,
+        RequestPriority.VISIBLE: 6,
+        RequestPriority.PREFETCH: 2
+    }
+    _default_total_limit = 10
+    _limits: dict[RequestPriority, int]
+    _total_limit: int
+    _running: dict[RequestPriority, int]
+    _waiters: dict[RequestPriority, deque[asyncio.Future]]
+
+    def __init__(
+        self,
+        limits: Optional[dict[RequestPriority, int]] = None,
+        total_limit: Optional[int] = None
+    ):
+        self._limits = {**self._default_limits, **(limits or {})}
+        self._total_limit = total_limit or self._default_total_limit
+        self._running = {priority: 0 for priority in RequestPriority}
+        self._waiters = {priority: deque() for priority in RequestPriority}
+
+    @asynccontextmanager
+    async def slot(self, priority: RequestPriority) -> AsyncIterator[None]:
+        await self._acquire(priority)
+        try:
+            yield
+        finally:
+            self._release(priority)
+
+    def running(self, priority: RequestPriority) -> int:
+        return self._running[priority]
+
+    def waiting(self, priority: RequestPriority) -> int:
+        return len(self._waiters[priority])
+
+    async def _acquire(self, priority: RequestPriority):
+        # Higher priorities only wait for their own limit while there are
+        # shared slots left, which this one can then take as well.
+        if not self._waiters[priority] and self._can_start(priority):
+            self._running[priority] += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[priority].append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Granted right before being cancelled, pass it on.
+                self._release(priority)
+            else:
+                self._waiters[priority].remove(waiter)
+                self._dispatch()
+            raise
+
+    def _release(self, priority: RequestPriority):
+        self._running[priority] -= 1
+        self._dispatch()
+
+    def _can_start(self, priority: RequestPriority) -> bool:
+        return (
+            self._running[priority] < self._limits[priority]
+            and sum(self._running.values()) < self._total_limit
+        )
+
+    def _dispatch(self):
+        for priority in RequestPriority:
+            waiters = self._waiters[priority]
+            while waiters and self._can_start(priority):
+                waiter = waiters.popleft()
+                if waiter.done():
+                    continue
+                self._running[priority] += 1
+                waiter.set_result(None)
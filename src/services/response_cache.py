@@ -0,0 +1,122 @@
+import atexit
+import json
+import os
+import sqlite3
+import time
+from contextlib import closing
+from typing import Optional
+
+from ..utils.cache_dir import get_cache_dir
+
+class CachedResponse:
+    body: dict
+    fetched_at: float
+
+    def __init__(self, body: dict, fetched_at: float):
+        self.body = body
+        self.fetched_at = fetched_at
+
+class ResponseCache():
+    """Last good JSON body of each API request, for when the API fails."""
+    # Writes are kept in memory and saved together, old entries are only
+    # evicted when the cache is opened.
+    batch_size = 32
+    flush_seconds = 5.0
+    _path: str
+    _max_entries: int
+    _pending: dict[str, tuple[str, float]]
+    _flushed_at: float
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        max_entries: int = 2000
+    ):
+        self._path = os.path.join(
+            directory or get_cache_dir(),
+            "responses.sqlite"
+        )
+        self._max_entries = max_entries
+        self._pending = {}
+        self._flushed_at = time.monotonic()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS response (
+                    key TEXT PRIMARY KEY,
+                    body TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS ix_response_accessed_at
+                ON response (accessed_at)
+            """)
+            conn.execute(
+                """
+                DELETE FROM response WHERE key IN (
+                    SELECT key FROM response
+                    ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self._max_entries,)
+            )
+        atexit.register(self._flush_at_exit)
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        if key in self._pending:
+            body, fetched_at = self._pending[key]
+            return CachedResponse(json.loads(body), fetched_at)
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT body, fetched_at FROM response WHERE key = ?",
+                (key,)
+            ).fetchone()
+            if not row:
+                return None
+            conn.execute(
+                "UPDATE response SET accessed_at = ? WHERE key = ?",
+                (time.time(), key)
+            )
+        return CachedResponse(json.loads(row[0]), row[1])
+
+    def put(self, key: str, body: dict):
+        self._pending[key] = (json.dumps(body), time.time())
+        if (
+            len(self._pending) >= self.batch_size
+            or time.monotonic() - self._flushed_at >= self.flush_seconds
+        ):
+            self.flush()
+
+    def flush(self):
+        self._flushed_at = time.monotonic()
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        with self._connect() as conn:
+            conn.execute("BEGIN")
+            conn.executemany(
+                """
+                INSERT OR REPLACE INTO response
+                (key, body, fetched_at, accessed_at) VALUES (?, ?, ?, ?)
+                """,
+                [
+                    (key, body, fetched_at, fetched_at)
+                    for key, (body, fetched_at) in pending.items()
+                ]
+            )
+            conn.execute("COMMIT")
+
+    def _flush_at_exit(self):
+        try:
+            self.flush()
+        except sqlite3.Error:
+            pass
+
+    def _connect(self) -> closing[sqlite3.Connection]:
+        return closing(sqlite3.connect(
+            self._path,
+            timeout=30,
+            isolation_level=None
+        ))
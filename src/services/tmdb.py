@@ -1,13 +1,29 @@
-from asyncio import gather
-from typing import TypedDict
-from aiohttp import ClientResponse, ClientSession
+import json
+import os
+import re
+import time
+from asyncio import gather, timeout_at
+from collections import OrderedDict
+from datetime import date
+from typing import Optional, TypedDict
+from urllib.parse import urlencode, urlparse
+from aiohttp import ClientError, ClientResponse, ClientSession
 
 from ..interfaces.movie_service_interface import AnimeListReturn, Genre, IService
 
 from ..interfaces.displayer_interface import AnimeDetailedInfo, AnimeListItem
 
 from ..products.tmdb import TMDBAnimeDisplayInfo, TMDBAnimeDetailDisplayInfo
-from ..utils.exceptions import DefaultException
+from .circuit_breaker import CircuitBreaker
+from .rate_limiter import RateLimiter
+from .request_scheduler import RequestScheduler
+from .response_cache import ResponseCache
+from ..utils.cache_dir import get_cache_dir
+from ..utils.deadline import get_deadline
+from ..utils.metrics import cache_requests, stale_responses, upstream_bytes, upstream_request_seconds, upstream_responses
+from ..utils.profiler import span
+from ..utils.request_priority import RequestPriority
+from ..utils.exceptions import DeadlineExceeded, DefaultException, ServiceUnavailable
 from ..utils.decorators.authenticate import authenticate
 
 AnimeInfo = TypedDict(
@@ -34,16 +50,64 @@ class TMDBService(IService):
     _default_uri = "https://api.themoviedb.org/3"
     _default_image_uri = "https://image.tmdb.org/t/p/w500"
     _default_youtube_uri = "https://www.youtube.com/watch?v="
+    _configuration_max_age = 7 * 24 * 60 * 60
+    # Responses are reused from memory for this many seconds, which only
+    # matters when one process runs several commands, like the shell.
+    _recent_max_age = 120.0
+    _recent_max_entries = 256
     _token = ""
+    _image_uri: str
+    _configuration: dict | None
+    _scheduler: RequestScheduler
+    _responses: ResponseCache | None
+    _breaker: CircuitBreaker
+    _rate_limiter: RateLimiter
+    _recent: OrderedDict[str, tuple[float, dict]]
 
-    def __init__(self, token: str):
+    def __init__(
+        self,
+        token: str,
+        scheduler: RequestScheduler | None = None,
+        responses: ResponseCache | None = None,
+        breaker: CircuitBreaker | None = None,
+        rate_limiter: RateLimiter | None = None
+    ):
         self._token = token
+        self._image_uri = self._default_image_uri
+        self._configuration = None
+        self._scheduler = scheduler or RequestScheduler()
+        self._responses = responses
+        self._breaker = breaker or CircuitBreaker()
+        self._rate_limiter = rate_limiter or RateLimiter()
+        self._recent = OrderedDict()
+
+    async def configure_images(self, session: ClientSession, width: int):
+        try:
+            configuration = await self._get_configuration(session)
+        except (DefaultException, ClientError):
+            return
+
+        images = configuration["images"]
+        sizes = sorted(
+            (int(size[1:]), size)
+            for size in images["poster_sizes"]
+            if size.startswith("w") and size[1:].isdigit()
+        )
+        if not sizes:
+            return
+
+        poster_size = next(
+            (size for size_width, size in sizes if size_width >= width),
+            sizes[-1][1]
+        )
+        self._image_uri = f'{images["secure_base_url"]}{poster_size}'
 
     async def get_anime_list(
         self,
         session: ClientSession,
         page = 1,
-        genres_filter: str = ""
+        genres_filter: str = "",
+        priority: RequestPriority = RequestPriority.METADATA
     ) -> AnimeListReturn:
         genres = await self.get_genres_list(session)
         filter = self._convert_genre_filter(genres, genres_filter)
@@ -51,17 +115,21 @@ class TMDBService(IService):
         fetched_animes = await self._fetch_animes(
             session,
             page,
-            filter
+            filter,
+            priority
         )
         anime_list = self._parse_fetched_animes(
             fetched_animes["results"],
             genres
         )
-        return {
+        anime_list_return: AnimeListReturn = {
             "anime_list": anime_list,
             "page": fetched_animes["page"],
             "total_pages": fetched_animes["total_pages"]
         }
+        if fetched_animes.get("stale"):
+            anime_list_return["stale"] = True
+        return anime_list_return
 
     @authenticate
     async def get_anime_details(
@@ -85,7 +153,7 @@ class TMDBService(IService):
                 details["overview"],
                 [g["name"] for g in details["genres"]],
                 details["first_air_date"],
-                f'{self._default_image_uri}{details["poster_path"]}',
+                f'{self._image_uri}{details["poster_path"]}',
                 details["number_of_episodes"],
                 details["number_of_seasons"],
                 details["status"],
@@ -98,16 +166,25 @@ class TMDBService(IService):
                     if t["site"] == "YouTube"
                 ]
         )
-        return anime_details.get_dict()
+        anime_details_dict = anime_details.get_dict()
+        if details.get("stale") or trailers.get("stale"):
+            anime_details_dict["stale"] = True
+        return anime_details_dict
 
     async def get_anime_list_by_name(
         self,
         session: ClientSession,
         name: str,
         page: int,
-        genres_filter: str = ""
+        genres_filter: str = "",
+        priority: RequestPriority = RequestPriority.METADATA
     ) -> AnimeListReturn:
-        anime_result = await self._fetch_anime_by_name(session, page, name)
+        anime_result = await self._fetch_anime_by_name(
+            session,
+            page,
+            name,
+            priority
+        )
         genres = await self.get_genres_list(session)
         filter = self._convert_genre_filter(genres, genres_filter)
 
@@ -123,11 +200,14 @@ class TMDBService(IService):
             animes,
             genres
         )
-        return {
+        anime_list_return: AnimeListReturn = {
             "total_pages": anime_result["total_pages"],
             "anime_list": anime_list,
             "page": anime_result["page"]
         }
+        if anime_result.get("stale"):
+            anime_list_return["stale"] = True
+        return anime_list_return
 
     @authenticate
     async def get_genres_list(self, session: ClientSession) -> list[Genre]:
@@ -137,12 +217,79 @@ class TMDBService(IService):
         )
         return result["genres"]
 
+    @authenticate
+    async def get_changed_anime_ids(
+        self,
+        session: ClientSession,
+        start_date: date,
+        end_date: date
+    ) -> list[int]:
+        params = {
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat(),
+            "page": 1
+        }
+        url = f"{self._default_uri}/tv/changes"
+        # A stale feed would hide changes, it is never served from cache.
+        first_page = await self._fetch(session, url, params, cache=False)
+        # The other pages go a few at a time, behind any other request.
+        pages = [first_page] + list(await gather(*[
+            self._fetch(
+                session,
+                url,
+                {**params, "page": page},
+                cache=False,
+                priority=RequestPriority.PREFETCH
+            )
+            for page in range(2, first_page["total_pages"] + 1)
+        ]))
+        return [
+            change["id"]
+            for page in pages
+            for change in page["results"]
+        ]
+
+    async def _get_configuration(self, session: ClientSession) -> dict:
+        if self._configuration:
+            return self._configuration
+
+        path = os.path.join(get_cache_dir(), "tmdb_configuration.json")
+        try:
+            with open(path) as f:
+                cached = json.load(f)
+            if time.time() - cached["fetched_at"] < self._configuration_max_age:
+                self._configuration = cached["configuration"]
+                return cached["configuration"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+        configuration = await self._fetch_configuration(session)
+        if configuration.get("stale"):
+            # Used this once, the API is asked again next time.
+            return configuration
+        try:
+            with open(path, "w") as f:
+                json.dump(
+                    {"fetched_at": time.time(), "configuration": configuration},
+                    f
+                )
+        except OSError:
+            # Without the cache the configuration is fetched every run.
+            pass
+        self._configuration = configuration
+        return configuration
+
+    @authenticate
+    async def _fetch_configuration(self, session: ClientSession) -> dict:
+        return await self._fetch(session, f"{self._default_uri}/configuration")
+
     @authenticate
     async def _fetch_anime_by_name(
         self,
         session: ClientSession,
         page: int,
-        name: str
+        name: str,
+        priority: RequestPriority = RequestPriority.METADATA
     ):
         params = {
             "include_adult": "false",
@@ -154,7 +301,8 @@ class TMDBService(IService):
         return await self._fetch(
             session,
             f"{self._default_uri}/search/tv",
-            params
+            params,
+            priority=priority
         )
 
     @authenticate
@@ -162,7 +310,8 @@ class TMDBService(IService):
         self,
         session: ClientSession,
         page: int,
-        genres: str = ""
+        genres: str = "",
+        priority: RequestPriority = RequestPriority.METADATA
     ):
         params = {
             "include_adult": "false",
@@ -176,7 +325,8 @@ class TMDBService(IService):
         resp_body = await self._fetch(
             session,
             f'{self._default_uri}/discover/tv',
-            params
+            params,
+            priority=priority
         )
         return resp_body
 
@@ -184,12 +334,138 @@ class TMDBService(IService):
         self,
         session: ClientSession,
         url: str,
-        params: dict | None = None
+        params: dict | None = None,
+        cache: bool = True,
+        priority: RequestPriority = RequestPriority.METADATA
     ) -> dict:
-        async with session.get(url, params=params) as response:
-            result = await response.json()
+        """The last good response is returned as stale when the API fails."""
+        endpoint = self._endpoint(url)
+        cache_key = self._cache_key(url, params) if cache else None
+        if cache_key:
+            recent = self._recent_response(cache_key)
+            cache_requests.inc(
+                cache="tmdb_memory",
+                result="hit" if recent else "miss"
+            )
+            if recent:
+                return recent
+        if not self._breaker.allow(endpoint):
+            return self._stale_response(
+                cache_key,
+                ServiceUnavailable(
+                    "TMDB is unavailable, try again later",
+                    {"url": url, "endpoint": endpoint}
+                ),
+                endpoint,
+                "circuit_open"
+            )
+
+        started_at = time.monotonic()
+        recorded = False
+        try:
+            try:
+                with span(f"tmdb {endpoint}"):
+                    async with timeout_at(get_deadline()):
+                        await self._rate_limiter.acquire()
+                        async with self._scheduler.slot(priority):
+                            sent_at = time.monotonic()
+                            async with session.get(
+                                url,
+                                params=params
+                            ) as response:
+                                # Read first so the bytes can be counted,
+                                # json() decodes the same body.
+                                body = await response.read()
+                                result = await response.json()
+                            upstream_request_seconds.observe(
+                                time.monotonic() - sent_at,
+                                endpoint=endpoint
+                            )
+            except TimeoutError:
+                upstream_responses.inc(endpoint=endpoint, status="timeout")
+                # A short budget running out says nothing about the API.
+                if time.monotonic() - started_at >= self._breaker.slow_call:
+                    self._breaker.record(endpoint, True)
+                    recorded = True
+                return self._stale_response(
+                    cache_key,
+                    DeadlineExceeded(
+                        "Request timed out",
+                        {"url": url, "params": params}
+                    ),
+                    endpoint,
+                    "timeout"
+                )
+            except ClientError as e:
+                upstream_responses.inc(endpoint=endpoint, status="error")
+                self._breaker.record(endpoint, True)
+                recorded = True
+                return self._stale_response(cache_key, e, endpoint, "error")
+
+            upstream_responses.inc(
+                endpoint=endpoint,
+                status=str(response.status)
+            )
+            upstream_bytes.inc(len(body), endpoint=endpoint)
+
+            api_failed = response.status >= 500 or response.status == 429
+            slow = time.monotonic() - started_at >= self._breaker.slow_call
+            self._breaker.record(endpoint, api_failed or slow)
+            recorded = True
+        finally:
+            if not recorded:
+                self._breaker.release(endpoint)
+
+        try:
             self._raise_for_status(response, None, result)
-            return result
+        except DefaultException as e:
+            if api_failed:
+                return self._stale_response(cache_key, e, endpoint, "status")
+            raise
+        if cache_key and self._responses:
+            self._responses.put(cache_key, result)
+        if cache_key:
+            self._recent[cache_key] = (time.monotonic(), result)
+            self._recent.move_to_end(cache_key)
+            while len(self._recent) > self._recent_max_entries:
+                self._recent.popitem(last=False)
+        return result
+
+    def _recent_response(self, cache_key: str) -> Optional[dict]:
+        if cache_key not in self._recent:
+            return None
+        fetched_at, result = self._recent[cache_key]
+        if time.monotonic() - fetched_at >= self._recent_max_age:
+            del self._recent[cache_key]
+            return None
+        self._recent.move_to_end(cache_key)
+        return result
+
+    def _stale_response(
+        self,
+        cache_key: Optional[str],
+        error: Exception,
+        endpoint: str,
+        reason: str
+    ) -> dict:
+        """reason is why the API wasn't used, for the metrics."""
+        cached = None
+        if cache_key and self._responses:
+            cached = self._responses.get(cache_key)
+        if not cached:
+            raise error
+        stale_responses.inc(endpoint=endpoint, reason=reason)
+        return {**cached.body, "stale": True}
+
+    def _endpoint(self, url: str) -> str:
+        base_path = urlparse(self._default_uri).path
+        path = urlparse(url).path.removeprefix(base_path)
+        return re.sub(r"/\d+(?=/|$)", "/{id}", path)
+
+    def _cache_key(self, url: str, params: dict | None) -> str:
+        if not params:
+            return url
+        return f"{url}?{urlencode(sorted(params.items()))}"
 
     def _parse_fetched_animes(
         self,
@@ -204,7 +480,7 @@ class TMDBService(IService):
                 anime["overview"],
                 [g["name"] for g in genres if g["id"] in anime["genre_ids"]],
                 anime["first_air_date"],
-                f'{self._default_image_uri}{anime["poster_path"]}',
+                f'{self._image_uri}{anime["poster_path"]}',
             ).get_dict())
 
         return parsed_anime_list
@@ -0,0 +1,10 @@
+import os
+
+def get_cache_dir(*parts: str) -> str:
+    base = os.getenv("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"),
+        ".cache"
+    )
+    path = os.path.join(base, "anime_list", *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
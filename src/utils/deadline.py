@@ -0,0 +1,22 @@
+import asyncio
+from contextvars import ContextVar
+from typing import Awaitable, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Event loop time by which the running command must be done, tasks
+# created by the command inherit it.
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+def get_deadline() -> Optional[float]:
+    """Loop time of the current deadline, None when there is no budget."""
+    return _deadline.get()
+
+async def run_with_deadline(
+    coroutine: Awaitable[T],
+    timeout: Optional[float]
+) -> T:
+    """Network calls time out at get_deadline(), timeout seconds from now."""
+    if timeout:
+        _deadline.set(asyncio.get_running_loop().time() + timeout)
+    return await coroutine
@@ -5,3 +5,9 @@ class DefaultException(Exception):
         super()
         self.args = message,
         self.context = context
+
+class DeadlineExceeded(DefaultException):
+    pass
+
+class ServiceUnavailable(DefaultException):
+    pass
@@ -0,0 +1,217 @@
+import bisect
+from abc import ABC, abstractmethod
+import os
+import tempfile
+import threading
+from typing import Optional
+
+LabelValues = tuple[str, ...]
+
+class _Metric(ABC):
+    name: str
+    help: str
+    labels: tuple[str, ...]
+    _registry: "MetricsRegistry"
+    _lock: threading.Lock
+
+    def __init__(
+        self,
+        registry: "MetricsRegistry",
+        name: str,
+        help: str,
+        labels: tuple[str, ...]
+    ):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._registry = registry
+        self._lock = threading.Lock()
+
+    def _label_values(self, labels: dict[str, str]) -> LabelValues:
+        return tuple(str(labels[label]) for label in self.labels)
+
+    def _format_labels(
+        self,
+        values: LabelValues,
+        extra: Optional[tuple[str, str]] = None
+    ) -> str:
+        pairs = list(zip(self.labels, values))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        escaped = ",".join(
+            f'{label}="{_escape(value)}"' for label, value in pairs
+        )
+        return "{" + escaped + "}"
+
+    @abstractmethod
+    def render(self) -> list[str]:
+        ...
+
+class Counter(_Metric):
+    _values: dict[LabelValues, float]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values = {}
+
+    def inc(self, amount: float = 1, **labels: str):
+        if not self._registry.enabled:
+            return
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._label_values(labels), 0)
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} counter"
+        ]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(
+                    f"{self.name}{self._format_labels(key)} {_number(value)}"
+                )
+        return lines
+
+class Histogram(_Metric):
+    default_buckets = (
+        0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+    )
+    buckets: tuple[float, ...]
+    # Per label values: the count of each bucket, then sum and count.
+    _values: dict[LabelValues, tuple[list[int], list[float]]]
+
+    def __init__(
+        self,
+        *args,
+        buckets: tuple[float, ...] = default_buckets,
+        **kwargs
+    ):
+        super().__init__(*args, **kwargs)
+        self.buckets = buckets
+        self._values = {}
+
+    def observe(self, value: float, **labels: str):
+        if not self._registry.enabled:
+            return
+        key = self._label_values(labels)
+        bucket = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            if key not in self._values:
+                self._values[key] = ([0] * (len(self.buckets) + 1), [0.0, 0])
+            counts, totals = self._values[key]
+            counts[bucket] += 1
+            totals[0] += value
+            totals[1] += 1
+
+    def count(self, **labels: str) -> int:
+        values = self._values.get(self._label_values(labels))
+        return int(values[1][1]) if values else 0
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} histogram"
+        ]
+        with self._lock:
+            for key, (counts, (total, count)) in sorted(self._values.items()):
+                cumulative = 0
+                bounds = [_number(b) for b in self.buckets] + ["+Inf"]
+                for bound, bucket_count in zip(bounds, counts):
+                    cumulative += bucket_count
+                    labels = self._format_labels(key, ("le", bound))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = self._format_labels(key)
+                lines.append(f"{self.name}_sum{labels} {_number(total)}")
+                lines.append(f"{self.name}_count{labels} {_number(count)}")
+        return lines
+
+class MetricsRegistry():
+    """Nothing is recorded until it is enabled."""
+    enabled: bool
+    _metrics: list[_Metric]
+
+    def __init__(self):
+        self.enabled = False
+        self._metrics = []
+
+    def counter(
+        self,
+        name: str,
+        help: str,
+        labels: tuple[str, ...] = ()
+    ) -> Counter:
+        counter = Counter(self, name, help, labels)
+        self._metrics.append(counter)
+        return counter
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = Histogram.default_buckets
+    ) -> Histogram:
+        histogram = Histogram(self, name, help, labels, buckets=buckets)
+        self._metrics.append(histogram)
+        return histogram
+
+    def render(self) -> str:
+        return "".join(
+            line + "\n"
+            for metric in self._metrics
+            for line in metric.render()
+        )
+
+    def write(self, path: str):
+        """Replaces path at once, so a collector never reads half of it."""
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory)
+        with os.fdopen(fd, "w") as f:
+            f.write(self.render())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+registry = MetricsRegistry()
+
+upstream_request_seconds = registry.histogram(
+    "anime_list_upstream_request_seconds",
+    "Time from sending a request to TMDB or the cover host until its body was read.",
+    ("endpoint",)
+)
+upstream_responses = registry.counter(
+    "anime_list_upstream_responses_total",
+    "Upstream responses by status code, 'error' and 'timeout' when there was none.",
+    ("endpoint", "status")
+)
+upstream_bytes = registry.counter(
+    "anime_list_upstream_bytes_total",
+    "Bytes of upstream response bodies, as reported by Content-Length for the API.",
+    ("endpoint",)
+)
+stale_responses = registry.counter(
+    "anime_list_stale_responses_total",
+    "Saved responses served because the API failed or its circuit was open.",
+    ("endpoint", "reason")
+)
+cache_requests = registry.counter(
+    "anime_list_cache_requests_total",
+    "Cache lookups by cache and result: hit, miss, or stale for entries which had to be revalidated.",
+    ("cache", "result")
+)
+stage_seconds = registry.histogram(
+    "anime_list_stage_seconds",
+    "Duration of the stages --profile reports, like db.* queries and render.*.",
+    ("stage",)
+)
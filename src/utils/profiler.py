@@ -0,0 +1,132 @@
+import asyncio
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Any, ContextManager, Iterator, Optional
+
+from .metrics import registry, stage_seconds
+
+class Span:
+    name: str
+    start_ns: int
+    end_ns: int
+    lane: str
+    args: dict[str, Any]
+
+    def __init__(
+        self,
+        name: str,
+        start_ns: int,
+        end_ns: int,
+        lane: str,
+        args: dict[str, Any]
+    ):
+        self.name = name
+        self.start_ns = start_ns
+        self.end_ns = end_ns
+        self.lane = lane
+        self.args = args
+
+class Profiler():
+    """Spans are put in the lane of the task or thread they ran in."""
+    spans: list[Span]
+    started_ns: int
+
+    def __init__(self):
+        self.spans = []
+        self.started_ns = time.perf_counter_ns()
+
+    def record(self, span: Span):
+        # list.append is atomic, spans come from executor threads too.
+        self.spans.append(span)
+
+    def summary(self) -> list[tuple[str, int, float, float, float]]:
+        """Spans nest, so a stage's total includes the stages run inside it."""
+        stages: dict[str, list[int]] = {}
+        for span in self.spans:
+            stages.setdefault(span.name, []).append(
+                span.end_ns - span.start_ns
+            )
+        rows = [
+            (
+                name,
+                len(durations),
+                sum(durations) / 1e6,
+                sum(durations) / len(durations) / 1e6,
+                max(durations) / 1e6
+            ) for name, durations in stages.items()
+        ]
+        return sorted(rows, key=lambda row: row[2], reverse=True)
+
+    def chrome_trace(self) -> dict:
+        """The spans in the Chrome trace event format, for about:tracing."""
+        pid = os.getpid()
+        lanes: dict[str, int] = {}
+        events: list[dict] = []
+        for span in sorted(self.spans, key=lambda span: span.start_ns):
+            if span.lane not in lanes:
+                lanes[span.lane] = len(lanes) + 1
+                events.append({
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": pid,
+                    "tid": lanes[span.lane],
+                    "args": {"name": span.lane}
+                })
+            events.append({
+                "name": span.name,
+                "ph": "X",
+                "ts": (span.start_ns - self.started_ns) / 1000,
+                "dur": (span.end_ns - span.start_ns) / 1000,
+                "pid": pid,
+                "tid": lanes[span.lane],
+                "args": span.args
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+# Profiler of the running command, None when it isn't profiled.
+_profiler: ContextVar[Optional[Profiler]] = ContextVar("profiler", default=None)
+_disabled = nullcontext()
+
+def get_profiler() -> Optional[Profiler]:
+    return _profiler.get()
+
+def set_profiler(profiler: Optional[Profiler]):
+    _profiler.set(profiler)
+
+def span(name: str, **args: Any) -> ContextManager:
+    """A shared no-op context manager when nothing is recorded."""
+    profiler = _profiler.get()
+    if not profiler and not registry.enabled:
+        return _disabled
+    return _record_span(profiler, name, args)
+
+def is_timing() -> bool:
+    return _profiler.get() != None or registry.enabled
+
+@contextmanager
+def _record_span(
+    profiler: Optional[Profiler],
+    name: str,
+    args: dict[str, Any]
+) -> Iterator[None]:
+    start_ns = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        end_ns = time.perf_counter_ns()
+        stage_seconds.observe((end_ns - start_ns) / 1e9, stage=name)
+        if profiler:
+            profiler.record(Span(name, start_ns, end_ns, _lane(), args))
+
+def _lane() -> str:
+    thread = threading.current_thread()
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    if task and thread is threading.main_thread():
+        return task.get_name()
+    return thread.name
@@ -0,0 +1,7 @@
+from enum import IntEnum
+
+class RequestPriority(IntEnum):
+    # Lower values go first.
+    METADATA = 0
+    VISIBLE = 1
+    PREFETCH = 2
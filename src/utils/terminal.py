@@ -0,0 +1,13 @@
+import shutil
+from contextvars import ContextVar
+from typing import Optional
+
+# Columns of the terminal output goes to, when it isn't the one of this
+# process, like for commands the daemon runs for a client.
+_columns: ContextVar[Optional[int]] = ContextVar("columns", default=None)
+
+def get_terminal_columns() -> int:
+    return _columns.get() or shutil.get_terminal_size().columns
+
+def set_terminal_columns(columns: Optional[int]):
+    _columns.set(columns)
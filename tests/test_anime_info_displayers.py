@@ -0,0 +1,23 @@
+import io
+from contextlib import redirect_stdout
+from unittest import TestCase
+
+from src.dtos.dto_anime import DTOAnime
+from src.presentation.anime_info_displayers import DBAnimeCoverDisplayer
+from src.presentation.text_layout import display_width
+from src.utils.terminal import set_terminal_columns
+
+class TestDBAnimeCoverDisplayer(TestCase):
+    def setUp(self):
+        set_terminal_columns(60)
+        self.addCleanup(set_terminal_columns, None)
+
+    def test_cuts_wide_titles_to_the_terminal(self):
+        anime = DTOAnime(1, 100, 2, None, None, None, "葬送のフリーレン" * 3, "To Watch")
+        stdout = io.StringIO()
+        with redirect_stdout(stdout):
+            DBAnimeCoverDisplayer(anime, None).render_info()
+        lines = stdout.getvalue().splitlines()
+        title = next(line for line in lines if "Title: " in line)
+        self.assertTrue(title.endswith("..."))
+        self.assertTrue(all(display_width(line) <= 60 for line in lines))
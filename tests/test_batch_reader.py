@@ -0,0 +1,71 @@
+import io
+from unittest import TestCase
+
+from src.presentation.batch_reader import BatchUpdateReader
+
+class TestBatchUpdateReader(TestCase):
+    def test_reads_ndjson_records(self):
+        stream = io.StringIO(
+            '{"anime_id": 1, "last_watched_episode": 3}\n'
+            '\n'
+            '{"anime_id": "2", "watching_season": 2, "tag_id": 3}\n'
+        )
+        reader = BatchUpdateReader()
+        updates = reader.read(stream)
+        self.assertEqual(reader.errors, [])
+        self.assertEqual(updates, [
+            {
+                "anime_id": 1,
+                "watching_season": None,
+                "last_watched_episode": 3,
+                "tag_id": None
+            },
+            {
+                "anime_id": 2,
+                "watching_season": 2,
+                "last_watched_episode": None,
+                "tag_id": 3
+            }
+        ])
+
+    def test_reads_csv_records(self):
+        stream = io.StringIO(
+            "anime_id,watching_season,tag_id\n"
+            "1,2,\n"
+            "4,,3\n"
+        )
+        reader = BatchUpdateReader()
+        updates = reader.read(stream)
+        self.assertEqual(reader.errors, [])
+        self.assertEqual(
+            [(u["anime_id"], u["watching_season"], u["tag_id"]) for u in updates],
+            [(1, 2, None), (4, None, 3)]
+        )
+
+    def test_reports_invalid_records_by_line(self):
+        stream = io.StringIO(
+            '{"anime_id": 1}\n'
+            '{"anime_id": 1.5, "tag_id": 1}\n'
+            'not json\n'
+            '{"anime_id": 2, "tag_id": 9}\n'
+            '{"anime_id": 3, "episode": 1}\n'
+            '{"anime_id": 4, "tag_id": 2}\n'
+        )
+        reader = BatchUpdateReader(valid_tags={1, 2, 3})
+        updates = reader.read(stream)
+        self.assertEqual([u["anime_id"] for u in updates], [4])
+        self.assertEqual(
+            [e.split(":")[0] for e in reader.errors],
+            ["line 1", "line 2", "line 3", "line 4", "line 5"]
+        )
+
+    def test_rejects_unknown_csv_header(self):
+        reader = BatchUpdateReader()
+        updates = reader.read(io.StringIO("id,tag\n1,2\n"))
+        self.assertEqual(updates, [])
+        self.assertEqual(len(reader.errors), 1)
+
+    def test_empty_input(self):
+        reader = BatchUpdateReader()
+        self.assertEqual(reader.read(io.StringIO("\n\n")), [])
+        self.assertEqual(reader.errors, [])
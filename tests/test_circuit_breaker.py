@@ -0,0 +1,72 @@
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+from src.services.circuit_breaker import CircuitBreaker
+
+class TestCircuitBreaker(TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp_dir.name, "circuit.json")
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def fail(self, breaker: CircuitBreaker, endpoint: str, calls: int):
+        for _ in range(calls):
+            self.assertTrue(breaker.allow(endpoint))
+            breaker.record(endpoint, True)
+
+    def test_opens_after_failure_ratio(self):
+        breaker = CircuitBreaker()
+        breaker.record("/tv/{id}", False)
+        self.fail(breaker, "/tv/{id}", 2)
+        self.assertTrue(breaker.allow("/tv/{id}"))
+        breaker.record("/tv/{id}", True)
+        self.assertFalse(breaker.allow("/tv/{id}"))
+        # Other endpoints are not affected.
+        self.assertTrue(breaker.allow("/discover/tv"))
+
+    def test_half_open_probe(self):
+        breaker = CircuitBreaker()
+        self.fail(breaker, "/tv/{id}", breaker.min_calls)
+        later = breaker._state("/tv/{id}").opened_at + breaker.open_seconds
+        with patch("src.services.circuit_breaker.time.time", return_value=later):
+            self.assertTrue(breaker.allow("/tv/{id}"))
+            # Only one probe at a time.
+            self.assertFalse(breaker.allow("/tv/{id}"))
+            breaker.record("/tv/{id}", False)
+            self.assertFalse(breaker.is_open("/tv/{id}"))
+            self.assertTrue(breaker.allow("/tv/{id}"))
+
+    def test_failed_probe_opens_again(self):
+        breaker = CircuitBreaker()
+        self.fail(breaker, "/tv/{id}", breaker.min_calls)
+        later = breaker._state("/tv/{id}").opened_at + breaker.open_seconds
+        with patch("src.services.circuit_breaker.time.time", return_value=later):
+            self.assertTrue(breaker.allow("/tv/{id}"))
+            breaker.record("/tv/{id}", True)
+            self.assertFalse(breaker.allow("/tv/{id}"))
+
+    def test_state_outlives_the_breaker(self):
+        breaker = CircuitBreaker(self.path)
+        self.fail(breaker, "/tv/{id}", breaker.min_calls)
+        self.assertFalse(CircuitBreaker(self.path).allow("/tv/{id}"))
+
+    def test_saves_only_when_endpoint_opens_or_closes(self):
+        breaker = CircuitBreaker(self.path)
+        breaker.record("/tv/{id}", False)
+        self.fail(breaker, "/tv/{id}", breaker.min_calls - 2)
+        self.assertFalse(os.path.exists(self.path))
+        self.fail(breaker, "/tv/{id}", 1)
+        self.assertTrue(os.path.exists(self.path))
+
+    def test_keeps_endpoints_saved_by_other_breakers(self):
+        first, second = CircuitBreaker(self.path), CircuitBreaker(self.path)
+        second.record("/discover/tv", False)
+        self.fail(first, "/tv/{id}", first.min_calls)
+        self.fail(second, "/discover/tv", second.min_calls - 1)
+        restored = CircuitBreaker(self.path)
+        self.assertTrue(restored.is_open("/tv/{id}"))
+        self.assertTrue(restored.is_open("/discover/tv"))
@@ -0,0 +1,43 @@
+from unittest import TestCase
+
+from src.presentation.color_palette import ColorPalette, detect_color_depth, get_palette
+from src.presentation.image_builder import ImagePixels
+
+class TestDetectColorDepth(TestCase):
+    def test_detects_depth_from_environment(self):
+        self.assertEqual(
+            detect_color_depth({"COLORTERM": "truecolor", "TERM": "xterm"}),
+            "truecolor"
+        )
+        self.assertEqual(
+            detect_color_depth({"TERM": "screen-256color"}),
+            "256"
+        )
+        self.assertEqual(detect_color_depth({"TERM": "linux"}), "16")
+        self.assertEqual(detect_color_depth({}), "16")
+
+class TestColorPalette(TestCase):
+    def test_truecolor_has_no_palette(self):
+        self.assertIsNone(get_palette("truecolor"))
+
+    def test_quantizes_to_nearest_palette_color(self):
+        width = ImagePixels.default_width
+        packed = bytes([250, 5, 5] * width + [1, 1, 1] * width)
+        image_pixels = ImagePixels(packed, 2)
+        for depth in ("256", "16"):
+            palette = ColorPalette(depth)
+            quantized = palette.quantize(image_pixels)
+            self.assertTrue(quantized.indexed)
+            self.assertEqual(len(quantized.image_pixels), width * 2)
+            self.assertEqual(quantized.row_count, 2)
+            indexes = quantized.image_pixels
+            self.assertEqual(palette.colors[indexes[0]], (255, 0, 0))
+            self.assertEqual(palette.colors[indexes[-1]], (0, 0, 0))
+
+    def test_escape_tables(self):
+        palette = ColorPalette("256")
+        self.assertEqual(palette.foreground[0], "\033[38;5;16m")
+        self.assertEqual(palette.background[-1], "\033[48;5;255m")
+        palette = ColorPalette("16")
+        self.assertEqual(palette.foreground[1], "\033[31m")
+        self.assertEqual(palette.background[9], "\033[101m")
@@ -0,0 +1,210 @@
+import asyncio
+import io
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, Mock
+
+from src.dtos.dto_anime import DTOAnime
+from src.dtos.dto_discover_snapshot import DTODiscoverSnapshot
+from src.interfaces.database_interface import IDatabase
+from src.interfaces.movie_service_interface import IService
+from src.presentation.controller import Controller
+from src.presentation.image_builder import ImageBuilder, ImagePixels
+from src.utils.request_priority import RequestPriority
+from src.utils.exceptions import DefaultException, ServiceUnavailable
+
+def create_anime_list(delays: list[float]) -> dict:
+    return {
+        "anime_list": [
+            {
+                "api_id": n,
+                "title": f"Anime {n}",
+                "overview": "",
+                "genres": [],
+                "release_date": "",
+                "cover_url": str(delay)
+            } for n, delay in enumerate(delays)
+        ],
+        "page": 1,
+        "total_pages": 1
+    }
+
+class TestRenderAnimeList(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.rendered_at: dict[str, float] = {}
+        self.stdout = io.StringIO()
+        image_builder = Mock(ImageBuilder)
+
+        async def produce_ascii_image(session, cover_url):
+            await asyncio.sleep(float(cover_url))
+            return ImagePixels(bytes(ImagePixels.default_width * 3), 1)
+
+        image_builder.produce_ascii_image.side_effect = produce_ascii_image
+        self.controller = Controller(
+            AsyncMock(IService),
+            Mock(IDatabase),
+            image_builder
+        )
+
+    async def render(self, delays: list[float], deadline=None) -> list[str]:
+        with redirect_stdout(self.stdout):
+            await self.controller._render_anime_list(
+                Mock(),
+                create_anime_list(delays),
+                deadline
+            )
+        return [
+            line for line in self.stdout.getvalue().splitlines()
+            if "ID: " in line
+        ]
+
+    async def test_renders_in_order_without_waiting_for_later_covers(self):
+        render = asyncio.create_task(self.render([0, 0.2, 0]))
+        await asyncio.sleep(0.05)
+        self.assertIn("ID: 0", self.stdout.getvalue())
+        self.assertNotIn("ID: 1", self.stdout.getvalue())
+        lines = await render
+        self.assertEqual(
+            [line.split("|")[1] for line in lines],
+            ["ID: 0", "ID: 1", "ID: 2"]
+        )
+
+    async def test_renders_without_cover_after_deadline(self):
+        lines = await self.render([0, 10], deadline=0.05)
+        self.assertTrue(lines[0].startswith("\033["))
+        self.assertTrue(lines[1].startswith(" " * ImagePixels.default_width))
+
+class TestDiscoverSnapshots(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.service = AsyncMock(IService)
+        self.service.get_anime_list.return_value = create_anime_list([0])
+        self.db = Mock(IDatabase)
+        self.controller = Controller(self.service, self.db, Mock(ImageBuilder))
+        self.controller._render_anime_list = AsyncMock()
+        self.stdout = io.StringIO()
+
+    def create_snapshot(self, age: timedelta) -> DTODiscoverSnapshot:
+        return DTODiscoverSnapshot(
+            "action",
+            1,
+            create_anime_list([0, 0]),
+            datetime.now() - age
+        )
+
+    async def test_fetches_and_saves_missing_pages(self):
+        self.db.get_discover_snapshot.return_value = None
+        await self.controller.service_list_animes(1, "Action ")
+        self.db.get_discover_snapshot.assert_called_with("action", 1)
+        self.db.save_discover_snapshot.assert_called_once()
+        rendered = self.controller._render_anime_list.call_args.args[1]
+        self.assertEqual(len(rendered["anime_list"]), 1)
+
+    async def test_serves_fresh_snapshot_without_the_api(self):
+        self.db.get_discover_snapshot.return_value = self.create_snapshot(
+            timedelta(minutes=1)
+        )
+        await self.controller.service_list_animes(1, "action")
+        self.service.get_anime_list.assert_not_called()
+        rendered = self.controller._render_anime_list.call_args.args[1]
+        self.assertEqual(len(rendered["anime_list"]), 2)
+
+    async def test_revalidates_old_snapshot_after_serving_it(self):
+        self.db.get_discover_snapshot.return_value = self.create_snapshot(
+            timedelta(days=1)
+        )
+        await self.controller.service_list_animes(1, "action")
+        rendered = self.controller._render_anime_list.call_args.args[1]
+        self.assertEqual(len(rendered["anime_list"]), 2)
+        self.service.get_anime_list.assert_awaited_once()
+        self.db.save_discover_snapshot.assert_called_once()
+
+    async def test_cancels_revalidation_when_render_fails(self):
+        self.db.get_discover_snapshot.return_value = self.create_snapshot(
+            timedelta(days=1)
+        )
+
+        async def get_anime_list(*args):
+            await asyncio.sleep(10)
+
+        self.service.get_anime_list.side_effect = get_anime_list
+        self.controller._render_anime_list.side_effect = DefaultException(
+            "failed",
+            {}
+        )
+        with redirect_stdout(self.stdout):
+            await asyncio.wait_for(
+                self.controller.service_list_animes(1, "action"),
+                1
+            )
+        self.assertIn("Error failed", self.stdout.getvalue())
+        self.assertEqual(asyncio.all_tasks(), {asyncio.current_task()})
+
+    async def test_prefetches_next_page_at_prefetch_priority(self):
+        self.db.get_discover_snapshot.return_value = None
+        await self.controller.service_prefetch_page(2, "", "action")
+        self.assertEqual(
+            self.service.get_anime_list.call_args.args[3],
+            RequestPriority.PREFETCH
+        )
+        self.service.get_anime_list_by_name.return_value = create_anime_list([0])
+        await self.controller.service_prefetch_page(2, "naruto", "")
+        self.assertEqual(
+            self.service.get_anime_list_by_name.call_args.args[4],
+            RequestPriority.PREFETCH
+        )
+
+class TestRefreshWatermark(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.service = AsyncMock(IService)
+        self.service.get_anime_details.side_effect = self.get_anime_details
+        self.service.get_changed_anime_ids.return_value = [2]
+        self.db = Mock(IDatabase)
+        self.db.get_animes.return_value = [self.create_anime(1), self.create_anime(2)]
+        self.db.get_animes_by_tmdb_ids.return_value = [self.create_anime(2)]
+        self.db.bulk_refresh_animes.side_effect = len
+        self.controller = Controller(self.service, self.db, Mock(ImageBuilder))
+        self.controller._session = Mock()
+        self.unavailable: set[int] = set()
+        self.stdout = io.StringIO()
+
+    def create_anime(self, tmdb_id: int) -> DTOAnime:
+        return DTOAnime(tmdb_id, tmdb_id, 1, None, None, None, "Anime", "To Watch")
+
+    async def get_anime_details(self, session, tmdb_id: int) -> dict:
+        if tmdb_id in self.unavailable:
+            raise ServiceUnavailable("TMDB is unavailable", {})
+        return {"api_id": tmdb_id, "cover_url": ""}
+
+    async def refresh(self, full=False, watermark_age=timedelta(days=1)):
+        self.db.get_sync_watermark.return_value = (
+            datetime.now() - watermark_age if watermark_age != None else None
+        )
+        with redirect_stdout(self.stdout):
+            await self.controller.sdb_refresh_animes(full)
+
+    async def test_refreshes_changes_since_watermark(self):
+        await self.refresh()
+        self.db.get_animes_by_tmdb_ids.assert_called_once_with([2])
+        self.db.get_animes.assert_not_called()
+        self.db.set_sync_watermark.assert_called_once()
+        self.assertIn("1 animes refreshed.", self.stdout.getvalue())
+
+    async def test_keeps_watermark_after_partial_failure(self):
+        self.unavailable.add(1)
+        await self.refresh(full=True)
+        self.db.bulk_refresh_animes.assert_called_once()
+        self.db.set_sync_watermark.assert_not_called()
+        self.assertIn("1 animes refreshed.", self.stdout.getvalue())
+
+    async def test_full_refresh_ignores_watermark(self):
+        await self.refresh(full=True)
+        self.service.get_changed_anime_ids.assert_not_called()
+        self.assertIn("2 animes refreshed.", self.stdout.getvalue())
+        self.db.set_sync_watermark.assert_called_once()
+
+    async def test_old_or_missing_watermark_refreshes_everything(self):
+        await self.refresh(watermark_age=timedelta(days=15))
+        await self.refresh(watermark_age=None)
+        self.service.get_changed_anime_ids.assert_not_called()
+        self.assertEqual(self.db.get_animes.call_count, 2)
@@ -0,0 +1,53 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from src.services.cover_atlas import CoverAtlas
+
+class TestCoverAtlas(TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp_dir.name, "covers.atlas")
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def test_put_and_get(self):
+        atlas = CoverAtlas(self.path, width=2, max_height=4)
+        atlas.put(3, bytes(range(12)), 2)
+        pixels, height, half_block = atlas.get(3)
+        self.assertEqual(height, 2)
+        self.assertFalse(half_block)
+        self.assertEqual(bytes(pixels), bytes(range(12)))
+
+    def test_keeps_half_block_flag(self):
+        atlas = CoverAtlas(self.path, width=2, max_height=4)
+        atlas.put(1, bytes(24), 4, half_block=True)
+        self.assertTrue(atlas.get(1)[2])
+
+    def test_missing_records(self):
+        atlas = CoverAtlas(self.path, width=2, max_height=4)
+        self.assertIsNone(atlas.get(1))
+        atlas.put(2, bytes(6), 1)
+        self.assertIsNone(atlas.get(1))
+        self.assertIsNone(atlas.get(5))
+
+    def test_records_are_fixed_size(self):
+        atlas = CoverAtlas(self.path, width=2, max_height=4)
+        atlas.put(1, bytes(6), 1)
+        atlas.put(4, bytes(24), 4)
+        record_size = 4 + 2 * 4 * 3
+        self.assertEqual(
+            os.path.getsize(self.path),
+            CoverAtlas._file_header.size + 5 * record_size
+        )
+
+    def test_delete(self):
+        atlas = CoverAtlas(self.path, width=2, max_height=4)
+        atlas.put(1, bytes(6), 1)
+        atlas.delete(1)
+        self.assertIsNone(CoverAtlas(self.path, width=2, max_height=4).get(1))
+
+    def test_layout_change_resets_file(self):
+        CoverAtlas(self.path, width=2, max_height=4).put(1, bytes(6), 1)
+        self.assertIsNone(CoverAtlas(self.path, width=3, max_height=4).get(1))
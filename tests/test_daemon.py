@@ -0,0 +1,78 @@
+import asyncio
+import json
+import os
+import tempfile
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, Mock
+
+from src.presentation.cli_parser import DefaultArgumentParser
+from src.presentation.controller import Controller
+from src.presentation.daemon import DaemonServer
+
+class TestDaemonServer(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp_dir.name, "daemon.sock")
+        self.controller = AsyncMock(Controller)
+        self.controller.db_list_tags = Mock(
+            side_effect=lambda output_format: print("Tags:")
+        )
+        self.create_controller = Mock(return_value=self.controller)
+        self.server = DaemonServer(
+            self.create_controller,
+            DefaultArgumentParser()
+        )
+        self.serving = asyncio.create_task(self.server.serve(self.path))
+        while not os.path.exists(self.path):
+            await asyncio.sleep(0.01)
+
+    async def asyncTearDown(self):
+        self.server.stop()
+        self.assertEqual(await self.serving, 0)
+        self.assertFalse(os.path.exists(self.path))
+        self._tmp_dir.cleanup()
+
+    async def request(
+        self,
+        args: list[str],
+        environ: dict = {},
+        tty: bool = False
+    ) -> list[dict]:
+        reader, writer = await asyncio.open_unix_connection(self.path)
+        writer.write(json.dumps({
+            "args": args,
+            "columns": 80,
+            "tty": tty,
+            "environ": environ
+        }).encode() + b"\n")
+        messages = [json.loads(line) async for line in reader]
+        writer.close()
+        return messages
+
+    async def test_streams_output_and_exit_code(self):
+        messages = await self.request(["tags"])
+        self.assertEqual(messages, [{"out": "Tags:"}, {"out": "\n"}, {"exit": 0}])
+
+    async def test_picks_format_from_client_terminal(self):
+        await self.request(["tags"])
+        self.controller.db_list_tags.assert_called_with("ndjson")
+        await self.request(["tags"], tty=True)
+        self.controller.db_list_tags.assert_called_with("text")
+
+    async def test_reports_parse_errors(self):
+        messages = await self.request(["search", "-p", "x"])
+        self.assertTrue(all("err" in m for m in messages[:-1]))
+        self.assertEqual(messages[-1], {"exit": 2})
+
+    async def test_leaves_interactive_and_stdin_commands_to_client(self):
+        for args in (["shell"], ["update", "--batch"]):
+            self.assertEqual(await self.request(args), [{"fallback": True}])
+
+    async def test_reuses_controller_per_render_mode_and_colors(self):
+        await self.request(["tags"], {"TERM": "xterm-256color"})
+        await self.request(["tags"], {"TERM": "xterm-256color"})
+        await self.request(["--render-mode", "half", "tags"])
+        self.assertEqual(
+            [c.args for c in self.create_controller.call_args_list],
+            [("block", "256"), ("half", "16")]
+        )
@@ -0,0 +1,274 @@
+import os
+import tempfile
+from datetime import date, datetime
+from unittest import TestCase
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from src.models.anime_genre import AnimeGenre
+from src.models.watch_event import WatchEvent
+from src.services.db import Database
+
+def create_details(title: str, genres: list[str]) -> dict:
+    return {
+        "api_id": 100,
+        "title": title,
+        "overview": "",
+        "genres": genres,
+        "release_date": "2020-01-01",
+        "cover_url": "https://image.tmdb.org/t/p/w92/a.jpg",
+        "episodes_count": 12,
+        "seasons_count": 2,
+        "status": "Ended",
+        "trailers": []
+    }
+
+class DatabaseTestCase(TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp_dir.cleanup)
+        path = os.path.join(self._tmp_dir.name, "anime_list.db")
+        self.db = Database(f"sqlite+pysqlite:///{path}")
+        self.addCleanup(self.db.engine.dispose)
+        self.db._init_tags()
+
+    def insert(
+        self,
+        tmdb_id: int,
+        title: str,
+        genres: list[str] = [],
+        **kwargs
+    ) -> int:
+        anime_id = self.db.insert_anime(
+            tmdb_id,
+            2,
+            kwargs.get("watching_season"),
+            kwargs.get("last_watched_episode"),
+            kwargs.get("last_watched_at"),
+            title,
+            kwargs.get("tag_id", 1),
+            genres,
+            kwargs.get("details")
+        )
+        assert anime_id != None
+        return anime_id
+
+    def count_watch_events(self, anime_id: int) -> int:
+        with Session(self.db.engine) as session:
+            return session.execute(
+                select(func.count())
+                .select_from(WatchEvent)
+                .where(WatchEvent.anime_id == anime_id)
+            ).scalar_one()
+
+class TestGenreFilter(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.insert(1, "Frieren", ["Action & Adventure", "Drama"])
+        self.insert(2, "Mushishi", ["Drama", "Mystery"])
+        self.insert(3, "Bocchi", ["Comedy"])
+
+    def titles(self, genres: list[str], title=None) -> list[str]:
+        return [
+            anime.title
+            for anime in self.db.select_animes_by_genres(genres, title)
+        ]
+
+    def test_matches_case_insensitively(self):
+        self.assertEqual(self.titles(["DRAMA"]), ["Frieren", "Mushishi"])
+        self.assertEqual(self.titles(["action & adventure"]), ["Frieren"])
+
+    def test_requires_all_genres(self):
+        self.assertEqual(self.titles(["drama", "mystery"]), ["Mushishi"])
+        self.assertEqual(self.titles(["comedy", "drama"]), [])
+
+    def test_combines_with_title(self):
+        self.assertEqual(self.titles(["drama"], "mush"), ["Mushishi"])
+
+    def test_ignores_blank_entries(self):
+        self.assertEqual(self.titles([" Drama ", "", " "]), ["Frieren", "Mushishi"])
+        self.assertEqual(
+            self.titles(["", " "]),
+            ["Bocchi", "Frieren", "Mushishi"]
+        )
+
+    def test_deduplicates_genres_on_insert(self):
+        anime_id = self.insert(4, "Mob Psycho", ["Comedy", "comedy", "COMEDY"])
+        with Session(self.db.engine) as session:
+            genres = session.execute(
+                select(AnimeGenre.genre)
+                .where(AnimeGenre.anime_id == anime_id)
+            ).scalars().all()
+        self.assertEqual(len(genres), 1)
+        self.assertEqual(self.titles(["comedy"]), ["Bocchi", "Mob Psycho"])
+
+class TestBulkUpdateAnimes(DatabaseTestCase):
+    def test_updates_only_given_fields(self):
+        anime_id = self.insert(1, "Frieren", watching_season=1, last_watched_episode=3)
+        missing_ids = self.db.bulk_update_animes([{
+            "anime_id": anime_id,
+            "watching_season": None,
+            "last_watched_episode": 5,
+            "tag_id": None
+        }])
+        self.assertEqual(missing_ids, [])
+        anime = self.db.get_anime_by_id(anime_id)
+        self.assertEqual(anime.watching_season, 1)
+        self.assertEqual(anime.last_watched_episode, 5)
+        self.assertEqual(anime.tag, "To Watch")
+        self.assertEqual(anime.last_watched_at, date.today().isoformat())
+
+    def test_records_events_only_for_progress(self):
+        first = self.insert(1, "Frieren")
+        second = self.insert(2, "Mushishi")
+        self.db.bulk_update_animes(
+            [
+                {
+                    "anime_id": first,
+                    "watching_season": 2,
+                    "last_watched_episode": None,
+                    "tag_id": None
+                },
+                {
+                    "anime_id": second,
+                    "watching_season": None,
+                    "last_watched_episode": None,
+                    "tag_id": 3
+                }
+            ],
+            chunk_size=1
+        )
+        self.assertEqual(self.count_watch_events(first), 1)
+        self.assertEqual(self.count_watch_events(second), 0)
+        self.assertEqual(self.db.get_anime_by_id(second).tag, "Watched")
+        self.assertIsNone(self.db.get_anime_by_id(second).last_watched_at)
+
+    def test_returns_missing_ids(self):
+        anime_id = self.insert(1, "Frieren")
+        missing_ids = self.db.bulk_update_animes([
+            {
+                "anime_id": anime_id + 1,
+                "watching_season": 1,
+                "last_watched_episode": None,
+                "tag_id": None
+            },
+            {
+                "anime_id": anime_id,
+                "watching_season": 1,
+                "last_watched_episode": None,
+                "tag_id": None
+            }
+        ])
+        self.assertEqual(missing_ids, [anime_id + 1])
+        self.assertEqual(self.db.get_anime_by_id(anime_id).watching_season, 1)
+
+class TestWatchEvents(DatabaseTestCase):
+    def add_event(self, anime_id: int, watched_at: datetime, episode: int):
+        with Session(self.db.engine) as session:
+            session.add(WatchEvent(
+                anime_id=anime_id,
+                watched_at=watched_at,
+                watching_season=1,
+                last_watched_episode=episode
+            ))
+            session.commit()
+
+    def test_insert_records_event_only_with_progress(self):
+        watched = self.insert(
+            1,
+            "Frieren",
+            watching_season=1,
+            last_watched_episode=4,
+            last_watched_at=date(2024, 5, 1)
+        )
+        unwatched = self.insert(2, "Mushishi")
+        history = self.db.get_watch_history(10)
+        self.assertEqual(len(history), 1)
+        self.assertEqual(history[0].anime_id, watched)
+        self.assertEqual(history[0].title, "Frieren")
+        self.assertEqual(history[0].watched_at, "2024-05-01 00:00:00")
+        self.assertEqual(history[0].last_watched_episode, 4)
+        self.assertEqual(self.count_watch_events(unwatched), 0)
+
+    def test_update_records_event_with_new_progress(self):
+        anime_id = self.insert(1, "Frieren", watching_season=2)
+        self.db.update_anime(anime_id, None, 5, None)
+        self.db.update_anime(anime_id, None, None, 3)
+        history = self.db.get_watch_history(10, anime_id)
+        self.assertEqual(len(history), 2)
+        self.assertEqual(
+            (history[0].watching_season, history[0].last_watched_episode),
+            (2, 5)
+        )
+
+    def test_history_is_newest_first_and_filtered_by_anime(self):
+        first = self.insert(1, "Frieren")
+        second = self.insert(2, "Mushishi")
+        self.add_event(first, datetime(2024, 5, 1, 20), 1)
+        self.add_event(second, datetime(2024, 5, 2, 20), 1)
+        self.add_event(first, datetime(2024, 5, 3, 20), 2)
+        self.assertEqual(
+            [(e.anime_id, e.last_watched_episode)
+             for e in self.db.get_watch_history(2)],
+            [(first, 2), (second, 1)]
+        )
+        self.assertEqual(
+            [e.last_watched_episode
+             for e in self.db.get_watch_history(10, first)],
+            [2, 1]
+        )
+
+    def test_counts_events_per_day(self):
+        first = self.insert(1, "Frieren")
+        second = self.insert(2, "Mushishi")
+        self.add_event(first, datetime(2024, 4, 30, 23), 1)
+        self.add_event(first, datetime(2024, 5, 1, 9), 2)
+        self.add_event(second, datetime(2024, 5, 1, 22), 1)
+        self.add_event(first, datetime(2024, 5, 3, 0), 3)
+        days = self.db.count_watch_events_per_day(date(2024, 5, 1))
+        self.assertEqual(
+            [(d.day, d.events) for d in days],
+            [("2024-05-01", 2), ("2024-05-03", 1)]
+        )
+        days = self.db.count_watch_events_per_day(date(2024, 4, 1), second)
+        self.assertEqual([(d.day, d.events) for d in days], [("2024-05-01", 1)])
+
+class TestAnimeDetails(DatabaseTestCase):
+    def test_round_trips_snapshot_saved_on_insert(self):
+        details = create_details("Frieren", ["Drama"])
+        anime_id = self.insert(100, "Frieren", details=details)
+        saved = self.db.get_anime_details(anime_id)
+        self.assertEqual(saved.details, details)
+
+    def test_save_replaces_snapshot(self):
+        anime_id = self.insert(100, "Frieren")
+        self.assertIsNone(self.db.get_anime_details(anime_id))
+        self.db.save_anime_details(anime_id, create_details("Frieren", []))
+        renamed = create_details("Sousou no Frieren", ["Drama"])
+        self.db.save_anime_details(anime_id, renamed)
+        self.assertEqual(self.db.get_anime_details(anime_id).details, renamed)
+
+    def test_refresh_updates_anime_genres_and_snapshot(self):
+        anime_id = self.insert(100, "Frieren", ["Fantasy"])
+        details = create_details("Sousou no Frieren", ["Drama"])
+        self.assertEqual(self.db.bulk_refresh_animes([details]), 1)
+        self.assertEqual(self.db.get_anime_by_id(anime_id).title, "Sousou no Frieren")
+        self.assertEqual(self.db.get_anime_details(anime_id).details, details)
+        self.assertEqual(
+            [a.id for a in self.db.select_animes_by_genres(["drama"])],
+            [anime_id]
+        )
+        self.assertEqual(self.db.select_animes_by_genres(["fantasy"]), [])
+
+class TestDatabaseInstances(TestCase):
+    def test_default_url_given_or_omitted_is_one_instance(self):
+        # The default database is relative to the working directory.
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(tmp_dir.name)
+        url = "sqlite+pysqlite:///anime_list.db"
+        self.assertIs(Database(), Database(url))
+        self.assertIs(Database(), Database(url=url))
+        Database().engine.dispose()
@@ -135,3 +135,18 @@ class TestDefaultParser(TestCase):
         namespace = default_parser.parse(["add", '1'])
         self.assertEqual(namespace.anime_id, 1)
         self.assertEqual(namespace.command, "add")
+
+    def test_update_batch_rejects_single_update_options(self):
+        default_parser = DefaultArgumentParser()
+        self.assertEqual(
+            default_parser.parse(["update", "--batch", "f.csv"]).batch,
+            "f.csv"
+        )
+        for args in (["5", "--batch"], ["-us", "2", "--batch", "f.csv"]):
+            default_stderr, stderr = self.setup_stderr_redirect()
+            try:
+                with self.assertRaises(SystemExit):
+                    default_parser.parse(["update", *args])
+            finally:
+                sys.stderr = default_stderr
+            self.assertIn("--batch can't be combined", stderr.getvalue())
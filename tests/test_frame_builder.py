@@ -0,0 +1,68 @@
+import io
+from unittest import TestCase
+
+from src.presentation.color_palette import ColorPalette
+from src.presentation.frame_builder import FrameBuilder
+
+class TestFrameBuilder(TestCase):
+    def test_emits_color_only_when_it_changes(self):
+        frame = FrameBuilder()
+        frame.pixels(memoryview(bytes([1, 2, 3, 1, 2, 3, 4, 5, 6])))
+        self.assertEqual(
+            frame.build(),
+            "\033[38;2;1;2;3moo\033[38;2;4;5;6mo\033[0m"
+        )
+
+    def test_resets_only_before_text_after_color(self):
+        frame = FrameBuilder()
+        frame.line("plain")
+        frame.pixels(memoryview(bytes([1, 2, 3])))
+        frame.line("|text")
+        self.assertEqual(
+            frame.build(),
+            "plain\n\033[38;2;1;2;3mo\033[0m|text\n"
+        )
+
+    def test_color_continues_across_rows(self):
+        frame = FrameBuilder()
+        frame.pixels(memoryview(bytes([1, 2, 3])))
+        frame.pixels(memoryview(bytes([1, 2, 3])))
+        self.assertEqual(frame.build(), "\033[38;2;1;2;3moo\033[0m")
+
+    def test_half_blocks_change_only_the_colors_that_differ(self):
+        frame = FrameBuilder()
+        frame.pixels(
+            memoryview(bytes([1, 2, 3, 1, 2, 3, 1, 2, 3])),
+            memoryview(bytes([4, 5, 6, 7, 8, 9, 7, 8, 9]))
+        )
+        self.assertEqual(
+            frame.build(),
+            "\033[38;2;1;2;3;48;2;4;5;6m\u2580"
+            "\033[48;2;7;8;9m\u2580\u2580\033[0m"
+        )
+
+    def test_palette_indexes_use_escape_tables(self):
+        frame = FrameBuilder(ColorPalette("16"))
+        frame.pixels(memoryview(bytes([1, 1, 2])))
+        frame.newline()
+        frame.pixels(memoryview(bytes([1, 1])), memoryview(bytes([0, 9])))
+        self.assertEqual(
+            frame.build(),
+            "\033[31moo\033[32mo\033[0m\n"
+            "\033[31;40m\u2580\033[101m\u2580\033[0m"
+        )
+
+    def test_flush_writes_once(self):
+        class Stream(io.StringIO):
+            writes = 0
+            def write(self, s):
+                self.writes += 1
+                return super().write(s)
+
+        stream = Stream()
+        frame = FrameBuilder()
+        frame.pixels(memoryview(bytes([1, 2, 3, 4, 5, 6])))
+        frame.line("text")
+        frame.flush(stream)
+        self.assertEqual(stream.writes, 1)
+        self.assertEqual(frame.build(), "")
@@ -0,0 +1,182 @@
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from unittest import IsolatedAsyncioTestCase, TestCase
+from unittest.mock import patch
+
+from PIL import Image
+
+from src.presentation.image_builder import CoverParser, ImageBuilder, ImagePixels, create_decode_executor
+
+def create_png(size: tuple[int, int]) -> bytes:
+    buffer = io.BytesIO()
+    # Noise doesn't compress, the data spans several IDAT chunks.
+    Image.effect_noise(size, 64).convert("RGB").save(buffer, "PNG")
+    return buffer.getvalue()
+
+def create_jpeg(size: tuple[int, int], progressive: bool = False) -> bytes:
+    buffer = io.BytesIO()
+    Image.linear_gradient("L").resize(size).convert("RGB").save(
+        buffer,
+        "JPEG",
+        progressive=progressive
+    )
+    return buffer.getvalue()
+
+class FakeSession:
+    def __init__(self, data: bytes):
+        self.data = data
+        self.status = 200
+        self.headers = {}
+        self.content = self
+
+    @asynccontextmanager
+    async def get(self, url: str, headers: dict):
+        yield self
+
+    async def iter_chunked(self, size: int):
+        for start in range(0, len(self.data), size):
+            yield self.data[start:start + size]
+
+class RecordingThreadPool(ThreadPoolExecutor):
+    def __init__(self):
+        super().__init__(1)
+        self.submitted: list[str] = []
+
+    def submit(self, fn, *args, **kwargs):
+        self.submitted.append(fn.__name__)
+        return super().submit(fn, *args, **kwargs)
+
+class RecordingProcessPool(ProcessPoolExecutor):
+    def __init__(self):
+        super().__init__(1)
+        self.submitted: list[str] = []
+
+    def submit(self, fn, *args, **kwargs):
+        self.submitted.append(fn.__name__)
+        return super().submit(fn, *args, **kwargs)
+
+class TestImagePixels(TestCase):
+    def test_rows_are_views_over_packed_pixels(self):
+        width = ImagePixels.default_width
+        packed = bytes(range(256))[:width * 3] * 2
+        image_pixels = ImagePixels(packed, 2)
+
+        rows = list(image_pixels)
+        self.assertEqual(len(image_pixels), width * 2)
+        self.assertEqual(len(rows), 2)
+        self.assertIsInstance(rows[0], memoryview)
+        self.assertEqual(bytes(rows[1]), packed[width * 3:])
+        self.assertEqual(
+            list(ImagePixels.pixels(rows[0]))[:2],
+            [(0, 1, 2), (3, 4, 5)]
+        )
+
+    def test_can_be_iterated_more_than_once(self):
+        image_pixels = ImagePixels(bytes(ImagePixels.default_width * 9), 3)
+        self.assertEqual(len(list(image_pixels)), 3)
+        self.assertEqual(len(list(image_pixels)), 3)
+
+class TestBuildImage(TestCase):
+    def test_builds_packed_cover(self):
+        image_pixels = ImageBuilder._build_image(create_jpeg((500, 750)))
+        self.assertEqual(image_pixels.default_height, 24)
+        self.assertEqual(
+            len(image_pixels.image_pixels),
+            ImagePixels.default_width * 24 * 3
+        )
+
+    def test_half_block_cover_packs_two_rows_per_line(self):
+        image_pixels = ImageBuilder._build_image(
+            create_jpeg((500, 750)),
+            half_block=True
+        )
+        self.assertEqual(image_pixels.default_height, 24)
+        self.assertEqual(image_pixels.row_count, 48)
+        lines = list(image_pixels.lines())
+        self.assertEqual(len(lines), 24)
+        self.assertTrue(all(bottom != None for _, bottom in lines))
+
+    def test_incremental_decode_matches_full_decode(self):
+        for image_bytes in (
+            create_jpeg((500, 750)),
+            create_jpeg((500, 750), progressive=True),
+            create_png((500, 750))
+        ):
+            parser = CoverParser()
+            for start in range(0, len(image_bytes), 512):
+                parser.feed(image_bytes[start:start + 512])
+            self.assertEqual(
+                ImageBuilder._build_pixels(parser.close()).image_pixels,
+                ImageBuilder._build_image(image_bytes).image_pixels
+            )
+
+    def test_truncated_progressive_jpeg_has_no_image(self):
+        image_bytes = create_jpeg((500, 750), progressive=True)
+        parser = CoverParser()
+        parser.feed(image_bytes[:len(image_bytes) // 2])
+        self.assertIsNone(parser.close_truncated())
+
+    def test_truncated_baseline_jpeg_keeps_decoded_rows(self):
+        image_bytes = create_jpeg((500, 750))
+        parser = CoverParser()
+        parser.feed(image_bytes[:len(image_bytes) // 2])
+        image = parser.close_truncated()
+        self.assertIsNotNone(image)
+        self.assertIsNotNone(image.getbbox())
+
+class TestDecodeExecutor(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.image_bytes = create_jpeg((500, 750))
+
+    async def produce(self, executor) -> ImagePixels:
+        self.addCleanup(executor.shutdown)
+        image_builder = ImageBuilder(executor=executor)
+        image_builder._chunk_size = 1024
+        return await image_builder.produce_ascii_image(
+            FakeSession(self.image_bytes),
+            "https://image.tmdb.org/t/p/w92/a.jpg"
+        )
+
+    async def test_thread_pool_decodes_while_downloading(self):
+        executor = RecordingThreadPool()
+        image_pixels = await self.produce(executor)
+        self.assertGreater(executor.submitted.count("feed"), 1)
+        self.assertEqual(executor.submitted[-2:], ["close", "_build_pixels"])
+        self.assertEqual(
+            image_pixels.image_pixels,
+            ImageBuilder._build_image(self.image_bytes).image_pixels
+        )
+
+    async def test_process_pool_decodes_the_whole_download(self):
+        executor = RecordingProcessPool()
+        image_pixels = await self.produce(executor)
+        self.assertEqual(executor.submitted, ["_build_image"])
+        self.assertEqual(
+            image_pixels.image_pixels,
+            ImageBuilder._build_image(self.image_bytes).image_pixels
+        )
+
+class TestCreateDecodeExecutor(TestCase):
+    def create(self, environ: dict):
+        with patch.dict(os.environ, environ):
+            executor = create_decode_executor()
+        self.addCleanup(executor.shutdown)
+        return executor
+
+    def test_defaults_to_thread_pool(self):
+        executor = self.create({
+            "ANIME_LIST_DECODE_POOL": "",
+            "ANIME_LIST_DECODE_WORKERS": "3"
+        })
+        self.assertIsInstance(executor, ThreadPoolExecutor)
+        self.assertEqual(executor._max_workers, 3)
+
+    def test_honors_process_pool_setting(self):
+        executor = self.create({
+            "ANIME_LIST_DECODE_POOL": "process",
+            "ANIME_LIST_DECODE_WORKERS": "2"
+        })
+        self.assertIsInstance(executor, ProcessPoolExecutor)
+        self.assertEqual(executor._max_workers, 2)
@@ -0,0 +1,69 @@
+import os
+import tempfile
+import time
+from unittest import TestCase
+
+from src.services.image_cache import ImageCache
+
+class TestImageCache(TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.directory = self._tmp_dir.name
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def test_miss_returns_none(self):
+        cache = ImageCache(self.directory)
+        self.assertIsNone(cache.get("/t/p/w92/a.jpg"))
+
+    def test_put_and_get(self):
+        cache = ImageCache(self.directory)
+        cache.put("/t/p/w92/a.jpg", b"jpeg bytes", '"etag"', None)
+        cached = cache.get("/t/p/w92/a.jpg")
+        self.assertIsNotNone(cached)
+        self.assertEqual(cached.data, b"jpeg bytes")
+        self.assertEqual(cached.etag, '"etag"')
+        self.assertTrue(cached.fresh)
+
+    def test_stale_entries_are_returned_for_revalidation(self):
+        cache = ImageCache(self.directory, max_age=0)
+        cache.put("/a.jpg", b"jpeg bytes")
+        self.assertFalse(cache.get("/a.jpg").fresh)
+        cache._max_age = 60
+        cache.touch("/a.jpg")
+        self.assertTrue(cache.get("/a.jpg").fresh)
+
+    def test_identical_content_is_stored_once(self):
+        cache = ImageCache(self.directory)
+        cache.put("/a.jpg", b"same")
+        cache.put("/b.jpg", b"same")
+        blobs = [
+            f for _, _, files in os.walk(os.path.join(self.directory, "blobs"))
+            for f in files
+        ]
+        self.assertEqual(len(blobs), 1)
+
+    def test_evicts_least_recently_used(self):
+        cache = ImageCache(self.directory, max_bytes=10)
+        cache.put("/a.jpg", b"aaaa")
+        time.sleep(0.01)
+        cache.put("/b.jpg", b"bbbb")
+        time.sleep(0.01)
+        cache.get("/a.jpg")
+        time.sleep(0.01)
+        cache.put("/c.jpg", b"cccc")
+        self.assertIsNotNone(cache.get("/a.jpg"))
+        self.assertIsNone(cache.get("/b.jpg"))
+        self.assertIsNotNone(cache.get("/c.jpg"))
+
+    def test_keeps_total_size_of_entries(self):
+        cache = ImageCache(self.directory)
+        cache.put("/a.jpg", b"aaaa")
+        cache.put("/b.jpg", b"bb")
+        cache.put("/a.jpg", b"a")
+        with cache._connect() as conn:
+            self.assertEqual(cache._total_size(conn), 3)
+        # Reopening the cache doesn't count the entries again.
+        with ImageCache(self.directory)._connect() as conn:
+            self.assertEqual(cache._total_size(conn), 3)
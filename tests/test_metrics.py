@@ -0,0 +1,64 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from src.utils.metrics import MetricsRegistry
+
+class TestMetricsRegistry(TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry()
+        self.registry.enabled = True
+        self.requests = self.registry.counter(
+            "requests_total",
+            "Requests.",
+            ("endpoint", "status")
+        )
+        self.latency = self.registry.histogram(
+            "latency_seconds",
+            "Latency.",
+            ("endpoint",),
+            buckets=(0.1, 1)
+        )
+
+    def test_records_nothing_until_enabled(self):
+        self.registry.enabled = False
+        self.requests.inc(endpoint="/a", status="200")
+        self.latency.observe(0.5, endpoint="/a")
+        self.assertEqual(self.requests.value(endpoint="/a", status="200"), 0)
+        self.assertEqual(self.latency.count(endpoint="/a"), 0)
+
+    def test_renders_counters_with_labels(self):
+        self.requests.inc(endpoint="/a", status="200")
+        self.requests.inc(2, endpoint='/"b"', status="500")
+        self.assertIn(
+            'requests_total{endpoint="/a",status="200"} 1\n',
+            self.registry.render()
+        )
+        self.assertIn(
+            'requests_total{endpoint="/\\"b\\"",status="500"} 2\n',
+            self.registry.render()
+        )
+
+    def test_renders_cumulative_histogram_buckets(self):
+        for value in (0.05, 0.1, 0.5, 3):
+            self.latency.observe(value, endpoint="/a")
+        lines = self.registry.render().splitlines()
+        self.assertEqual(
+            [line for line in lines if line.startswith("latency_seconds")],
+            [
+                'latency_seconds_bucket{endpoint="/a",le="0.1"} 2',
+                'latency_seconds_bucket{endpoint="/a",le="1"} 3',
+                'latency_seconds_bucket{endpoint="/a",le="+Inf"} 4',
+                'latency_seconds_sum{endpoint="/a"} 3.65',
+                'latency_seconds_count{endpoint="/a"} 4'
+            ]
+        )
+        self.assertIn("# TYPE latency_seconds histogram", lines)
+
+    def test_writes_file(self):
+        self.requests.inc(endpoint="/a", status="200")
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "metrics.prom")
+            self.registry.write(path)
+            with open(path) as f:
+                self.assertEqual(f.read(), self.registry.render())
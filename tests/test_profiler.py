@@ -0,0 +1,47 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase, TestCase
+
+from src.utils.decorators.profiled import profiled
+from src.utils.profiler import Profiler, get_profiler, set_profiler, span
+
+class TestSpan(TestCase):
+    def test_does_nothing_without_profiler(self):
+        self.assertIsNone(get_profiler())
+        self.assertIs(span("a"), span("b"))
+
+    def test_summary_groups_stages(self):
+        profiler = Profiler()
+        set_profiler(profiler)
+        try:
+            for _ in range(3):
+                with span("stage"):
+                    pass
+            with span("other"):
+                pass
+        finally:
+            set_profiler(None)
+        calls = {row[0]: row[1] for row in profiler.summary()}
+        self.assertEqual(calls, {"stage": 3, "other": 1})
+
+class TestProfiledTasks(IsolatedAsyncioTestCase):
+    async def test_concurrent_tasks_get_own_lanes(self):
+        @profiled("sleep")
+        async def sleep():
+            await asyncio.sleep(0.01)
+
+        async def profiled_command():
+            set_profiler(profiler)
+            await asyncio.gather(sleep(), sleep())
+
+        profiler = Profiler()
+        await asyncio.create_task(profiled_command())
+        self.assertIsNone(get_profiler())
+
+        trace = profiler.chrome_trace()["traceEvents"]
+        spans = [event for event in trace if event["ph"] == "X"]
+        lanes = [event for event in trace if event["ph"] == "M"]
+        self.assertEqual(len(spans), 2)
+        self.assertEqual(len(lanes), 2)
+        self.assertNotEqual(spans[0]["tid"], spans[1]["tid"])
+        # They overlap.
+        self.assertLess(spans[1]["ts"], spans[0]["ts"] + spans[0]["dur"])
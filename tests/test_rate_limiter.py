@@ -0,0 +1,49 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+from src.services.rate_limiter import RateLimiter
+
+class TestRateLimiter(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.now = 100.0
+        self.waits: list[float] = []
+        clock = patch(
+            "src.services.rate_limiter.time.monotonic",
+            side_effect=lambda: self.now
+        )
+        clock.start()
+        self.addCleanup(clock.stop)
+
+    async def sleep(self, seconds: float):
+        self.waits.append(seconds)
+
+    async def test_waits_once_the_burst_is_spent(self):
+        limiter = RateLimiter(rate=10, burst=2)
+        with patch("src.services.rate_limiter.asyncio.sleep", self.sleep):
+            for _ in range(4):
+                await limiter.acquire()
+        self.assertEqual(self.waits, [0.1, 0.2])
+
+    async def test_refills_over_time(self):
+        limiter = RateLimiter(rate=10, burst=2)
+        with patch("src.services.rate_limiter.asyncio.sleep", self.sleep):
+            await limiter.acquire()
+            await limiter.acquire()
+            self.now += 1
+            # Never more than the burst is saved up.
+            for _ in range(3):
+                await limiter.acquire()
+        self.assertEqual(self.waits, [0.1])
+
+    async def test_cancelled_request_gives_its_token_back(self):
+        limiter = RateLimiter(rate=10, burst=1)
+        await limiter.acquire()
+        waiting = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        waiting.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiting
+        with patch("src.services.rate_limiter.asyncio.sleep", self.sleep):
+            await limiter.acquire()
+        self.assertEqual(self.waits, [0.1])
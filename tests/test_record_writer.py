@@ -0,0 +1,46 @@
+import io
+import json
+from unittest import TestCase
+
+from src.dtos.dto_tag import DTOTag
+from src.presentation.record_writer import RecordWriter, resolve_output_format
+
+class TestRecordWriter(TestCase):
+    def setUp(self):
+        self.stream = io.StringIO()
+        self.records = [
+            {"api_id": 1, "title": "A, B", "genres": ["Drama", "Action"]},
+            {"api_id": 2, "title": "C", "genres": []}
+        ]
+
+    def test_json_array(self):
+        RecordWriter("json", self.stream).write_all(self.records)
+        self.assertEqual(json.loads(self.stream.getvalue()), self.records)
+
+    def test_empty_json_array(self):
+        RecordWriter("json", self.stream).write_all([])
+        self.assertEqual(json.loads(self.stream.getvalue()), [])
+
+    def test_json_object_for_one_record(self):
+        RecordWriter("json", self.stream).write_one(DTOTag(1, "To Watch"))
+        self.assertEqual(
+            json.loads(self.stream.getvalue()),
+            {"id": 1, "name": "To Watch"}
+        )
+
+    def test_ndjson_line_per_record(self):
+        RecordWriter("ndjson", self.stream).write_all(self.records)
+        lines = self.stream.getvalue().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], self.records)
+
+    def test_csv_rows_under_header(self):
+        RecordWriter("csv", self.stream).write_all(self.records)
+        self.assertEqual(
+            self.stream.getvalue(),
+            'api_id,title,genres\n1,"A, B",Drama|Action\n2,C,\n'
+        )
+
+    def test_auto_format_depends_on_terminal(self):
+        self.assertEqual(resolve_output_format("auto", True), "text")
+        self.assertEqual(resolve_output_format("auto", False), "ndjson")
+        self.assertEqual(resolve_output_format("csv", True), "csv")
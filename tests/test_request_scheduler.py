@@ -0,0 +1,102 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+
+from src.services.request_scheduler import RequestScheduler
+from src.utils.request_priority import RequestPriority
+
+class TestRequestScheduler(IsolatedAsyncioTestCase):
+    async def test_limits_concurrency_per_priority(self):
+        scheduler = RequestScheduler({RequestPriority.VISIBLE: 2})
+        release = asyncio.Event()
+
+        async def request():
+            async with scheduler.slot(RequestPriority.VISIBLE):
+                await release.wait()
+
+        tasks = [asyncio.create_task(request()) for _ in range(5)]
+        await asyncio.sleep(0)
+        self.assertEqual(scheduler.running(RequestPriority.VISIBLE), 2)
+        self.assertEqual(scheduler.waiting(RequestPriority.VISIBLE), 3)
+
+        # Metadata has its own slots.
+        async with scheduler.slot(RequestPriority.METADATA):
+            pass
+
+        release.set()
+        await asyncio.gather(*tasks)
+        self.assertEqual(scheduler.running(RequestPriority.VISIBLE), 0)
+
+    async def test_lower_priority_uses_its_own_free_slots(self):
+        scheduler = RequestScheduler({
+            RequestPriority.VISIBLE: 1,
+            RequestPriority.PREFETCH: 1
+        })
+        started: list[str] = []
+        release = asyncio.Event()
+
+        async def request(name: str, priority: RequestPriority):
+            async with scheduler.slot(priority):
+                started.append(name)
+                await release.wait()
+
+        visible = RequestPriority.VISIBLE
+        tasks = [asyncio.create_task(request("visible 1", visible))]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(request("visible 2", visible)))
+        tasks.append(
+            asyncio.create_task(request("prefetch", RequestPriority.PREFETCH))
+        )
+        await asyncio.sleep(0)
+        # Shared slots are left, so a waiting visible cover doesn't hold it.
+        self.assertEqual(started, ["visible 1", "prefetch"])
+
+        release.set()
+        await asyncio.gather(*tasks)
+        self.assertEqual(started, ["visible 1", "prefetch", "visible 2"])
+
+    async def test_serves_higher_priorities_first_when_full(self):
+        scheduler = RequestScheduler(total_limit=1)
+        started: list[str] = []
+        release = asyncio.Event()
+
+        async def request(name: str, priority: RequestPriority):
+            async with scheduler.slot(priority):
+                started.append(name)
+                await release.wait()
+
+        visible = RequestPriority.VISIBLE
+        tasks = [asyncio.create_task(request("visible 1", visible))]
+        await asyncio.sleep(0)
+        tasks.append(
+            asyncio.create_task(request("prefetch", RequestPriority.PREFETCH))
+        )
+        tasks.append(asyncio.create_task(request("visible 2", visible)))
+        await asyncio.sleep(0)
+        self.assertEqual(started, ["visible 1"])
+
+        release.set()
+        await asyncio.gather(*tasks)
+        self.assertEqual(started, ["visible 1", "visible 2", "prefetch"])
+
+    async def test_cancelled_waiter_frees_its_place(self):
+        scheduler = RequestScheduler(total_limit=1)
+        release = asyncio.Event()
+
+        async def request(priority: RequestPriority):
+            async with scheduler.slot(priority):
+                await release.wait()
+
+        running = asyncio.create_task(request(RequestPriority.VISIBLE))
+        waiting = asyncio.create_task(request(RequestPriority.VISIBLE))
+        prefetch = asyncio.create_task(request(RequestPriority.PREFETCH))
+        await asyncio.sleep(0)
+        self.assertEqual(scheduler.waiting(RequestPriority.VISIBLE), 1)
+
+        waiting.cancel()
+        await asyncio.sleep(0)
+        self.assertEqual(scheduler.waiting(RequestPriority.VISIBLE), 0)
+        self.assertEqual(scheduler.running(RequestPriority.PREFETCH), 0)
+
+        release.set()
+        await asyncio.gather(running, prefetch)
+        self.assertEqual(scheduler.running(RequestPriority.PREFETCH), 0)
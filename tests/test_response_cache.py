@@ -0,0 +1,45 @@
+import sqlite3
+import tempfile
+from contextlib import closing
+from unittest import TestCase
+
+from src.services.response_cache import ResponseCache
+
+class TestResponseCache(TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp_dir.cleanup)
+
+    def open(self, max_entries: int = 2000) -> ResponseCache:
+        return ResponseCache(self._tmp_dir.name, max_entries)
+
+    def count_saved(self, cache: ResponseCache) -> int:
+        with closing(sqlite3.connect(cache._path)) as conn:
+            return conn.execute("SELECT COUNT(*) FROM response").fetchone()[0]
+
+    def test_serves_pending_writes(self):
+        cache = self.open()
+        cache.put("a", {"page": 1})
+        self.assertEqual(self.count_saved(cache), 0)
+        self.assertEqual(cache.get("a").body, {"page": 1})
+        self.assertIsNone(self.open().get("a"))
+
+    def test_saves_writes_in_batches(self):
+        cache = self.open()
+        for n in range(cache.batch_size - 1):
+            cache.put(str(n), {"page": n})
+        self.assertEqual(self.count_saved(cache), 0)
+        cache.put("last", {"page": 0})
+        self.assertEqual(self.count_saved(cache), cache.batch_size)
+        self.assertEqual(self.open().get("1").body, {"page": 1})
+
+    def test_evicts_least_recently_used_on_open(self):
+        cache = self.open()
+        for key in ["a", "b", "c"]:
+            cache.put(key, {"key": key})
+            cache.flush()
+        cache.get("a")
+        cache = self.open(max_entries=2)
+        self.assertEqual(self.count_saved(cache), 2)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a").body, {"key": "a"})
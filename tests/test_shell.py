@@ -0,0 +1,49 @@
+import io
+from contextlib import asynccontextmanager, redirect_stdout
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, Mock, patch
+
+from src.presentation.cli_parser import DefaultArgumentParser
+from src.presentation.controller import Controller
+from src.presentation.shell import Shell
+
+class TestShell(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.controller = AsyncMock(Controller)
+
+        @asynccontextmanager
+        async def keep_session():
+            yield
+
+        self.controller.keep_session = keep_session
+        self.controller.db_list_tags = Mock()
+        self.controller.service_list_animes.return_value = 3
+        self.shell = Shell(self.controller, DefaultArgumentParser())
+        self.stdout = io.StringIO()
+
+    async def run_lines(self, lines: list[str]):
+        with patch("builtins.input", side_effect=lines + [EOFError()]):
+            with redirect_stdout(self.stdout):
+                await self.shell.run()
+
+    async def test_pages_through_last_search(self):
+        await self.run_lines(["search -p 2 -g action", "next", "prev", "prev"])
+        pages = [
+            c.args[0] for c in self.controller.service_list_animes.call_args_list
+        ]
+        self.assertEqual(pages, [2, 3, 2, 1])
+        self.controller.service_prefetch_page.assert_any_call(3, "", "action")
+        self.controller.service_prefetch_page.assert_called_with(2, "", "action")
+
+    async def test_does_not_prefetch_past_last_page(self):
+        await self.run_lines(["search -p 3", "next"])
+        self.controller.service_prefetch_page.assert_not_called()
+
+    async def test_keeps_running_after_errors(self):
+        await self.run_lines(["next", "search --page x", "unknown", "tags"])
+        self.controller.service_list_animes.assert_not_called()
+        self.controller.db_list_tags.assert_called_once()
+
+    async def test_exit_stops_reading(self):
+        await self.run_lines(["exit", "tags"])
+        self.controller.db_list_tags.assert_not_called()
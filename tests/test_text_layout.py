@@ -0,0 +1,44 @@
+from unittest import TestCase
+
+from src.presentation.text_layout import cut, display_width, layout_field, wrap
+
+class TestWrap(TestCase):
+    def test_wraps_at_spaces(self):
+        self.assertEqual(
+            wrap("the quick brown fox jumps", 10),
+            ("the quick", "brown fox", "jumps")
+        )
+
+    def test_breaks_words_wider_than_a_line(self):
+        self.assertEqual(wrap("ab abcdefgh", 4), ("ab", "abcd", "efgh"))
+
+    def test_measures_wide_characters(self):
+        self.assertEqual(display_width("アニメ a"), 8)
+        self.assertEqual(wrap("アニメ アニメ", 7), ("アニメ", "アニメ"))
+        self.assertEqual(wrap("アニメアニメ", 7), ("アニメ", "アニメ"))
+
+    def test_stops_after_max_lines(self):
+        self.assertEqual(wrap("a b c d e f", 1, max_lines=2), ("a", "b", "c"))
+
+class TestLayoutField(TestCase):
+    def test_prefixes_title(self):
+        self.assertEqual(layout_field("ID", "12", 20), ("ID: 12",))
+        self.assertEqual(layout_field("Title", "", 20), ("Title: ",))
+
+    def test_ends_cut_text_with_ellipsis(self):
+        self.assertEqual(
+            layout_field("Overview", "one two three four", 13, 1),
+            ("Overview: ...",)
+        )
+        self.assertEqual(
+            layout_field("Overview", "a b c d e f g h", 12, 2),
+            ("Overview: a", "b c d e f...")
+        )
+
+class TestCut(TestCase):
+    def test_keeps_text_that_fits(self):
+        self.assertEqual(cut("Title: Mushishi", 15), "Title: Mushishi")
+
+    def test_cuts_by_display_width(self):
+        self.assertEqual(cut("Title: フリーレン", 14), "Title: フリ...")
+        self.assertEqual(display_width(cut("Title: フリーレン", 13)), 12)
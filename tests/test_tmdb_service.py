@@ -1,12 +1,20 @@
 import asyncio
+import os
+import tempfile
 from unittest import TestCase, IsolatedAsyncioTestCase
-from unittest.mock import AsyncMock, Mock, call
-from aiohttp import ClientSession
-from datetime import datetime
+from unittest.mock import AsyncMock, Mock, call, patch
+from aiohttp import ClientError, ClientSession
+from datetime import date, datetime
 
 from src.interfaces.movie_service_interface import Genre
 from src.products.tmdb import TMDBAnimeDisplayInfo
-from src.utils.exceptions import DefaultException
+from src.utils.deadline import run_with_deadline
+from src.utils.metrics import registry, upstream_bytes
+from src.utils.exceptions import DeadlineExceeded, DefaultException, ServiceUnavailable
+from src.services.circuit_breaker import CircuitBreaker
+from src.utils.request_priority import RequestPriority
+from src.services.request_scheduler import RequestScheduler
+from src.services.response_cache import ResponseCache
 from src.services.tmdb import AnimeInfo, TMDBService
 
 def setup_session_and_response_async_mocks(
@@ -116,6 +124,119 @@ class TestFetch(IsolatedAsyncioTestCase):
             {"ok": "success"}
         )
 
+    async def test_raises_deadline_exceeded_when_out_of_time(self):
+        session_mock, response_mock = setup_session_and_response_async_mocks(
+            200,
+            {"ok": "success"}
+        )[0:2]
+
+        async def slow_json():
+            await asyncio.sleep(10)
+
+        response_mock.json.side_effect = slow_json
+        api_service = TMDBService("test")
+
+        with self.assertRaises(DeadlineExceeded):
+            await run_with_deadline(
+                api_service._fetch(session_mock, "https://template-url.com"),
+                0.01
+            )
+
+    async def test_counts_bytes_read_without_content_length(self):
+        session_mock, response_mock = setup_session_and_response_async_mocks(
+            200,
+            {"ok": "success"}
+        )[0:2]
+        response_mock.content_length = None
+        response_mock.read.return_value = b'{"ok": "success"}'
+        api_service = TMDBService("test")
+        endpoint = api_service._endpoint(f"{api_service._default_uri}/tv/1")
+        with patch.object(registry, "enabled", True):
+            before = upstream_bytes.value(endpoint=endpoint)
+            await api_service._fetch(
+                session_mock,
+                f"{api_service._default_uri}/tv/1",
+                cache=False
+            )
+            self.assertEqual(upstream_bytes.value(endpoint=endpoint) - before, 17)
+
+class TestRecentResponses(IsolatedAsyncioTestCase):
+    async def test_reuses_recent_response(self):
+        api_service = TMDBService("test")
+        session_mock = setup_session_and_response_async_mocks(
+            200,
+            {"ok": "success"}
+        )[0]
+        for _ in range(2):
+            result = await api_service._fetch(
+                session_mock,
+                "https://template-url.com",
+                {"page": 1}
+            )
+        self.assertEqual(result, {"ok": "success"})
+        session_mock.get.assert_called_once()
+
+    async def test_refetches_uncached_and_expired_responses(self):
+        api_service = TMDBService("test")
+        session_mock = setup_session_and_response_async_mocks(
+            200,
+            {"ok": "success"}
+        )[0]
+        await api_service._fetch(session_mock, "https://a.com", cache=False)
+        await api_service._fetch(session_mock, "https://a.com", cache=False)
+        api_service._recent_max_age = 0
+        await api_service._fetch(session_mock, "https://b.com")
+        await api_service._fetch(session_mock, "https://b.com")
+        self.assertEqual(session_mock.get.call_count, 4)
+
+class TestFetchFallback(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.api_service = TMDBService(
+            "test",
+            responses=ResponseCache(self._tmp_dir.name)
+        )
+        # Every call goes to the API instead of reusing recent responses.
+        self.api_service._recent_max_age = 0
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    async def test_serves_last_good_response_when_api_fails(self):
+        session_mock = setup_session_and_response_async_mocks(
+            200,
+            {"ok": "success"}
+        )[0]
+        await self.api_service._fetch(session_mock, "https://template-url.com")
+
+        session_mock.get.side_effect = ClientError()
+        result = await self.api_service._fetch(
+            session_mock,
+            "https://template-url.com"
+        )
+        self.assertEqual(result, {"ok": "success", "stale": True})
+
+    async def test_fails_fast_while_circuit_is_open(self):
+        session_mock = setup_session_and_response_async_mocks(
+            503,
+            {"status_message": "Service Unavailable"},
+            Mock(return_value="https://template-url.com")
+        )[0]
+        for _ in range(CircuitBreaker.min_calls):
+            with self.assertRaises(DefaultException):
+                await self.api_service._fetch(
+                    session_mock,
+                    "https://template-url.com"
+                )
+
+        session_mock.get.reset_mock()
+        with self.assertRaises(ServiceUnavailable):
+            await self.api_service._fetch(
+                session_mock,
+                "https://template-url.com"
+            )
+        session_mock.get.assert_not_called()
+
 class TestTMDBServiceGetAimeSeriesList(IsolatedAsyncioTestCase):
     async def test_get_anime_series_necessary_query_params(self):
         session_mock = setup_session_and_response_async_mocks(
@@ -332,7 +453,8 @@ class TestGetAnimeList(IsolatedAsyncioTestCase):
         api_service._fetch_animes.assert_called_with(
             session_mock,
             page,
-            genres_filter
+            genres_filter,
+            RequestPriority.METADATA
         )
         api_service._convert_genre_filter.assert_called_with(
             genres,
@@ -498,7 +620,8 @@ class TestGetAnimeListByName(IsolatedAsyncioTestCase):
         service._fetch_anime_by_name.assert_called_with(
             session_mock,
             page,
-            query_name
+            query_name,
+            RequestPriority.METADATA
         )
 
         service._parse_fetched_animes.assert_called_with(
@@ -572,3 +695,136 @@ class TestGetAnimeListByName(IsolatedAsyncioTestCase):
             [fetch_result_mock[2]],
             genres
         )
+
+class TestGetChangedAnimeIds(IsolatedAsyncioTestCase):
+    async def test_get_changed_anime_ids_fetches_every_page(self):
+        session_mock = AsyncMock(ClientSession)
+        pages = {
+            1: {"results": [{"id": 1}, {"id": 2}], "page": 1, "total_pages": 3},
+            2: {"results": [{"id": 3}], "page": 2, "total_pages": 3},
+            3: {"results": [{"id": 4}], "page": 3, "total_pages": 3},
+        }
+
+        def mock_get(url, params=None):
+            response_context_mock = AsyncMock()
+            response_mock = AsyncMock()
+            response_mock.status = 200
+            response_mock.json.return_value = pages[params["page"]]
+            response_context_mock.__aenter__.return_value = response_mock
+            return response_context_mock
+        session_mock.get.side_effect = mock_get
+
+        scheduler = RequestScheduler()
+        service = TMDBService("test", scheduler)
+        with patch.object(scheduler, "slot", wraps=scheduler.slot) as slot:
+            changed_ids = await service.get_changed_anime_ids(
+                session_mock,
+                date(2024, 8, 1),
+                date(2024, 8, 3)
+            )
+
+        # Only the first page goes ahead of other requests.
+        self.assertEqual(
+            [c.args[0] for c in slot.call_args_list],
+            [
+                RequestPriority.METADATA,
+                RequestPriority.PREFETCH,
+                RequestPriority.PREFETCH
+            ]
+        )
+        self.assertEqual(session_mock.get.call_count, 3)
+        session_mock.get.assert_any_call(
+            f"{service._default_uri}/tv/changes",
+            params={
+                "start_date": "2024-08-01",
+                "end_date": "2024-08-03",
+                "page": 1
+            }
+        )
+        self.assertEqual(changed_ids, [1, 2, 3, 4])
+
+class TestConfigureImages(IsolatedAsyncioTestCase):
+    configuration = {
+        "images": {
+            "secure_base_url": "https://image.tmdb.org/t/p/",
+            "poster_sizes": ["w92", "w154", "w185", "w342", "w500", "original"]
+        }
+    }
+
+    async def test_picks_smallest_size_covering_width(self):
+        service = TMDBService("test")
+        service._get_configuration = AsyncMock()
+        service._get_configuration.return_value = self.configuration
+        await service.configure_images(AsyncMock(ClientSession), 30)
+        self.assertEqual(
+            service._image_uri,
+            "https://image.tmdb.org/t/p/w92"
+        )
+        await service.configure_images(AsyncMock(ClientSession), 160)
+        self.assertEqual(
+            service._image_uri,
+            "https://image.tmdb.org/t/p/w185"
+        )
+
+    async def test_picks_largest_size_when_none_covers_width(self):
+        service = TMDBService("test")
+        service._get_configuration = AsyncMock()
+        service._get_configuration.return_value = self.configuration
+        await service.configure_images(AsyncMock(ClientSession), 1000)
+        self.assertEqual(
+            service._image_uri,
+            "https://image.tmdb.org/t/p/w500"
+        )
+
+    async def test_keeps_default_size_when_configuration_fails(self):
+        service = TMDBService("test")
+        service._get_configuration = AsyncMock()
+        service._get_configuration.side_effect = DefaultException(
+            "failed",
+            {}
+        )
+        await service.configure_images(AsyncMock(ClientSession), 30)
+        self.assertEqual(service._image_uri, service._default_image_uri)
+
+class TestGetConfiguration(IsolatedAsyncioTestCase):
+    configuration = {"images": {"poster_sizes": ["w92"]}}
+
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp_dir.cleanup)
+        environ = patch.dict(os.environ, {"XDG_CACHE_HOME": self._tmp_dir.name})
+        environ.start()
+        self.addCleanup(environ.stop)
+        self.path = os.path.join(
+            self._tmp_dir.name,
+            "anime_list",
+            "tmdb_configuration.json"
+        )
+        self.service = TMDBService("test")
+        self.service._fetch_configuration = AsyncMock()
+
+    async def test_saves_fetched_configuration(self):
+        self.service._fetch_configuration.return_value = self.configuration
+        session = AsyncMock(ClientSession)
+        await self.service._get_configuration(session)
+        self.assertEqual(
+            await TMDBService("test")._get_configuration(session),
+            self.configuration
+        )
+
+    async def test_works_when_cache_file_cannot_be_written(self):
+        os.makedirs(self.path)
+        self.service._fetch_configuration.return_value = self.configuration
+        self.assertEqual(
+            await self.service._get_configuration(AsyncMock(ClientSession)),
+            self.configuration
+        )
+
+    async def test_does_not_save_stale_configuration(self):
+        self.service._fetch_configuration.return_value = {
+            **self.configuration,
+            "stale": True
+        }
+        await self.service._get_configuration(AsyncMock(ClientSession))
+        self.assertFalse(os.path.exists(self.path))
+        self.assertIsNone(self.service._configuration)